@@ -0,0 +1,77 @@
+# benchmarks/bench_ann_backends.py
+"""📏 Benchmark: recall, latency and memory of the Retriever's index backends.
+
+Builds every backend in `conductdoc.indexes` over the same corpus and reports,
+for each one, recall@k against the exact flat index, the median single-query
+latency, the size of the saved index (what a memory-mapped run pages in) and
+the build time, including training.
+
+The corpus is synthetic: unit-normalised vectors drawn around a few thousand
+cluster centres, which mimics the topical structure of sentence embeddings
+better than uniform noise.
+
+Usage:
+    python benchmarks/bench_ann_backends.py [--corpus-size 100000] [--k 10]
+"""
+import argparse
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from conductdoc.indexes import INDEX_BACKENDS, build_index
+
+DIMENSION = 384  # all-MiniLM-L6-v2
+
+
+def synthetic_embeddings(count: int, clusters: int, rng: np.random.Generator, centres: np.ndarray) -> np.ndarray:
+    assignments = rng.integers(0, clusters, size=count)
+    noise = rng.standard_normal((count, DIMENSION), dtype=np.float32) / np.sqrt(DIMENSION)
+    vectors = centres[assignments] + 0.5 * noise
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus-size", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    rng = np.random.default_rng(42)
+    centres = rng.standard_normal((args.clusters, DIMENSION), dtype=np.float32) / np.sqrt(DIMENSION)
+    corpus = synthetic_embeddings(args.corpus_size, args.clusters, rng, centres).astype(np.float32)
+    queries = synthetic_embeddings(args.queries, args.clusters, rng, centres).astype(np.float32)
+
+    exact_ids = None
+    print(f"corpus={args.corpus_size} dim={DIMENSION} queries={args.queries} k={args.k}")
+    print(f"{'backend':>10} {'recall@k':>9} {'p50 query ms':>13} {'index MB':>9} {'build s':>8}")
+    for backend in INDEX_BACKENDS:
+        start = time.perf_counter()
+        index = build_index(backend, corpus)
+        build_seconds = time.perf_counter() - start
+
+        _, ids = index.search(queries, args.k)
+        if exact_ids is None:
+            exact_ids = ids  # "flat" comes first and is exact
+        recall = np.mean([len(set(found) & set(exact)) / args.k for found, exact in zip(ids, exact_ids)])
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query[None, :], args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        index_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+        print(f"{backend:>10} {recall:>9.3f} {statistics.median(latencies):>13.3f} {index_mb:>9.1f} {build_seconds:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/bench_encoder_backends.py
+"""📏 Benchmark: throughput and retrieval agreement of the sentence-encoder backends.
+
+Encodes the code chunks of a real package with every backend in
+`conductdoc.encoders`, for each combination of thread count and batch size,
+and reports throughput in chunks per second. Each backend's embeddings are
+then compared with those of the full-precision `torch` backend: the mean cosine
+similarity of the two embeddings of each chunk, and the overlap of the top-k
+chunks retrieved for the same queries (one per code element name).
+
+The model must already be in the local Hugging Face cache (or be a local path).
+Backends whose runtime isn't installed are reported and skipped.
+
+Usage:
+    python benchmarks/bench_encoder_backends.py [--src /path/to/package] [--batch-sizes 16 32 64 128] [--threads 1 4]
+"""
+import argparse
+import email
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from conductdoc.chunking import chunk_code_elements
+from conductdoc.crawler import crawl_source_code
+from conductdoc.encoders import ENCODER_BACKENDS, load_encoder
+
+
+def code_chunks(src: Path, max_chunks: int):
+    """The chunker's output for `src`, as (chunks, queries)."""
+    # The crawler keeps its manifest in the working directory.
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            elements = crawl_source_code(src, incremental=False).elements
+        finally:
+            os.chdir(cwd)
+    chunks = [chunk for _, chunk in chunk_code_elements(elements)][:max_chunks]
+    queries = sorted({f"How does {el.name} work?" for el in elements})[:200]
+    return chunks, queries
+
+
+def encode(model, texts, batch_size: int) -> np.ndarray:
+    vectors = model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    index = faiss.IndexFlatL2(corpus.shape[1])
+    index.add(corpus)
+    return index.search(queries, k)[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--src", type=Path, default=Path(email.__file__).parent)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backends", nargs="+", choices=ENCODER_BACKENDS, default=list(ENCODER_BACKENDS))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--threads", type=int, nargs="+", default=[os.cpu_count() or 1])
+    parser.add_argument("--max-chunks", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    chunks, queries = code_chunks(args.src, args.max_chunks)
+    print(f"model={args.model} chunks={len(chunks)} queries={len(queries)} k={args.k}")
+    print(f"{'backend':>10} {'threads':>8} {'batch':>6} {'chunks/s':>9}")
+
+    # The best configuration of each backend, as (chunks/s, threads, batch size, embeddings).
+    best = {}
+    for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+        for threads in args.threads:
+            try:
+                model = load_encoder(args.model, backend, threads)
+            except Exception as e:
+                print(f"{backend:>10} skipped: {e}")
+                break
+            encode(model, chunks[:32], batch_size=32)  # Warm-up.
+            for batch_size in args.batch_sizes:
+                start = time.perf_counter()
+                embeddings = encode(model, chunks, batch_size)
+                throughput = len(chunks) / (time.perf_counter() - start)
+                print(f"{backend:>10} {threads:>8} {batch_size:>6} {throughput:>9.1f}")
+                if throughput > best.get(backend, (0,))[0]:
+                    best[backend] = (throughput, threads, batch_size, embeddings, encode(model, queries, batch_size))
+
+    if "torch" not in best:
+        print("The torch reference backend could not be loaded; no agreement to report.")
+        return
+    _, _, _, reference, reference_queries = best["torch"]
+    reference_hits = top_k(reference, reference_queries, args.k)
+    print()
+    print(f"Against torch: {'backend':>10} {'best chunks/s':>14} {'speed-up':>9} {'mean cosine':>12} {'top-k overlap':>14}")
+    for backend, (throughput, threads, batch_size, embeddings, query_embeddings) in best.items():
+        cosine = np.sum(embeddings * reference, axis=1) / (
+            np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference, axis=1)
+        )
+        hits = top_k(embeddings, query_embeddings, args.k)
+        overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(hits, reference_hits)])
+        print(
+            f"{'':>14} {backend:>10} {throughput:>14.1f} {throughput / best['torch'][0]:>8.2f}x "
+            f"{cosine.mean():>12.4f} {overlap:>13.1%}   (threads={threads}, batch={batch_size})"
+        )
+
+
+if __name__ == "__main__":
+    main()
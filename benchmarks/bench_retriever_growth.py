@@ -0,0 +1,108 @@
+# benchmarks/bench_retriever_growth.py
+"""📏 Benchmark: the cost of appending summary chunks to the Retriever.
+
+Recursive summarization adds one chunk per file summary and one per directory
+summary, searching once per directory. This replays that pattern for a growing
+number of summaries and compares the Retriever against the previous
+implementation, which re-encoded every chunk alone and vstacked the whole
+embedding matrix on each add.
+
+The sentence-transformer is replaced by a deterministic random encoder so the
+numbers measure the vector store, not model inference. Encoder calls are
+counted instead, since each real call is a separate forward pass.
+
+Usage:
+    python benchmarks/bench_retriever_growth.py [--sizes 1000 2000 5000]
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import conductdoc.retriever as retriever_module
+
+DIMENSION = 384  # all-MiniLM-L6-v2
+INITIAL_CHUNKS = 2000
+FILES_PER_DIRECTORY = 8
+
+
+class RandomEncoder:
+    """Maps each text to a fixed pseudo-random vector and counts encode calls."""
+    max_seq_length = 256
+
+    def __init__(self, *args, **kwargs):
+        self.calls = 0
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        self.calls += 1
+        seeds = [int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little") for text in texts]
+        return np.stack([np.random.default_rng(seed).standard_normal(DIMENSION, dtype=np.float32) for seed in seeds])
+
+
+class LegacyStore:
+    """The previous add/retrieve behavior: one encode per add and a vstack of all embeddings."""
+    def __init__(self, encoder: RandomEncoder, initial_chunks):
+        self.model = encoder
+        self.chunks = list(initial_chunks)
+        self.embeddings = self.model.encode(self.chunks)
+        self.index = faiss.IndexFlatL2(DIMENSION)
+        self.index.add(self.embeddings)
+
+    def add_chunks(self, new_chunks):
+        new_embeddings = self.model.encode(new_chunks)
+        self.embeddings = np.vstack([self.embeddings, new_embeddings])
+        self.chunks.extend(new_chunks)
+        self.index.add(new_embeddings)
+
+    def retrieve(self, query, k=7):
+        _, indices = self.index.search(self.model.encode([query]), k)
+        return [self.chunks[i] for i in indices[0] if i != -1]
+
+
+def replay(store, summaries: int) -> float:
+    """Adds `summaries` chunks one at a time, searching after every directory's worth."""
+    start = time.perf_counter()
+    for i in range(summaries):
+        store.add_chunks([f"AI Summary for file 'pkg/module_{i}.py': summary text {i}"])
+        if i % FILES_PER_DIRECTORY == FILES_PER_DIRECTORY - 1:
+            store.retrieve(f"Summary of the directory pkg/sub_{i}", k=7)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 2000, 5000])
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    retriever_module.load_encoder = RandomEncoder
+    initial_chunks = [("docs/index.rst", f"documentation paragraph {i}") for i in range(INITIAL_CHUNKS)]
+
+    print(f"{'summaries':>10} {'legacy s':>10} {'legacy encodes':>15} {'new s':>8} {'new encodes':>12} {'new µs/chunk':>13}")
+    # The Retriever persists its snapshot and embedding cache in the working directory.
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        for size in args.sizes:
+            legacy = LegacyStore(RandomEncoder(), [f"From documentation file '{s}': {t}" for s, t in initial_chunks])
+            legacy_seconds = replay(legacy, size)
+
+            retriever = retriever_module.Retriever()
+            retriever.build_initial_indexes(doc_chunks=initial_chunks, code_elements=[])
+            retriever.model.calls = 0
+            new_seconds = replay(retriever, size)
+
+            print(
+                f"{size:>10} {legacy_seconds:>10.2f} {legacy.model.calls - 1:>15} "
+                f"{new_seconds:>8.2f} {retriever.model.calls:>12} {new_seconds / size * 1e6:>13.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/check_import_time.py
+"""⏱️ Regression check: CLI startup must not import the heavy dependencies.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and fails
+(exit status 1) if importing the CLI takes longer than the budget, or if it
+imports any module that should only load once its pipeline phase starts. The
+slowest imports are listed either way, to point at the culprit.
+
+Usage:
+    python benchmarks/check_import_time.py [--budget-ms 300] [--repeat 3]
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Imported by the analyze phase (or by the crawler's doc conversion) only.
+DEFERRED_MODULES = (
+    "torch", "sentence_transformers", "transformers", "faiss", "openai",
+    "bs4", "docutils", "markdown", "conductdoc.analyzer", "conductdoc.retriever",
+)
+
+
+def import_times(module: str) -> Dict[str, int]:
+    """Cumulative import time, in microseconds, of every module imported by `import module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    times: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=300.0)
+    parser.add_argument("--repeat", type=int, default=3, help="Keep the fastest of this many runs, to ignore a cold disk cache.")
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    times = min(runs, key=lambda run: run.get(args.module, 0))
+    total_ms = times.get(args.module, 0) / 1000
+
+    print(f"import {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print("Slowest imports (cumulative ms):")
+    for name, microseconds in sorted(times.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {microseconds / 1000:>8.1f}  {name}")
+
+    leaked = [name for name in DEFERRED_MODULES if name in times]
+    failed = False
+    if leaked:
+        print(f"❌ Imported at startup, but should be deferred to their phase: {', '.join(leaked)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"❌ Import time is over budget by {total_ms - args.budget_ms:.1f} ms.")
+        failed = True
+    if not failed:
+        print("✅ Startup imports are within budget.")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
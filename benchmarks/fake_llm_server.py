@@ -0,0 +1,131 @@
+# benchmarks/fake_llm_server.py
+"""🎭 A fake OpenAI-compatible LLM server, for exercising the LLM client offline.
+
+Answers POST /v1/chat/completions with a short canned HTML reply after a fixed
+latency (or, for prompts that ask for a JSON object, an object with the keys of
+the structure they give), and can fail every Nth request with a 503 or a 429 (with Retry-After)
+to exercise the client's retries. HTTP/1.1 keep-alive is supported, so the
+connection count it reports on exit shows whether clients reuse connections.
+
+Point a run at it with, e.g.:
+    python benchmarks/fake_llm_server.py --port 8765 --latency 0.5 --fail-every 4 &
+    OLLAMA_BASE_URL=http://127.0.0.1:8765/v1 python main.py ... --llm-mode local
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import re
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Prompts asking for JSON end with e.g. 'Return ONLY a JSON object with this structure: {"key": "..."}'.
+JSON_STRUCTURE = "Return ONLY a JSON object with this structure:"
+JSON_KEY = re.compile(r'"(\w+)":\s*(\[)?')
+
+
+def fake_answer(prompt: str, model: str) -> str:
+    """A deterministic answer to `prompt`, in the shape it asks for."""
+    digest = hashlib.md5(prompt.encode("utf-8")).hexdigest()[:8]
+    html = f"<p>Fake answer {digest} from {model}.</p>"
+    if JSON_STRUCTURE not in prompt:
+        return html
+    structure = prompt.split(JSON_STRUCTURE, 1)[1].split("\n", 1)[0]
+    return json.dumps({
+        key: [f"Task {i} {digest}" for i in range(3)] if is_list else html
+        for key, is_list in JSON_KEY.findall(structure)
+    })
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep connections alive between requests.
+    server: "FakeLLMServer"
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        number = self.server.count("requests")
+        time.sleep(self.server.latency)
+
+        if self.server.fail_every and number % self.server.fail_every == 0:
+            self.server.count("failures")
+            status = 429 if self.server.fail_with == 429 else 503
+            self._reply(status, {"error": {"message": "Injected failure", "code": status}}, {"Retry-After": "0"})
+            return
+
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        content = fake_answer(prompt, request.get("model", "?"))
+        self._reply(200, {
+            "id": f"chatcmpl-{number}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", ""),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        })
+
+    def _reply(self, status: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float, fail_every: int, fail_with: int):
+        super().__init__(address, FakeLLMHandler)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.fail_with = fail_with
+        self.counters = {"connections": 0, "requests": 0, "failures": 0}
+        self._counters = {name: itertools.count(1) for name in self.counters}
+        self._lock = threading.Lock()
+
+    def count(self, name: str) -> int:
+        with self._lock:
+            self.counters[name] = next(self._counters[name])
+            return self.counters[name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds each answer takes.")
+    parser.add_argument("--fail-every", type=int, default=0, help="Fail every Nth request (0: never).")
+    parser.add_argument("--fail-with", type=int, choices=[429, 503], default=503)
+    args = parser.parse_args()
+
+    server = FakeLLMServer((args.host, args.port), args.latency, args.fail_every, args.fail_with)
+    print(f"Fake LLM listening on http://{args.host}:{args.port}/v1", flush=True)
+    # Stopping it as a background job (kill %1) still prints the counters.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        print(", ".join(f"{name}={value}" for name, value in server.counters.items()), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,154 +3,333 @@
 strategy within a recursive RAG pipeline to generate documentation at multiple
 levels of detail.
 """
+import functools
 import logging
-import os
 import json
 import textwrap
 import html
-from typing import List, Dict, Set, Any
+from typing import Callable, List, Dict, FrozenSet, Mapping, Optional, Set, Tuple, Any
 from pathlib import Path
 from collections import defaultdict
-
-# Third-party imports
-from openai import OpenAI
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
 
 # Local imports
-from .models import CodeElement, AnalysisResult
+from .context import ContextPacker
+from .graph import ImportGraph
+from .llm_client import LLMError, complete, record_usage, usage
+from . import prompts
+from .models import ChunkFilter, CodeElement, AnalysisResult, DocsContext
 from .retriever import Retriever
-from .utils import cache_llm_call
-from .config import LOCAL_LLM_MODEL, OPENROUTER_LLM_MODEL
+from .scheduler import run_task_graph
+from .utils import cache_llm_call, estimate_tokens
+from .config import (
+    CONTEXT_TOKEN_BUDGETS, ERROR_RESPONSE_PREFIX, FILE_SUMMARY_MODES, LOCAL_LLM_MODEL, OPENROUTER_LLM_MODEL,
+    DIAGRAM_LLM_MODEL, EXAMPLES_LLM_MODEL, EXAMPLES_LLM_CONCURRENCY
+)
 
 # --- Unified, Cached LLM Interaction ---
 
+def _chat_messages(prompt: str, context: str) -> List[Dict[str, str]]:
+    """(Helper) The chat messages sent for a prompt and its context."""
+    full_prompt = f"{prompt}\n\nHere is the context to use:\n\n---\n{context}\n---"
+    return [
+        {"role": "system", "content": "You are an expert technical writer and software engineer. You generate clear, concise documentation in HTML format. You ONLY output the requested HTML, nothing else."},
+        {"role": "user", "content": full_prompt}
+    ]
+
 @cache_llm_call
-def get_llm_response(prompt: str, context: str, mode: str, model_name_for_cache: str) -> str:
+def _cached_llm_response(prompt: str, context: str, mode: str, model_name_for_cache: str) -> str:
     """
-    Sends a prompt and context to an LLM and returns the response.
-    This function is wrapped by the @cache_llm_call decorator, so results
-    are cached to disk based on the arguments.
+    (Helper) Sends a prompt and context to an LLM and returns the response.
+    Raises LLMError on failure, so the @cache_llm_call decorator, which caches
+    results to disk based on the arguments, only ever stores real answers.
     """
-    full_prompt = f"{prompt}\n\nHere is the context to use:\n\n---\n{context}\n---"
-    
-    if mode == 'openrouter':
-        load_dotenv()
-        api_key = os.getenv("OPENROUTER_API_KEY")
-        if not api_key:
-            logging.error("❌ OPENROUTER_API_KEY not found in .env file for openrouter mode.")
-            return "<p><strong>Error:</strong> OpenRouter API key not configured.</p>"
-        client = OpenAI(base_url="https://openrouter.ai/api/v1", api_key=api_key)
-    else: # Default to local Ollama
-        client = OpenAI(base_url='http://localhost:11434/v1', api_key='ollama')
+    logging.info(f"  -> Sending prompt to {mode} model ({model_name_for_cache})...")
+    return complete(mode, model_name_for_cache, messages=_chat_messages(prompt, context), temperature=0.2)
 
+def get_llm_response(prompt: str, context: str, mode: str, model_name_for_cache: str) -> str:
+    """
+    Returns the (cached) LLM response to a prompt and context. A failed call is
+    rendered as an HTML error message for the page, and retried on the next run.
+    """
+    record_usage(calls=1, prompt_tokens=sum(estimate_tokens(m["content"]) for m in _chat_messages(prompt, context)))
     try:
-        logging.info(f"  -> Sending prompt to {mode} model ({model_name_for_cache})...")
-        response = client.chat.completions.create(
-            model=model_name_for_cache,
-            messages=[
-                {"role": "system", "content": "You are an expert technical writer and software engineer. You generate clear, concise documentation in HTML format. You ONLY output the requested HTML, nothing else."},
-                {"role": "user", "content": full_prompt}
-            ],
-            temperature=0.2,
+        return _cached_llm_response(prompt=prompt, context=context, mode=mode, model_name_for_cache=model_name_for_cache)
+    except LLMError as e:
+        logging.error(f"❌ {e}")
+        return f"{ERROR_RESPONSE_PREFIX} {html.escape(str(e))}</p>"
+
+def log_llm_usage():
+    """Logs the LLM calls and prompt tokens of this run, and how many of them the model actually received."""
+    totals = usage()
+    logging.info(
+        f"🧾 LLM usage: {totals.get('calls', 0)} calls with ~{totals.get('prompt_tokens', 0):,} prompt tokens; "
+        f"{totals.get('sent_calls', 0)} sent to the model ({totals.get('sent_prompt_tokens', 0):,} prompt and "
+        f"{totals.get('completion_tokens', 0):,} completion tokens as reported), the rest answered from the cache."
+    )
+    if totals.get("context_duplicates") or totals.get("context_over_budget") or totals.get("context_truncated"):
+        logging.info(
+            f"  -> Context packing left out {totals.get('context_duplicates', 0)} duplicate and "
+            f"{totals.get('context_over_budget', 0)} over-budget pieces, and truncated {totals.get('context_truncated', 0)}."
         )
-        return response.choices[0].message.content or ""
-    except Exception as e:
-        logging.error(f"❌ Could not connect to the '{mode}' LLM service. Error: {e}")
-        return f"<p><strong>Error:</strong> Could not connect to '{mode}' LLM. Details: {e}</p>"
+    if totals.get("file_summary_fallbacks"):
+        logging.info(f"  -> {totals['file_summary_fallbacks']} files fell back to separate summary calls.")
+
+def _context_packer(kind: str, near_duplicates: bool = True) -> ContextPacker:
+    """(Helper) A packer for the context of one LLM call of `kind`, a key of CONTEXT_TOKEN_BUDGETS."""
+    return ContextPacker(CONTEXT_TOKEN_BUDGETS[kind], near_duplicates=near_duplicates)
+
+def _record_packing(packer: ContextPacker):
+    """(Helper) Adds what a packer left out to the run's usage totals."""
+    record_usage(
+        context_duplicates=packer.duplicates,
+        context_over_budget=packer.over_budget,
+        context_truncated=packer.truncated,
+    )
 
 # --- Recursive Summarization Logic ---
 
+# The kinds of the chunks the knowledge base starts with, before any summary is added.
+INITIAL_CHUNK_KINDS = frozenset({"doc", "code"})
+
+# A summarization task: ("file", path) or ("dir", path).
+SummaryTask = Tuple[str, Path]
+
+def _file_retrieval_scopes(
+    file_path: Path,
+    import_neighbours: FrozenSet[Path],
+    summarized_dependencies: FrozenSet[Path]
+) -> List[Optional[ChunkFilter]]:
+    """
+    (Helper) Context for a file comes from the file itself, then the summaries of the files
+    it imports, then its import-graph neighbours' code, then any code or docs. Only summaries
+    that are certain to exist are in scope, so the context doesn't depend on which other
+    summaries happen to have finished.
+    """
+    scopes: List[Optional[ChunkFilter]] = [ChunkFilter(paths=frozenset({file_path}))]
+    if summarized_dependencies:
+        scopes.append(ChunkFilter(kinds=frozenset({"summary"}), paths=summarized_dependencies))
+    if import_neighbours:
+        scopes.append(ChunkFilter(kinds=INITIAL_CHUNK_KINDS, paths=import_neighbours))
+    scopes.append(ChunkFilter(kinds=INITIAL_CHUNK_KINDS))
+    return scopes
+
+def _directory_retrieval_scopes(dir_path: Path) -> List[Optional[ChunkFilter]]:
+    """(Helper) Context for a directory comes from the summaries of its contents first, then any code or docs."""
+    return [ChunkFilter(kinds=frozenset({"summary"}), paths=frozenset({dir_path})), ChunkFilter(kinds=INITIAL_CHUNK_KINDS)]
+
+def _parse_file_summaries(response: str) -> Optional[Dict[str, str]]:
+    """
+    (Helper) Validates a response to the combined file prompt: a JSON object (optionally in
+    a code fence) with a non-empty string for each of the two summaries. None if it isn't.
+    """
+    cleaned_response = response.strip().replace("```json", "").replace("```", "").strip()
+    try:
+        data = json.loads(cleaned_response)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    summaries = {key: data.get(key) for key in prompts.FILE_SUMMARY_KEYS}
+    if not all(isinstance(summary, str) and summary.strip() for summary in summaries.values()):
+        return None
+    return {key: summary.strip() for key, summary in summaries.items()}
+
 def _summarize_code_file(
     file_path: Path, 
     elements_in_file: List[CodeElement], 
-    retriever: Retriever,
+    retrieved_chunks: List[str],
     llm_mode: str,
-    model_name: str
+    model_name: str,
+    file_summary_mode: str = "combined"
 ) -> Dict[str, str]:
     """
     Generates TWO summaries for a single Python file:
     1. A concise 'abstractive' summary for the recursive process.
     2. A 'detailed' summary for the final documentation page.
+    In 'combined' mode both come from one JSON response; if that doesn't validate,
+    they are requested separately, as in 'separate' mode.
     """
     class_names = [el.name for el in elements_in_file if el.type == 'class']
     function_names = [el.name for el in elements_in_file if el.type == 'function']
     
-    query = f"Detailed purpose and contents of the Python module '{file_path}'"
-    # SORT the retrieved chunks to ensure a deterministic context.
-    retrieved_chunks = sorted(retriever.retrieve(query, k=5))
+    # Pack the chunks in retrieval order, then SORT them to ensure a deterministic context.
+    packer = _context_packer("file")
+    packer.reserve(prompts.file_context(file_path, class_names, function_names, []))
+    retrieved_chunks = sorted(packer.pack(retrieved_chunks))
+    _record_packing(packer)
     
-    context = f"File Path: {file_path}\nClasses: {', '.join(class_names)}\nFunctions: {', '.join(function_names)}\nRelevant context:\n- {'\n- '.join(retrieved_chunks)}"
+    context = prompts.file_context(file_path, class_names, function_names, retrieved_chunks)
+
+    if file_summary_mode == "combined":
+        response = get_llm_response(prompt=prompts.file_combined_prompt(file_path), context=context, mode=llm_mode, model_name_for_cache=model_name)
+        summaries = _parse_file_summaries(response)
+        if summaries is not None:
+            return summaries
+        logging.warning(f"⚠️ Invalid combined summaries for '{file_path}'; requesting them separately.")
+        record_usage(file_summary_fallbacks=1)
 
-    prompt_abstractive = f"Write a very concise, one-sentence summary in an HTML `<p>` tag explaining the single primary purpose of the Python file '{file_path}'. Output only the `<p>` tag."
+    prompt_abstractive = prompts.file_abstractive_prompt(file_path)
     abstractive_summary = get_llm_response(prompt=prompt_abstractive, context=context, mode=llm_mode, model_name_for_cache=model_name)
 
-    prompt_detailed = f"""
-    You are a technical writer documenting the Python file '{file_path}'.
-    Based on the context, provide a detailed summary in HTML format. The summary should:
-    1. Start with a paragraph explaining the file's overall purpose.
-    2. If there are classes or functions, include a bulleted list (`<ul>`) of the most important ones.
-    3. For each item in the list, briefly explain its role.
-    Do not include a main `<h1>` title.
-    """
+    prompt_detailed = prompts.file_detailed_prompt(file_path)
     detailed_summary = get_llm_response(prompt=prompt_detailed, context=context, mode=llm_mode, model_name_for_cache=model_name)
     
     return {"abstractive": abstractive_summary, "detailed": detailed_summary}
 
-def _recursively_summarize_directory(
+def _collect_summary_tasks(
     dir_path: Path,
     fs_tree_node: Dict[str, Any],
+    elements_by_file: Dict[Path, List[CodeElement]],
+    prerequisites: Dict[SummaryTask, Set[SummaryTask]]
+):
+    """(Helper) Registers a task per file and directory under `dir_path`; a directory waits for its contents."""
+    children: Set[SummaryTask] = set()
+    for dir_name, dir_content in fs_tree_node.get("dirs", {}).items():
+        _collect_summary_tasks(dir_path / dir_name, dir_content, elements_by_file, prerequisites)
+        children.add(("dir", dir_path / dir_name))
+    for file_name, file_elements in fs_tree_node.get("files", {}).items():
+        elements_by_file[dir_path / file_name] = file_elements
+        children.add(("file", dir_path / file_name))
+    prerequisites[("dir", dir_path)] = children
+
+def _summarized_dependencies(
+    import_graph: ImportGraph,
+    project_root: Path,
+    summarized_files: Set[Path]
+) -> Dict[Path, FrozenSet[Path]]:
+    """
+    (Helper) For each summarized file, the summarized files it imports, excluding those in
+    its own import cycle, which can't all be summarized before each other.
+    """
+    dependencies: Dict[Path, FrozenSet[Path]] = {}
+    for file_path in summarized_files:
+        absolute_path = project_root / file_path
+        if absolute_path not in import_graph:
+            dependencies[file_path] = frozenset()
+            continue
+        cycle = import_graph.component_of(absolute_path)
+        dependencies[file_path] = frozenset(
+            dependency.relative_to(project_root)
+            for dependency in import_graph.dependencies(absolute_path)
+            if dependency not in cycle and dependency.relative_to(project_root) in summarized_files
+        )
+    return dependencies
+
+def _summarize_tree(
+    root_path: Path,
+    root_node: Dict[str, Any],
     retriever: Retriever,
     llm_mode: str,
     model_name: str,
+    import_graph: ImportGraph,
+    project_root: Path,
+    llm_concurrency: int,
+    file_summary_mode: str,
     file_summaries_collector: Dict[Path, str],
-    module_summaries_collector: Dict[Path, str] 
+    module_summaries_collector: Dict[Path, str]
 ) -> Dict[str, Any]:
     """
-    (Helper) Recursively generates summaries, processing subdirectories before files.
+    (Helper) Summarizes every file and directory under `root_path`, up to `llm_concurrency`
+    at a time, and returns the summary tree. A file starts once the files it imports have
+    been summarized and indexed (import cycles aside), and a directory once everything in
+    it has. All retriever access stays on this thread; only the LLM calls run concurrently.
     """
-    summary_node = {"summary": "", "children": {}}
-    child_summary_contexts = []
-
-    # 1. Process subdirectories first (the recursive step)
+    elements_by_file: Dict[Path, List[CodeElement]] = {}
+    prerequisites: Dict[SummaryTask, Set[SummaryTask]] = {}
+    _collect_summary_tasks(root_path, root_node, elements_by_file, prerequisites)
+    dependencies = _summarized_dependencies(import_graph, project_root, set(elements_by_file))
+    for file_path, file_dependencies in dependencies.items():
+        prerequisites[("file", file_path)] = {("file", dependency) for dependency in file_dependencies}
+
+    # The files each file imports or is imported by, relative to the project root like the elements.
+    import_neighbours = {
+        filepath.relative_to(project_root): frozenset(
+            neighbour.relative_to(project_root)
+            for neighbour in import_graph.dependencies(filepath) | import_graph.dependents(filepath)
+        )
+        for filepath in import_graph
+    }
+    # Ready directories go first, as they unblock their parents; files follow in import-graph order.
+    dependency_order = {
+        filepath.relative_to(project_root): index
+        for index, component in enumerate(import_graph.components)
+        for filepath in component
+    }
+    def priority(task: SummaryTask) -> Tuple[int, int, Path]:
+        kind, path = task
+        return (0, 0, path) if kind == "dir" else (1, dependency_order.get(path, len(dependency_order)), path)
+
+    detailed_summaries: Dict[Path, str] = {}
+
+    def start(tasks: List[SummaryTask]) -> List[Callable[[], Any]]:
+        # The context for every file starting now is retrieved in one batched search.
+        files = [path for kind, path in tasks if kind == "file"]
+        retrieved_by_file: Dict[Path, List[str]] = {}
+        if files:
+            retrieved_by_file = dict(zip(files, retriever.retrieve_many(
+                [prompts.file_query(file_path) for file_path in files],
+                k=5,
+                scopes=[
+                    _file_retrieval_scopes(file_path, import_neighbours.get(file_path, frozenset()), dependencies[file_path])
+                    for file_path in files
+                ],
+            )))
+        work = []
+        for kind, path in tasks:
+            if kind == "file":
+                logging.info(f"  -> Summarizing file: {path}")
+                work.append(functools.partial(
+                    _summarize_code_file,
+                    path, elements_by_file[path], retrieved_by_file[path], llm_mode, model_name, file_summary_mode
+                ))
+            else:
+                logging.info(f"  -> Summarizing directory: {path}")
+                packer = _context_packer("directory")
+                packer.reserve(prompts.directory_context(path, []))
+                # Pack the chunks in retrieval order, then SORT them to ensure a deterministic context.
+                retrieved_chunks = sorted(packer.pack(
+                    retriever.retrieve(prompts.directory_query(path), k=7, scopes=_directory_retrieval_scopes(path))
+                ))
+                _record_packing(packer)
+                work.append(functools.partial(
+                    get_llm_response,
+                    prompt=prompts.directory_prompt(path),
+                    context=prompts.directory_context(path, retrieved_chunks),
+                    mode=llm_mode,
+                    model_name_for_cache=model_name,
+                ))
+        return work
+
+    def finish(task: SummaryTask, result: Any):
+        kind, path = task
+        if kind == "file":
+            file_summaries_collector[path] = result["abstractive"]
+            detailed_summaries[path] = result["detailed"]
+            retriever.add_chunks([prompts.file_summary_chunk(path, result["abstractive"])], path=path)
+        else:
+            module_summaries_collector[path] = result
+            retriever.add_chunks([prompts.module_summary_chunk(path, result)], path=path)
+
+    if llm_concurrency > 1:
+        logging.info(f"  -> Running up to {llm_concurrency} summaries concurrently...")
+    run_task_graph(prerequisites, start, finish, concurrency=llm_concurrency, priority=priority)
+    return _build_summary_tree(root_path, root_node, module_summaries_collector, detailed_summaries)
+
+def _build_summary_tree(
+    dir_path: Path,
+    fs_tree_node: Dict[str, Any],
+    module_summaries: Dict[Path, str],
+    detailed_summaries: Dict[Path, str]
+) -> Dict[str, Any]:
+    """(Helper) Assembles the summary tree: subdirectories before files, each in name order."""
+    summary_node = {"summary": module_summaries.get(dir_path, ""), "children": {}}
     for dir_name, dir_content in sorted(fs_tree_node.get("dirs", {}).items()):
-        child_path = dir_path / dir_name
-        logging.info(f"  -> Descending into directory: {child_path}")
-        child_summary_node = _recursively_summarize_directory(
-            child_path, dir_content, retriever, llm_mode, model_name, 
-            file_summaries_collector, module_summaries_collector
+        summary_node["children"][dir_name] = _build_summary_tree(
+            dir_path / dir_name, dir_content, module_summaries, detailed_summaries
         )
-        summary_node["children"][dir_name] = child_summary_node
-        child_summary_contexts.append(f"Submodule '{dir_name}': {child_summary_node['summary']}")
-
-    # 2. Process files at this level second (the base case for this level)
-    for file_name, file_elements in sorted(fs_tree_node.get("files", {}).items()):
-        child_path = dir_path / file_name
-        logging.info(f"  -> Summarizing file: {child_path}")
-        
-        summaries = _summarize_code_file(child_path, file_elements, retriever, llm_mode, model_name)
-        
-        summary_node["children"][file_name] = {"summary": summaries["detailed"], "children": {}}
-        
-        abstractive_summary = summaries["abstractive"]
-        file_summaries_collector[child_path] = abstractive_summary
-        
-        child_summary_contexts.append(f"File '{file_name}': {abstractive_summary}")
-        retriever.add_chunks([f"AI-Generated Summary for file '{child_path}': {abstractive_summary}"])
-        
-    # 3. Summarize the current directory
-    if child_summary_contexts:
-        query = f"High-level summary for the Python submodule '{dir_path}'"
-        # SORT the retrieved chunks to ensure a deterministic context.
-        retrieved_chunks = sorted(retriever.retrieve(query, k=7))
-        context = f"This is submodule '{dir_path}'. Relevant context, including summaries of its contents:\n- " + "\n- ".join(retrieved_chunks)
-        prompt = f"Based on its contents' summaries, write a one-paragraph summary in an HTML `<p>` tag for the submodule '{dir_path}'. Explain its overall responsibility. Output only the `<p>` tag."
-        dir_summary = get_llm_response(prompt=prompt, context=context, mode=llm_mode, model_name_for_cache=model_name)
-        summary_node["summary"] = dir_summary
-        
-        module_summaries_collector[dir_path] = dir_summary
-
-        retriever.add_chunks([f"AI-Generated Summary for module '{dir_path}': {dir_summary}"])
-        
+    for file_name, _ in sorted(fs_tree_node.get("files", {}).items()):
+        summary_node["children"][file_name] = {"summary": detailed_summaries[dir_path / file_name], "children": {}}
     return summary_node
 
 def _format_summary_tree_to_html(summary_tree: Dict[str, Any], level: int = 0) -> str:
@@ -172,10 +351,16 @@ def generate_recursive_summary(
     retriever: Retriever, 
     readme_content: str, 
     llm_mode: str, 
-    model_name: str
+    model_name: str,
+    import_graph: ImportGraph,
+    project_root: Path,
+    llm_concurrency: int = 1,
+    file_summary_mode: str = "combined"
 ) -> tuple[str, str, Dict[Path, str], Dict[Path, str]]:
     """
-    Generates a deep, recursive summary of the entire library structure.
+    Generates a deep, recursive summary of the entire library structure,
+    making up to `llm_concurrency` LLM calls at a time. `file_summary_mode`
+    (one of FILE_SUMMARY_MODES) sets how each file's summaries are requested.
     
     Returns:
         - The final, full HTML summary for the documentation page.
@@ -206,14 +391,19 @@ def generate_recursive_summary(
     root_name = list(fs_tree["dirs"].keys())[0]
     root_node_content = fs_tree["dirs"][root_name]
     
-    summary_tree = _recursively_summarize_directory(
-        Path(root_name), root_node_content, retriever, llm_mode, model_name, 
-        file_summaries, module_summaries
+    summary_tree = _summarize_tree(
+        Path(root_name), root_node_content, retriever, llm_mode, model_name,
+        import_graph, project_root, llm_concurrency, file_summary_mode, file_summaries, module_summaries
     )
 
-    top_level_prompt = "You are a senior technical writer. Using the project's README and the overall structural summary, write a comprehensive, multi-paragraph overview of the entire library in HTML format. Start with a high-level explanation of its purpose. Then, briefly describe the role of its key submodules."
-    top_level_context = f"README:\n{readme_content}\n\nOverall structure summary:\n{summary_tree.get('summary', 'Not available.')}"
-    final_summary = get_llm_response(prompt=top_level_prompt, context=top_level_context, mode=llm_mode, model_name_for_cache=model_name)
+    # The structure summary comes first; the README fills what is left of the budget.
+    structure_summary = summary_tree.get('summary', 'Not available.')
+    packer = _context_packer("top_level")
+    packer.reserve(prompts.top_level_context("", structure_summary))
+    packed_readme = packer.add(readme_content, truncate=True) if readme_content else ""
+    _record_packing(packer)
+    top_level_context = prompts.top_level_context(packed_readme or "", structure_summary)
+    final_summary = get_llm_response(prompt=prompts.TOP_LEVEL_PROMPT, context=top_level_context, mode=llm_mode, model_name_for_cache=model_name)
     
     html_output = f"<h1>Library Overview</h1>{final_summary}"
     html_output += "<h2>Detailed Architectural Summary</h2>"
@@ -223,7 +413,7 @@ def generate_recursive_summary(
 
 
 def generate_ai_architecture_diagram(
-    import_graph: Dict[Path, Set[Path]],
+    import_graph: Mapping[Path, Set[Path]],
     top_level_summary_text: str,
     module_summaries: Dict[Path, str],
     file_summaries: Dict[Path, str],
@@ -248,100 +438,29 @@ def generate_ai_architecture_diagram(
     # Prepare context for LLM
     structure_summary = _describe_structure(hierarchy_data)
     
-    full_context = f"""
-LIBRARY OVERVIEW:
-{top_level_summary_text}
-
-DIRECTORY STRUCTURE:
-{structure_summary}
-
-IMPORT RELATIONSHIPS:
-{len(import_graph)} files with import dependencies
-
-FILE SUMMARIES:
-{_format_summaries(file_summaries, project_root, "FILE")}
-
-MODULE SUMMARIES:
-{_format_summaries(module_summaries, project_root, "MODULE")}
-"""
-
-    prompt = f"""
-You are creating an interactive D3.js library source code visualization. Generate a complete HTML page with an interactive tree diagram showing the library's architecture.
-
-**REQUIREMENTS:**
-
-1. **HTML Structure**: Complete HTML page with D3.js loaded from CDN
-2. **Interactive Tree**: Collapsible tree diagram using D3.js hierarchy layout
-3. **Node Types**: 
-   - 📁 Directories (collapsible)
-   - 🐍 Python modules (.py files)
-   - 📄 Other files (__init__.py, setup.py, etc.)
-4. **Popovers**: Interactive tooltips showing full summaries on hover
-5. **Styling**: Clean, modern design suitable for library documentation
-6. **Responsiveness**: Works on different screen sizes
-
-**TECHNICAL SPECS:**
-
-- Use D3.js v7 from CDN
-- Tree layout with smooth transitions
-- Click to expand/collapse directories
-- Hover for detailed summary popovers
-- Color coding: directories (blue), Python files (green), config files (orange)
-- Include import count badges for files with many dependencies
-- Zoom and pan functionality for large trees
-
-**DATA STRUCTURE:**
-Transform the provided summaries into a nested JSON structure where each node has:
-- name: file/directory name
-- type: "directory", "python", "config", or "other"
-- summary: the actual summary from the provided context
-- children: array of child nodes (for directories)
-- importCount: number of imports (for files)
-
-**POPOVER CONTENT:**
-- File/directory name
-- Type and purpose
-- Full summary from the provided context
-- Import count (if applicable)
-- Path information
-
-**EXAMPLE STRUCTURE:**
-```json
-{{
-  "name": "library_root",
-  "type": "directory", 
-  "summary": "Main library package",
-  "children": [
-    {{
-      "name": "core",
-      "type": "directory",
-      "summary": "Core functionality modules",
-      "children": [...]
-    }},
-    {{
-      "name": "utils.py",
-      "type": "python",
-      "summary": "Utility functions and helpers",
-      "importCount": 3
-    }}
-  ]
-}}
-```
-
-**STYLING REQUIREMENTS:**
-- Modern, clean design
-- Subtle shadows and gradients
-- Smooth animations
-- Readable typography
-- Professional color scheme
-- Responsive layout
-
-Generate the complete HTML page with embedded CSS and JavaScript. Use the actual summaries provided in the context below to populate the tree data.
-
-CONTEXT:
-{full_context}
-"""
-    response = get_llm_response(prompt=prompt, context=full_context, mode=llm_mode, model_name_for_cache=model_name)
+    # The overview and structure always go in. Module summaries come before file summaries,
+    # and shallower paths before deeper ones, until the budget is spent. Summaries of
+    # different paths are never duplicates, however alike they read.
+    packer = _context_packer("architecture", near_duplicates=False)
+    packer.reserve(prompts.architecture_context(
+        top_level_summary_text=top_level_summary_text,
+        structure_summary=structure_summary,
+        import_graph_size=len(import_graph),
+        formatted_file_summaries="",
+        formatted_module_summaries="",
+    ))
+    packed_module_summaries = _pack_summaries(packer, module_summaries, "MODULE")
+    packed_file_summaries = _pack_summaries(packer, file_summaries, "FILE")
+    _record_packing(packer)
+
+    full_context = prompts.architecture_context(
+        top_level_summary_text=top_level_summary_text,
+        structure_summary=structure_summary,
+        import_graph_size=len(import_graph),
+        formatted_file_summaries=_format_summaries(packed_file_summaries, project_root, "FILE"),
+        formatted_module_summaries=_format_summaries(packed_module_summaries, project_root, "MODULE"),
+    )
+    response = get_llm_response(prompt=prompts.ARCHITECTURE_DIAGRAM_PROMPT, context=full_context, mode=llm_mode, model_name_for_cache=model_name)
     if not response.strip():
         logging.error("❌ LLM returned an empty response for the architecture diagram.")
         return "<p><strong>Error:</strong> Could not generate architecture diagram.</p>"
@@ -425,7 +544,7 @@ def _get_file_type(path: Path) -> str:
         return "other"
 
 
-def _calculate_import_metrics(import_graph: Dict[Path, Set[Path]], project_root: Path) -> Dict[str, int]:
+def _calculate_import_metrics(import_graph: Mapping[Path, Set[Path]], project_root: Path) -> Dict[str, int]:
     """Calculate import counts for each file."""
     import_counts = {}
     for file_path, imports in import_graph.items():
@@ -448,12 +567,34 @@ def _describe_structure(hierarchy: dict, level: int = 0) -> str:
     return description
 
 
+def _format_summary(path: Path, summary: str, prefix: str) -> str:
+    """(Helper) One summary's line in the architecture context."""
+    return f'{prefix}: "{path}" - {summary}'
+
+
+def _pack_summaries(packer: ContextPacker, summaries: Dict[Path, str], prefix: str) -> Dict[Path, str]:
+    """(Helper) The summaries that fit in the packer's budget, shallowest paths first. Logs those left out."""
+    packed: Dict[Path, str] = {}
+    dropped: List[Path] = []
+    for path, summary in sorted(summaries.items(), key=lambda item: (len(item[0].parts), item[0])):
+        if packer.add(_format_summary(path, summary, prefix)) is not None:
+            packed[path] = summary
+        else:
+            dropped.append(path)
+    if dropped:
+        logging.warning(
+            f"⚠️ Left {len(dropped)} {prefix.lower()} summaries out of the architecture context "
+            f"to fit its token budget: {', '.join(map(str, dropped))}"
+        )
+    return packed
+
+
 def _format_summaries(summaries: Dict[Path, str], project_root: Path, prefix: str) -> str:
     """Format summaries for context."""
     # Use sorted() to guarantee a deterministic order for the context string.
     # We sort by the key (the Path object), which is a reliable way to order the items.
     return "\n".join([
-        f'{prefix}: "{path}" - {summary}'
+        _format_summary(path, summary, prefix)
         for path, summary in sorted(summaries.items(), key=lambda item: item[0])
     ])
 
@@ -462,10 +603,12 @@ def generate_code_examples(
     top_level_summary_text: str, 
     retriever: Retriever, 
     llm_mode: str, 
-    model_name: str
+    model_name: str,
+    concurrency: int = EXAMPLES_LLM_CONCURRENCY
 ) -> Dict[str, str]: # <<< CHANGE 1: Return type is now Dict[str, str]
     """
     Generates a series of code examples and returns them as a dictionary.
+    The examples are generated up to `concurrency` at a time.
     
     Returns:
         A dictionary where keys are the example task descriptions (e.g., "Create a basic animation")
@@ -474,12 +617,11 @@ def generate_code_examples(
     logging.info("🤖 Generating code examples based on high-level summary...")
 
     # --- Step 1: Identify realistic use cases ---
-    capability_prompt = f"""
-    Based on the following summary of a Python library, identify 5 to 7 specific, realistic tasks a user would want to accomplish.
-    Return ONLY a JSON object with this structure: {{"example_tasks": ["Specific task 1", "Specific task 2", ...]}}
-    """
+    packer = _context_packer("capability")
+    capability_context = packer.add(top_level_summary_text, truncate=True) or ""
+    _record_packing(packer)
     try:
-        capability_response = get_llm_response(prompt=capability_prompt, context=top_level_summary_text, mode=llm_mode, model_name_for_cache=model_name)
+        capability_response = get_llm_response(prompt=prompts.CAPABILITY_PROMPT, context=capability_context, mode=llm_mode, model_name_for_cache=model_name)
         cleaned_response = capability_response.strip().replace("```json", "").replace("```", "").strip()
         capability_data = json.loads(cleaned_response)
         example_topics = capability_data.get("example_tasks", [])
@@ -490,29 +632,30 @@ def generate_code_examples(
         return {"Error": f"<p>Could not automatically analyze capabilities for examples.</p>"}
 
     # --- Step 2: Generate an example for each identified task ---
-    # CHANGE 2: Create a dictionary to hold the results
-    generated_examples: Dict[str, str] = {}
-    
-    for i, topic in enumerate(example_topics, 1):
+    # The context of every task is retrieved on this thread in one batched search;
+    # only the LLM calls run concurrently.
+    task_contexts = []
+    for topic, retrieved_chunks in zip(example_topics, retriever.retrieve_many(
+        [prompts.example_query(topic) for topic in example_topics], k=10
+    )):
+        # Packed in retrieval order, then sorted.
+        packer = _context_packer("example")
+        task_contexts.append("\n- ".join(sorted(packer.pack(retrieved_chunks))))
+        _record_packing(packer)
+
+    def generate_example(i: int, topic: str, task_context: str) -> str:
         logging.info(f"  -> Generating example {i}/{len(example_topics)} for: '{topic}'...")
-        
-        # Use RAG to get relevant context for the specific task
-        task_context_chunks = sorted(retriever.retrieve(f"How to {topic} with code examples", k=10))
-        task_context = "\n- ".join(task_context_chunks)
-        
-        example_prompt = f"""
-        You are creating a code example for a Python library to demonstrate the task: "{topic}".
-        CRITICAL: Use ONLY functions, classes, and methods from the provided codebase context. The code must be self-contained and runnable.
-        Response MUST be valid HTML containing:
-        1. A `<p>` tag explaining what the code does.
-        2. A `<pre><code>` block with the well-commented Python code.
-        ONLY output this HTML content.
-        """
-        
-        example_html = get_llm_response(prompt=example_prompt, context=task_context, mode=llm_mode, model_name_for_cache=model_name)
-        
-        # CHANGE 3: Add the result to the dictionary
-        generated_examples[topic] = example_html
+        return get_llm_response(prompt=prompts.example_prompt(topic), context=task_context, mode=llm_mode, model_name_for_cache=model_name)
+
+    # The examples run concurrently, but are collected in the order of their tasks.
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        example_futures = [
+            executor.submit(generate_example, i, topic, task_context)
+            for i, (topic, task_context) in enumerate(zip(example_topics, task_contexts), 1)
+        ]
+        generated_examples: Dict[str, str] = {
+            topic: future.result() for topic, future in zip(example_topics, example_futures)
+        }
 
     logging.info("✅ All library-specific code examples generated.")
     return generated_examples
@@ -521,35 +664,53 @@ def generate_code_examples(
 
 def analyze_repo_with_rag(
     elements: List[CodeElement],
-    import_graph: Dict[Path, Set[Path]],
+    import_graph: ImportGraph,
     project_root: Path,
     readme_content: str,
-    docs_context: str,
-    llm_mode: str
+    docs_context: DocsContext,
+    llm_mode: str,
+    index_backend: str = 'flat',
+    encoder_backend: str = 'torch',
+    encoder_threads: Optional[int] = None,
+    retriever: Optional[Retriever] = None,
+    llm_concurrency: int = 1,
+    file_summary_mode: str = "combined"
 ) -> tuple[AnalysisResult, List[CodeElement]]:
-    
+    if file_summary_mode not in FILE_SUMMARY_MODES:
+        raise ValueError(f"Unknown file summary mode '{file_summary_mode}'. Choose one of: {', '.join(FILE_SUMMARY_MODES)}")
+
     model_name = OPENROUTER_LLM_MODEL if llm_mode == 'openrouter' else LOCAL_LLM_MODEL
 
-    retriever = Retriever()
-    retriever.build_initial_indexes(docs_html=docs_context, code_elements=elements)
+    # A pipelined run passes in the retriever its prefetcher already loaded and warmed up.
+    if retriever is None:
+        retriever = Retriever(index_backend=index_backend, encoder_backend=encoder_backend, encoder_threads=encoder_threads)
+    retriever.build_initial_indexes(doc_chunks=docs_context.iter_chunks(), code_elements=elements)
 
     summary, top_level_summary_text, file_summaries, module_summaries = generate_recursive_summary(
-        elements, retriever, readme_content, llm_mode, model_name
+        elements, retriever, readme_content, llm_mode, model_name, import_graph, project_root,
+        llm_concurrency, file_summary_mode
     )
 
-    architecture_diagram = generate_ai_architecture_diagram(
-        import_graph=import_graph,
-        llm_mode='openrouter',  # Claude is an OpenRouter model
-        model_name="anthropic/claude-sonnet-4",
-        top_level_summary_text=top_level_summary_text,
-        module_summaries=module_summaries,
-        file_summaries=file_summaries,
-        project_root=project_root
-    )
-    
-    examples = generate_code_examples(
-        top_level_summary_text, retriever, 'openrouter', "google/gemini-2.5-flash"  # Gemini is also OpenRouter
-    )
+    # The diagram needs only the summaries, so it is generated on its own thread while
+    # this one (which keeps all retriever access) generates the examples.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        diagram_future = executor.submit(
+            generate_ai_architecture_diagram,
+            import_graph=import_graph,
+            llm_mode='openrouter',  # Claude is an OpenRouter model
+            model_name=DIAGRAM_LLM_MODEL,
+            top_level_summary_text=top_level_summary_text,
+            module_summaries=module_summaries,
+            file_summaries=file_summaries,
+            project_root=project_root
+        )
+        examples = generate_code_examples(
+            top_level_summary_text, retriever, 'openrouter', EXAMPLES_LLM_MODEL  # Gemini is also OpenRouter
+        )
+        architecture_diagram = diagram_future.result()
+    retriever.log_stats()
+    retriever.close()
+    log_llm_usage()
     
     analysis_result = AnalysisResult(
         summary=summary,
@@ -0,0 +1,152 @@
+# conductdoc/chunking.py
+"""✂️ Splits code elements into non-overlapping, size-bounded retrieval chunks.
+
+One chunk per element embeds every method twice: once on its own and once
+inside its class. Here a class is represented by a skeleton instead (its header,
+docstring, attributes and method signatures), leaving method bodies to the
+methods' own chunks. A chunk that would still exceed the encoder's token limit,
+and so be silently truncated, is split into consecutive windows of whole lines.
+"""
+import ast
+import logging
+import re
+import textwrap
+from typing import Callable, List, Tuple, Union
+
+from . import prompts
+from .models import CodeElement
+from .utils import estimate_tokens
+
+# The max_seq_length of the default all-MiniLM-L6-v2 encoder, less its two special tokens.
+DEFAULT_MAX_TOKENS = 254
+
+# Counts the tokens of many texts in one call.
+TokenCounter = Callable[[List[str]], List[int]]
+
+
+def estimate_token_counts(texts: List[str]) -> List[int]:
+    return [estimate_tokens(text) for text in texts]
+
+
+def _first_line(node: Union[ast.stmt, ast.FunctionDef, ast.ClassDef]) -> int:
+    """(Helper) The first line of a statement, including any decorators."""
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [decorator.lineno for decorator in decorators])
+
+
+def _dedent_class_source(source: str) -> str:
+    """
+    (Helper) The source of a class as if it were at the top level. A nested class's
+    source starts at its `class` keyword, but its later lines keep their indentation.
+    """
+    first_line, newline, rest = source.partition("\n")
+    dedented = textwrap.dedent(rest)
+    if dedented == rest:  # Nothing to strip, e.g. a line of a string starts at column 0.
+        return source
+    return first_line + newline + textwrap.indent(dedented, "    ")
+
+
+def class_skeleton(source: str) -> str:
+    """
+    A class's source with the bodies of its methods and nested classes replaced by
+    `...`, since the crawler extracts those as elements of their own. Async methods,
+    which it doesn't extract, and all other statements are kept verbatim. Nested
+    classes are dedented like top-level ones.
+    """
+    for candidate in (_dedent_class_source(source), source):
+        try:
+            tree = ast.parse(candidate)
+            break
+        except SyntaxError:
+            continue
+    else:
+        return source
+    if not tree.body or not isinstance(tree.body[0], ast.ClassDef):
+        return source
+
+    class_node = tree.body[0]
+    lines = candidate.splitlines()
+    skeleton = lines[:_first_line(class_node.body[0]) - 1]
+    for statement in class_node.body:
+        start = _first_line(statement) - 1
+        is_extracted = isinstance(statement, (ast.FunctionDef, ast.ClassDef))
+        if is_extracted and statement.body[0].lineno > statement.lineno:
+            first_body_line = lines[statement.body[0].lineno - 1]
+            indentation = re.match(r"\s*", first_body_line).group()
+            skeleton.extend(lines[start:statement.body[0].lineno - 1])
+            skeleton.append(f"{indentation}...")
+        else:
+            skeleton.extend(lines[start:statement.end_lineno])
+    return "\n".join(skeleton)
+
+
+def _line_windows(lines: List[str], line_tokens: List[int], budget: int) -> List[str]:
+    """(Helper) Greedily packs consecutive lines into windows of at most `budget` tokens."""
+    windows: List[str] = []
+    current: List[str] = []
+    used = 0
+    for line, tokens in zip(lines, line_tokens):
+        if current and used + tokens > budget:
+            windows.append("\n".join(current))
+            current, used = [], 0
+        current.append(line)
+        used += tokens
+    if current:
+        windows.append("\n".join(current))
+    return windows
+
+
+def chunk_code_elements(
+    elements: List[CodeElement],
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    count_tokens: TokenCounter = estimate_token_counts,
+    log_summary: bool = True
+) -> List[Tuple[CodeElement, str]]:
+    """
+    Chunks `elements` without overlap, so that no chunk exceeds `max_tokens`
+    (unless a single line does). Returns (element, chunk) pairs, in element order.
+    Each element is chunked on its own, so chunking a corpus file by file gives
+    the same chunks as chunking it whole.
+    """
+    sources = [class_skeleton(el.source_code) if el.type == "class" else el.source_code for el in elements]
+    whole_chunks = [prompts.code_chunk(el, source) for el, source in zip(elements, sources)]
+    oversized = {i for i, tokens in enumerate(count_tokens(whole_chunks)) if tokens > max_tokens}
+
+    # Count the lines and window headers of every oversized element in one batch.
+    source_lines = {i: sources[i].splitlines() for i in sorted(oversized)}
+    headers = [prompts.code_chunk(elements[i], "", part=(1, 1)) for i in source_lines]
+    all_lines = [line for lines in source_lines.values() for line in lines]
+    line_token_counts = iter(count_tokens(all_lines))
+    header_token_counts = iter(count_tokens(headers))
+
+    chunks: List[Tuple[CodeElement, str]] = []
+    for i, (el, chunk) in enumerate(zip(elements, whole_chunks)):
+        if i not in oversized:
+            chunks.append((el, chunk))
+            continue
+        lines = source_lines[i]
+        budget = max_tokens - next(header_token_counts)
+        windows = _line_windows(lines, [next(line_token_counts) for _ in lines], budget)
+        chunks.extend(
+            (el, prompts.code_chunk(el, window, part=(number, len(windows))))
+            for number, window in enumerate(windows, start=1)
+        )
+    if not log_summary:
+        return chunks
+
+    # Report against one chunk per element, which also re-embedded every class's methods
+    # and silently truncated anything over the limit.
+    previous_tokens = [estimate_tokens(prompts.code_chunk(el)) for el in elements]
+    previous_total = sum(previous_tokens)
+    previous_truncated = sum(max(0, tokens - max_tokens) for tokens in previous_tokens)
+    new_total = sum(estimate_tokens(chunk) for _, chunk in chunks)
+    logging.info(
+        f"  -> Chunked {len(elements)} code elements into {len(chunks)} chunks "
+        f"({len(oversized)} long elements split into windows of at most {max_tokens} tokens)."
+    )
+    if previous_total:
+        logging.info(
+            f"  -> ~{new_total:,} tokens to embed instead of ~{previous_total:,} with one chunk per element "
+            f"({1 - new_total / previous_total:.0%} less, and nothing truncated instead of ~{previous_truncated:,} tokens)."
+        )
+    return chunks
@@ -19,6 +19,69 @@ DEBUG_DIR_NAME = Path(".temp")
 # The hidden directory for caching LLM responses to speed up subsequent runs.
 CACHE_DIR_NAME = Path(".cache")
 
+# The hidden directory holding the crawl manifests, one per repository, keyed by
+# repo URL or resolved local path like the mirrors. Each maps a source file's git
+# blob SHA to its extracted code elements and imports, so unchanged files are not
+# re-parsed on subsequent runs.
+CRAWL_MANIFEST_DIR_NAME = Path(".crawl_manifests")
+
+# The hidden directory caching converted documentation files, keyed by content hash.
+DOCS_CACHE_DIR_NAME = Path(".docs_cache")
+
+# The hidden directory holding persistent bare mirror clones, keyed by repo URL.
+# Each run fetches into its mirror and checks out a fresh, sparse worktree.
+MIRROR_CACHE_DIR_NAME = Path(".mirrors")
+
+# The SQLite store of chunk embeddings, keyed by (model name, chunk content hash),
+# so unchanged chunks are never re-encoded on subsequent runs.
+EMBEDDING_CACHE_PATH = Path(".embedding_cache.sqlite")
+
+# The hidden directory holding the saved FAISS snapshots of initial knowledge bases
+# (one per repo state, encoder and index backend), which later runs memory-map
+# instead of rebuilding.
+FAISS_INDEX_DIR_NAME = Path(".faiss_index")
+
+# Snapshots not used for this many days are deleted when another one is saved. Every
+# run marks the snapshot it maps as used, so no running job loses its own.
+FAISS_SNAPSHOT_MAX_AGE_DAYS = 14
+
+# Every on-disk cache, all removed by --clear-all-caches. They only save work: a run
+# without them rebuilds whatever it needs.
+CACHE_PATHS = (
+    CACHE_DIR_NAME, CRAWL_MANIFEST_DIR_NAME, DOCS_CACHE_DIR_NAME, MIRROR_CACHE_DIR_NAME,
+    EMBEDDING_CACHE_PATH, FAISS_INDEX_DIR_NAME,
+)
+
+
+# --- Retrieval Configuration ---
+# The FAISS index backends and sentence-encoder runtimes the Retriever can use. They
+# are listed here, rather than next to their implementations, so that the CLI can
+# offer them without importing faiss or torch.
+INDEX_BACKENDS = ("flat", "ivf-flat", "hnsw", "ivf-sq8", "ivf-pq")
+ENCODER_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+# Approximate index backends (IVF, HNSW, ...) are only built, and trained, once the
+# initial knowledge base has at least this many chunks. Smaller corpora use an exact
+# flat index, which is fast enough at that size.
+ANN_MIN_CORPUS_SIZE = 20_000
+
+# The number of retrieval results the Retriever memoizes, least recently used first
+# out. They are saved with the index snapshot and reused by runs that map it again.
+QUERY_CACHE_SIZE = 4096
+
+# Chunks per encoder forward pass. Larger batches amortize per-call overhead on the
+# CPU; see benchmarks/bench_encoder_backends.py for the trade-off.
+ENCODE_BATCH_SIZE = 64
+
+# In a pipelined run (--pipeline), the number of crawled files and docs files that
+# may wait for the background encoder before the crawl pauses to let it catch up.
+PREFETCH_QUEUE_SIZE = 64
+
+
+# --- Pipeline ---
+# The phases of a run, in order. `--phase` stops a run after the given one.
+PIPELINE_PHASES = ("crawl", "analyze", "generate")
+
 
 # --- Auto-detection Candidates ---
 # A prioritized list of common names for documentation source folders.
@@ -36,4 +99,68 @@ LOCAL_LLM_MODEL = "qwen2.5-coder:3b"
 # The default hosted model to use with OpenRouter.
 # Claude 3 Haiku is known for its high speed, large context window, and low cost,
 # making it an ideal choice for production-style summarization tasks.
-OPENROUTER_LLM_MODEL = "openai/gpt-4.1-nano"
\ No newline at end of file
+OPENROUTER_LLM_MODEL = "openai/gpt-4.1-nano"
+
+# The hosted models used for the architecture diagram and the code examples.
+# Both are always called through OpenRouter, regardless of --llm-mode.
+DIAGRAM_LLM_MODEL = "anthropic/claude-sonnet-4"
+EXAMPLES_LLM_MODEL = "google/gemini-2.5-flash"
+
+# The code examples of a run are generated up to this many at a time, alongside the
+# architecture diagram. Both go to OpenRouter, whose rate limit still applies.
+EXAMPLES_LLM_CONCURRENCY = 8
+
+# The OpenAI-compatible endpoints of each --llm-mode. The OPENROUTER_BASE_URL and
+# OLLAMA_BASE_URL environment variables override them (e.g. to point a run at a
+# local fake server, see benchmarks/fake_llm_server.py).
+LLM_BASE_URLS = {
+    "openrouter": "https://openrouter.ai/api/v1",
+    "local": "http://localhost:11434/v1",
+}
+
+# Seconds before a single LLM request is abandoned (and retried).
+LLM_REQUEST_TIMEOUT = 300.0
+
+# Transient failures (connection errors, timeouts, 429 and 5xx responses) are retried
+# up to this many times, with exponential backoff starting at LLM_RETRY_BASE_DELAY
+# seconds and capped at LLM_RETRY_MAX_DELAY, unless the server asks for a longer wait.
+LLM_MAX_RETRIES = 5
+LLM_RETRY_BASE_DELAY = 1.0
+LLM_RETRY_MAX_DELAY = 60.0
+
+# Requests per second allowed to each provider, as a token bucket that can also absorb
+# a burst of as many requests. None means unlimited.
+LLM_RATE_LIMITS = {
+    "openrouter": 8.0,
+    "local": None,
+}
+
+# How the two summaries of each file are requested: 'combined' asks for both in one
+# JSON response (falling back to 'separate' if it doesn't validate); 'separate' makes
+# one call for each, with the same context.
+FILE_SUMMARY_MODES = ("combined", "separate")
+
+# --- Prompt Contexts ---
+# The most tokens of context packed into each kind of LLM call, leaving room for the
+# prompt and the answer within the smallest context window in use. Lower-priority
+# pieces (later retrieved chunks, later README paragraphs, deeper file summaries)
+# are left out first.
+CONTEXT_TOKEN_BUDGETS = {
+    "file": 3000,
+    "directory": 3000,
+    "top_level": 6000,
+    "architecture": 24000,
+    "capability": 4000,
+    "example": 4000,
+}
+
+# Tokens are counted with this tiktoken encoding when tiktoken is installed.
+CONTEXT_TOKENIZER_ENCODING = "o200k_base"
+
+# A piece of context is a near-duplicate, and left out, when this share of its runs of
+# CONTEXT_SHINGLE_SIZE consecutive words already appears in the packed context.
+CONTEXT_SHINGLE_SIZE = 5
+CONTEXT_NEAR_DUPLICATE_THRESHOLD = 0.8
+
+# Failed LLM calls are rendered into the page as an HTML message starting with this.
+ERROR_RESPONSE_PREFIX = "<p><strong>Error:</strong>"
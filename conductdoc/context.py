@@ -0,0 +1,135 @@
+# conductdoc/context.py
+"""📦 Packs prompt contexts into a token budget, in priority order, without repeats.
+
+Callers offer the candidate pieces of a context (retrieved chunks, summaries,
+README paragraphs) most important first. A piece is skipped if it repeats one
+already packed, either exactly (ignoring whitespace) or nearly: when most of its
+word shingles already appear in the packed pieces, as when a retrieved chunk
+restates the file's own code. Near-duplicate detection can be turned off for
+pieces that are distinct by construction, such as the summaries of different
+files. Pieces that no longer fit in the budget are skipped too, while smaller
+ones further down the list may still fill it up.
+
+Tokens are counted with tiktoken's encoding for OpenAI-style models when it is
+installed, and estimated from the character count otherwise.
+"""
+import functools
+import hashlib
+import re
+from typing import Callable, Iterable, List, Optional, Set
+
+from .config import CONTEXT_NEAR_DUPLICATE_THRESHOLD, CONTEXT_SHINGLE_SIZE, CONTEXT_TOKENIZER_ENCODING
+from .utils import estimate_tokens
+
+_WORD = re.compile(r"\w+")
+
+
+@functools.lru_cache(maxsize=1)
+def _tiktoken_encoding():
+    """(Helper) The tiktoken encoding, or None if tiktoken or its encoding file isn't available."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(CONTEXT_TOKENIZER_ENCODING)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """The number of tokens in `text`, exact for OpenAI-style tokenizers and close for others."""
+    encoding = _tiktoken_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _shingles(text: str) -> Set[int]:
+    """(Helper) Hashes of the runs of CONTEXT_SHINGLE_SIZE consecutive words in `text`."""
+    words = _WORD.findall(text.lower())
+    if len(words) < CONTEXT_SHINGLE_SIZE:
+        return {hash(" ".join(words))} if words else set()
+    return {hash(" ".join(words[i:i + CONTEXT_SHINGLE_SIZE])) for i in range(len(words) - CONTEXT_SHINGLE_SIZE + 1)}
+
+
+class ContextPacker:
+    """
+    Fills the context of one LLM call up to `budget` tokens. Without `near_duplicates`,
+    only exact repeats are skipped.
+    """
+
+    def __init__(self, budget: int, count: Callable[[str], int] = count_tokens, near_duplicates: bool = True):
+        self.budget = budget
+        self.near_duplicates = near_duplicates
+        self.used = 0
+        self.duplicates = 0
+        self.over_budget = 0
+        self.truncated = 0
+        self._count = count
+        self._digests: Set[str] = set()
+        self._shingles: Set[int] = set()
+
+    def reserve(self, text: str):
+        """Counts fixed parts of the context (e.g. headers) against the budget, and remembers their content."""
+        self.used += self._count(text)
+        self._remember(text)
+
+    def add(self, text: str, truncate: bool = False) -> Optional[str]:
+        """
+        Packs `text` unless it repeats packed content or doesn't fit, and returns what was
+        packed (or None). With `truncate`, text that doesn't fit is cut to the whole lines that do.
+        """
+        digest = self._digest(text)
+        shingles = _shingles(text)
+        if digest in self._digests or self._is_near_duplicate(shingles):
+            self.duplicates += 1
+            return None
+        tokens = self._count(text)
+        if self.used + tokens > self.budget:
+            if truncate:
+                return self._add_truncated(text)
+            self.over_budget += 1
+            return None
+        self.used += tokens
+        self._digests.add(digest)
+        self._shingles |= shingles
+        return text
+
+    def pack(self, texts: Iterable[str]) -> List[str]:
+        """Offers `texts`, most important first, and returns those packed, in the same order."""
+        return [text for text in texts if self.add(text) is not None]
+
+    def _add_truncated(self, text: str) -> Optional[str]:
+        """(Helper) Packs the longest run of leading lines of `text` that fits in the budget left."""
+        lines = text.splitlines(keepends=True)
+        # Binary search for the most lines that fit; token counts only grow with more lines.
+        low, high = 0, len(lines)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.used + self._count("".join(lines[:middle])) <= self.budget:
+                low = middle
+            else:
+                high = middle - 1
+        if low == 0:
+            self.over_budget += 1
+            return None
+        self.truncated += 1
+        truncated = "".join(lines[:low])
+        self.used += self._count(truncated)
+        self._remember(truncated)
+        return truncated
+
+    def _remember(self, text: str):
+        """(Helper) Makes later repeats of `text` count as duplicates."""
+        self._digests.add(self._digest(text))
+        self._shingles |= _shingles(text)
+
+    def _is_near_duplicate(self, shingles: Set[int]) -> bool:
+        """(Helper) Whether most of a text's shingles have already been packed."""
+        if not self.near_duplicates or not shingles or not self._shingles:
+            return False
+        return len(shingles & self._shingles) / len(shingles) >= CONTEXT_NEAR_DUPLICATE_THRESHOLD
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        """(Helper) A whitespace-insensitive fingerprint of `text`."""
+        return hashlib.md5(" ".join(text.split()).encode("utf-8")).hexdigest()
+
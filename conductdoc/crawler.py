@@ -1,44 +1,126 @@
 # conductdoc/crawler.py
 """🕷️ This module handles all crawling and data collection tasks.
 
-- Cloning Git repositories
+- Maintaining cached mirror clones and checking out sparse worktrees
 - Finding source and doc folders
 - Parsing Python files with AST and building an import dependency graph
-- Ingesting context from text files
+- Converting documentation files into cached, chunked context
 """
 
 import ast
+import hashlib
+import json
 import logging
+import multiprocessing
+import os
 import subprocess
 import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Dict, Set, Tuple, Union
-
-# Third-party imports
-from docutils.core import publish_parts
-import markdown
+from typing import Any, Callable, FrozenSet, Iterator, List, Optional, Dict, Set, Union
 
 # Local imports
-from .models import CodeElement
-from .config import SRC_CANDIDATES, DOCS_CANDIDATES
+from .models import (
+    CodeElement, CrawlResult, DocSection, DocsContext, ImportStatement, ParsedFile, register_source_file
+)
+from .config import (
+    SRC_CANDIDATES, DOCS_CANDIDATES, CRAWL_MANIFEST_DIR_NAME, DOCS_CACHE_DIR_NAME, MIRROR_CACHE_DIR_NAME
+)
+from .graph import ImportGraph
+from .utils import log_peak_memory
 
 # A definitive set of standard library modules for robust classification.
 # Requires Python 3.10+. Falls back gracefully on older versions.
 STANDARD_LIB_MODULES = set(sys.stdlib_module_names) if hasattr(sys, 'stdlib_module_names') else set()
 
 
-def clone_repo(repo_url: str, target_dir: Path) -> None:
-    """Clones a git repository into a specified directory."""
-    logging.info(f"🚚 Cloning '{repo_url}' into '{target_dir}'...")
+def _run_git(*args: str) -> str:
+    """Runs a git command and returns its stdout, raising on failure."""
+    return subprocess.run(["git", *args], check=True, capture_output=True, text=True).stdout
+
+
+def repo_cache_key(repo: str) -> str:
+    """A short, file-name-safe key for a repo URL or resolved local path, naming its caches."""
+    return hashlib.sha1(repo.encode('utf-8')).hexdigest()[:16]
+
+
+def update_mirror(repo_url: str) -> Path:
+    """
+    Returns a persistent bare mirror of `repo_url`, creating it on first use and
+    fetching into it on every later run so only new objects are downloaded.
+    """
+    mirror_path = MIRROR_CACHE_DIR_NAME / f"{repo_cache_key(repo_url)}.git"
     try:
-        subprocess.run(
-            ["git", "clone", "--depth", "1", repo_url, str(target_dir)],
-            check=True, capture_output=True, text=True,
-        )
-        logging.info("✅ Repository cloned successfully.")
+        if (mirror_path / "HEAD").is_file():
+            logging.info(f"🔄 Fetching updates for '{repo_url}' into mirror '{mirror_path}'...")
+            _run_git("--git-dir", str(mirror_path), "fetch", "--prune", "origin")
+        else:
+            logging.info(f"🚚 Creating mirror clone of '{repo_url}' in '{mirror_path}'...")
+            MIRROR_CACHE_DIR_NAME.mkdir(exist_ok=True)
+            _run_git("clone", "--mirror", repo_url, str(mirror_path))
+        logging.info("✅ Mirror is up to date.")
     except subprocess.CalledProcessError as e:
-        logging.error(f"❌ Failed to clone repository. Git error: {e.stderr}")
+        logging.error(f"❌ Failed to update mirror. Git error: {e.stderr}")
         raise
+    return mirror_path
+
+
+def _sparse_checkout_dirs(mirror_path: Path, src_dir: Optional[str], docs_dir: Optional[str]) -> Optional[List[str]]:
+    """
+    Picks the directories a sparse worktree needs, by applying the same
+    candidate rules as `find_source_directory` to the mirror's HEAD tree.
+
+    Returns None when the source lives at the repository root, in which case
+    the whole tree is needed anyway. Top-level files such as the README are
+    always included by git's cone-mode sparse checkout.
+    """
+    if src_dir:
+        src_dirs = [src_dir]
+    else:
+        src_dirs = []
+        for candidate in SRC_CANDIDATES:
+            init_file = "__init__.py" if candidate == "." else f"{candidate}/__init__.py"
+            if _run_git("--git-dir", str(mirror_path), "ls-tree", "--name-only", "HEAD", "--", init_file).strip():
+                src_dirs = [candidate]
+                break
+    if "." in src_dirs:
+        return None
+    return src_dirs + ([docs_dir] if docs_dir else DOCS_CANDIDATES)
+
+
+@contextmanager
+def checkout_repo(repo_url: str, src_dir: Optional[str] = None, docs_dir: Optional[str] = None) -> Iterator[Path]:
+    """
+    Checks out a temporary, sparse worktree of `repo_url` from its cached mirror.
+
+    The worktree only contains the source and docs directories the pipeline
+    will read, and is removed again when the context exits.
+    """
+    mirror_path = update_mirror(repo_url)
+    # Drop bookkeeping for worktrees left behind by runs that were killed.
+    _run_git("--git-dir", str(mirror_path), "worktree", "prune")
+
+    with tempfile.TemporaryDirectory() as temp_dir_str:
+        worktree_path = Path(temp_dir_str) / "repo"
+        logging.info(f"🌱 Checking out a worktree of '{repo_url}' into '{worktree_path}'...")
+        try:
+            _run_git("--git-dir", str(mirror_path), "worktree", "add", "--detach", "--no-checkout", str(worktree_path), "HEAD")
+        except subprocess.CalledProcessError as e:
+            logging.error(f"❌ Failed to create worktree. Git error: {e.stderr}")
+            raise
+        try:
+            sparse_dirs = _sparse_checkout_dirs(mirror_path, src_dir, docs_dir)
+            if sparse_dirs is not None:
+                logging.info(f"  -> Limiting checkout to: {', '.join(sparse_dirs)}")
+                _run_git("-C", str(worktree_path), "sparse-checkout", "set", *sparse_dirs)
+            _run_git("-C", str(worktree_path), "checkout")
+            logging.info("✅ Worktree checked out successfully.")
+            yield worktree_path
+        finally:
+            _run_git("--git-dir", str(mirror_path), "worktree", "remove", "--force", str(worktree_path))
 
 
 def find_source_directory(root_path: Path) -> Optional[Path]:
@@ -66,101 +148,222 @@ def find_docs_directory(root_path: Path) -> Optional[Path]:
     return None
 
 
-def ingest_docs_context(docs_path: Path) -> str:
+def _process_pool(workers: int, **kwargs) -> ProcessPoolExecutor:
+    """
+    (Helper) A pool of `workers` processes. While other threads are running (e.g.
+    the background encoder of a pipelined run), workers are started from a fork
+    server instead of forking this process, since a child forked while another
+    thread holds a lock can deadlock.
+    """
+    if threading.active_count() > 1 and "forkserver" in multiprocessing.get_all_start_methods():
+        kwargs["mp_context"] = multiprocessing.get_context("forkserver")
+    return ProcessPoolExecutor(max_workers=workers, **kwargs)
+
+
+def _html_to_chunks(html: str) -> List[str]:
+    """Splits a converted HTML fragment into the plain-text passages worth embedding."""
+    # The document converters are imported on first use, so runs that convert no
+    # docs (or find them all cached) never pay for importing them.
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    chunks = []
+    for tag in soup.find_all(['h1', 'h2', 'h3', 'p', 'li', 'pre']):
+        text = tag.get_text(separator=' ', strip=True)
+        if len(text.split()) > 5:
+            chunks.append(text)
+    return chunks
+
+
+def _convert_doc_file(filepath: Path, docs_path: Path) -> Optional[DocSection]:
+    """
+    (Worker) Converts a single .rst or .md file to HTML and text chunks.
+
+    Results are cached on disk by content hash, so unchanged files are never
+    run through docutils or markdown again.
+    """
+    relative_path = filepath.relative_to(docs_path)
+    try:
+        content_bytes = filepath.read_bytes()
+        cache_key = hashlib.sha256(filepath.suffix.encode('utf-8') + b"\0" + content_bytes).hexdigest()
+        cache_file = DOCS_CACHE_DIR_NAME / f"{cache_key}.json"
+        if cache_file.is_file():
+            cached = json.loads(cache_file.read_text(encoding="utf-8"))
+            return DocSection(source=str(relative_path), html=cached["html"], chunks=cached["chunks"])
+
+        logging.info(f"  -> Converting '{relative_path}'...")
+        content = content_bytes.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+        file_html = ""
+        if filepath.suffix == ".rst":
+            from docutils.core import publish_parts
+            parts = publish_parts(source=content, writer_name='html', settings_overrides={'report_level': 5})
+            file_html = parts.get('html_body', '')
+        elif filepath.suffix == ".md":
+            import markdown
+            file_html = markdown.markdown(content)
+        if not file_html:
+            return None
+
+        section = DocSection(source=str(relative_path), html=file_html, chunks=_html_to_chunks(file_html))
+        # Write to a unique sibling first so concurrent workers never expose a partial file.
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        tmp_file.write_text(json.dumps({"html": section.html, "chunks": section.chunks}), encoding="utf-8")
+        tmp_file.replace(cache_file)
+        return section
+    except Exception as e:
+        logging.warning(f"⚠️ Could not process '{relative_path}': {e}")
+        return None
+
+
+def _iter_converted_docs(doc_files: List[Path], docs_path: Path, workers: int) -> Iterator[DocSection]:
+    """(Helper) Streams the converted sections of `doc_files`, in file order, from a process pool if `workers > 1`."""
+    docs_path_args = [docs_path] * len(doc_files)
+    if workers > 1:
+        chunksize = max(1, len(doc_files) // (workers * 4))
+        with _process_pool(workers) as executor:
+            results = executor.map(_convert_doc_file, doc_files, docs_path_args, chunksize=chunksize)
+            yield from (section for section in results if section is not None)
+    else:
+        results = map(_convert_doc_file, doc_files, docs_path_args)
+        yield from (section for section in results if section is not None)
+
+
+def ingest_docs_context(
+    docs_path: Path,
+    workers: int = 1,
+    on_section: Optional[Callable[[DocSection], None]] = None
+) -> DocsContext:
     """
-    Recursively finds all .rst and .md files in the docs folder, converts
-    them to HTML, and returns them as a single, labeled string of context.
+    Recursively finds all .rst and .md files in the docs folder and converts
+    each of them into HTML plus plain-text chunks for the retriever.
+
+    With `workers > 1` files are converted in a process pool. Sections keep the
+    original file order either way. `on_section`, if given, is called with each
+    section as soon as it is converted (e.g. to start embedding its chunks).
     """
     logging.info(f"📚 Ingesting and converting ALL context from '{docs_path}'...")
     doc_files = sorted(list(docs_path.rglob("*.rst"))) + sorted(list(docs_path.rglob("*.md")))
     if not doc_files:
         logging.warning("🤔 No .rst or .md files found in docs folder.")
-        return ""
+        return DocsContext()
 
-    html_context = "<h1>Full Context from Existing Documentation</h1>\n"
-    for filepath in doc_files:
-        relative_path = filepath.relative_to(docs_path)
-        logging.info(f"  -> Processing '{relative_path}'...")
-        content = filepath.read_text(encoding="utf-8", errors="ignore")
-        file_html = ""
-        try:
-            if filepath.suffix == ".rst":
-                parts = publish_parts(source=content, writer_name='html', settings_overrides={'report_level': 5})
-                file_html = parts.get('html_body', '')
-            elif filepath.suffix == ".md":
-                file_html = markdown.markdown(content)
-            
-            if file_html:
-                html_context += f'<section data-source="{relative_path}">\n'
-                html_context += f"  <h2>--- Context from: {relative_path} ---</h2>\n"
-                html_context += "  " + file_html.replace('\n', '\n  ') + "\n"
-                html_context += f"</section>\n\n"
-        except Exception as e:
-            logging.warning(f"⚠️ Could not process '{relative_path}': {e}")
-    return html_context
+    DOCS_CACHE_DIR_NAME.mkdir(exist_ok=True)
+    sections: List[DocSection] = []
+    for section in _iter_converted_docs(doc_files, docs_path, workers):
+        if on_section is not None:
+            on_section(section)
+        sections.append(section)
+
+    docs_context = DocsContext(sections=sections)
+    chunk_count = sum(len(section.chunks) for section in docs_context.sections)
+    logging.info(f"✅ Ingested {len(docs_context.sections)} docs files into {chunk_count} text chunks.")
+    return docs_context
+
+
+def _module_name_for(py_file: Path, project_root: Path) -> str:
+    """Converts a file path into its Python-style dotted module name."""
+    relative_path = py_file.relative_to(project_root)
+    module_name = str(relative_path.with_suffix('')).replace('/', '.')
+    if module_name.endswith('.__init__'):
+        module_name = module_name.removesuffix('.__init__')
+    return module_name
 
 
-def build_ast_and_module_map(src_path: Path) -> Tuple[Dict[Path, ast.AST], Dict[str, Path]]:
+# The fields through which statements nest inside other statements (function
+# and class bodies, if/else branches, try handlers, match cases, ...).
+_STATEMENT_LIST_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
+
+
+def _collect_imports(tree: ast.AST) -> List[ImportStatement]:
     """
-    Crawls a directory to build two critical maps:
-    1. A map from file paths to their parsed ASTs.
-    2. A map from Python-style module names to their file paths.
+    Extracts every raw import statement from a parsed module.
+
+    Imports are statements, so only statement lists are traversed; the much
+    larger expression subtrees are never visited.
     """
-    logging.info(f"🌳 Building AST and Module maps for library at '{src_path}'...")
-    ast_map: Dict[Path, ast.AST] = {}
-    module_map: Dict[str, Path] = {}
-    project_root = src_path.parent
+    imports: List[ImportStatement] = []
+    pending = [tree]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, ast.Import):
+            # `import a, b` is recorded as one statement per alias.
+            imports.extend(ImportStatement(alias.name, 0, ()) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append(ImportStatement(node.module, node.level, tuple(alias.name for alias in node.names)))
+        else:
+            for field_name in _STATEMENT_LIST_FIELDS:
+                pending.extend(getattr(node, field_name, ()))
+    return imports
 
-    for py_file in sorted(src_path.rglob("*.py")):
-        try:
-            relative_path = py_file.relative_to(project_root)
-            module_name = str(relative_path.with_suffix('')).replace('/', '.')
-            if module_name.endswith('.__init__'):
-                module_name = module_name.removesuffix('.__init__')
-            
-            source_code = py_file.read_text(encoding="utf-8")
-            tree = ast.parse(source_code, filename=str(py_file))
-            
-            ast_map[py_file] = tree
-            module_map[module_name] = py_file
-        except Exception as e:
-            logging.warning(f"⚠️ Could not parse '{py_file.name}': {e}")
-            
-    logging.info(f"🗺️ Maps built successfully. Parsed {len(ast_map)} files.")
-    return ast_map, module_map
+
+def _resolve_import(statement: ImportStatement, current_module_name: str, is_package: bool) -> Optional[str]:
+    """Turns a raw import statement into an absolute, dotted module name."""
+    if statement.level > 0:
+        current_module_parts = current_module_name.split('.')
+        # A package's __init__ is its own anchor for `from . import x`.
+        levels_up = statement.level - 1 if is_package else statement.level
+        # Imports from above the top-level package fail at runtime; they link to nothing.
+        if levels_up >= len(current_module_parts):
+            return None
+        base_parts = current_module_parts[:len(current_module_parts) - levels_up]
+        return ".".join(base_parts + ([statement.module] if statement.module else []))
+    return statement.module
 
 
-def build_import_graph(ast_map: Dict[Path, ast.AST], module_map: Dict[str, Path]) -> Dict[Path, Set[Path]]:
-    """Builds a dependency graph by analyzing ONLY internal import statements."""
+def _lookup_internal_module(module_name: str, module_map: Dict[str, Path]) -> Optional[Path]:
+    """
+    Finds the file for `module_name`, falling back to its longest internal
+    prefix (e.g. `pkg.mod.SomeClass` resolves to `pkg/mod.py`).
+    """
+    parts = module_name.split('.')
+    for end in range(len(parts), 0, -1):
+        dependency_path = module_map.get(".".join(parts[:end]))
+        if dependency_path is not None:
+            return dependency_path
+    return None
+
+
+def build_import_graph(
+    imports_by_file: Dict[Path, List[ImportStatement]],
+    module_map: Dict[str, Path]
+) -> ImportGraph:
+    """
+    Builds a dependency graph by analyzing ONLY internal import statements.
+
+    `from pkg import name` links to `pkg.name` when that is a submodule, and to
+    `pkg` itself otherwise.
+    """
     logging.info("🕸️  Building INTERNAL import dependency graph...")
-    import_graph: Dict[Path, Set[Path]] = {filepath: set() for filepath in ast_map.keys()}
+    edges: Dict[Path, Set[Path]] = {filepath: set() for filepath in imports_by_file.keys()}
     filepath_to_module_name = {v: k for k, v in module_map.items()}
 
-    for filepath, tree in ast_map.items():
-        for node in ast.walk(tree):
-            target_module_name = None
-            if isinstance(node, ast.Import):
-                for alias in node.names:
-                    target_module_name = alias.name
-            elif isinstance(node, ast.ImportFrom):
-                if node.level > 0:
-                    current_module_parts = filepath_to_module_name.get(filepath, "").split('.')
-                    if not current_module_parts: continue
-                    base_parts = current_module_parts[:-(node.level)]
-                    target_module_name = ".".join(base_parts + ([node.module] if node.module else []))
-                else:
-                    target_module_name = node.module
-
-            if target_module_name:
-                top_level = target_module_name.split('.')[0]
-                if top_level in STANDARD_LIB_MODULES:
-                    continue
-                if target_module_name in module_map:
-                    dependency_path = module_map[target_module_name]
-                    import_graph[filepath].add(dependency_path)
-    
-    populated_entries = sum(1 for v in import_graph.values() if v)
+    for filepath, imports in imports_by_file.items():
+        current_module_name = filepath_to_module_name.get(filepath, "")
+        is_package = filepath.name == "__init__.py"
+        for statement in imports:
+            target_module_name = _resolve_import(statement, current_module_name, is_package)
+            if not target_module_name or target_module_name.split('.')[0] in STANDARD_LIB_MODULES:
+                continue
+
+            submodule_paths = [
+                module_map[f"{target_module_name}.{name}"]
+                for name in statement.names
+                if f"{target_module_name}.{name}" in module_map
+            ]
+            if submodule_paths and len(submodule_paths) == len(statement.names):
+                # Every imported name is a submodule, so the package itself is only a side effect.
+                dependency_paths = submodule_paths
+            else:
+                dependency_path = _lookup_internal_module(target_module_name, module_map)
+                dependency_paths = submodule_paths + ([dependency_path] if dependency_path else [])
+            edges[filepath].update(path for path in dependency_paths if path != filepath)
+
+    import_graph = ImportGraph(edges)
+    populated_entries = sum(1 for v in edges.values() if v)
+    cycles = [component for component in import_graph.components if len(component) > 1]
     logging.info(f"✅ Internal import graph built. Found dependencies for {populated_entries} files.")
+    if cycles:
+        logging.info(f"  -> Found {len(cycles)} import cycles; the largest spans {max(map(len, cycles))} files.")
     return import_graph
 
 
@@ -173,6 +376,10 @@ class CodeVisitor(ast.NodeVisitor):
         self.filepath = filepath
         self.source_text = source_text
         self.elements: List[CodeElement] = []
+        # Byte offset of the start of each line, used to turn AST positions into source spans.
+        self.line_offsets = [0]
+        for line in source_text.encode("utf-8").splitlines(keepends=True):
+            self.line_offsets.append(self.line_offsets[-1] + len(line))
         # This stack keeps track of our current class context, allowing for nested classes.
         self.class_context_stack: List[str] = []
 
@@ -243,13 +450,15 @@ class CodeVisitor(ast.NodeVisitor):
         element_name = name_override if name_override else node.name
         
         try:
-            # Use the robust ast.get_source_segment to get the exact source code.
-            source_code = ast.get_source_segment(self.source_text, node)
-            if source_code is None: 
+            # Record where the source lives rather than copying it, exactly like
+            # ast.get_source_segment would slice it (AST column offsets are in UTF-8 bytes).
+            if node.end_lineno is None or node.end_col_offset is None:
                 raise ValueError("Could not get source segment from AST node.")
+            start = self.line_offsets[node.lineno - 1] + node.col_offset
+            end = self.line_offsets[node.end_lineno - 1] + node.end_col_offset
                 
             docstring = ast.get_docstring(node, clean=True) or ""
-            end_lineno = node.end_lineno if hasattr(node, 'end_lineno') and node.end_lineno is not None else node.lineno
+            end_lineno = node.end_lineno
 
             self.elements.append(CodeElement(
                 name=element_name,
@@ -257,39 +466,245 @@ class CodeVisitor(ast.NodeVisitor):
                 filepath=self.filepath,
                 lineno_start=node.lineno,
                 lineno_end=end_lineno,
-                source_code=source_code,
                 docstring=docstring,
+                source_span=(start, end - start),
             ))
         except Exception as e:
             logging.warning(f"⚠️ Could not extract element '{element_name}' in {self.filepath}: {e}")
 
-def crawl_source_code(src_path: Path) -> tuple[
-    List[CodeElement], 
-    Dict[Path, Set[Path]], 
-    Dict[Path, ast.AST], 
-    Dict[str, Path]
-]:
-    """The main crawling function that orchestrates all data collection."""
+def _git_blob_sha(data: bytes) -> str:
+    """Hashes file content exactly like `git hash-object`, so keys match git's blob SHAs."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _decode_source(data: bytes) -> str:
+    """Decodes raw file bytes the same way `Path.read_text` does (UTF-8, universal newlines)."""
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+class CrawlManifest:
+    """
+    A persistent record of previously crawled files, keyed by git blob SHA.
+
+    Entries are content-addressed and path-independent: elements are stored
+    without their file path, which is re-attached when an entry is restored.
+    Sources are stored as byte spans, which stay valid because the file's
+    content is unchanged by definition.
+    Each repository has its own manifest file, and only entries seen during the
+    current run are written back, so a manifest never grows beyond the size of
+    its repository and runs on other repositories leave it alone.
+    """
+    VERSION = 2
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._previous: Dict[str, Dict[str, Any]] = {}
+        self._current: Dict[str, Dict[str, Any]] = {}
+        if path.is_file():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if data.get("version") == self.VERSION:
+                    self._previous = data["files"]
+            except (json.JSONDecodeError, KeyError) as e:
+                logging.warning(f"⚠️ Ignoring unreadable crawl manifest '{path}': {e}")
+
+    @property
+    def blob_shas(self) -> FrozenSet[str]:
+        return frozenset(self._previous)
+
+    def restore(self, parsed: ParsedFile, project_root: Path) -> ParsedFile:
+        """Fills in the elements and imports of a file that was unchanged since the last run."""
+        entry = self._previous[parsed.blob_sha]
+        relative_filepath = parsed.filepath.relative_to(project_root)
+        parsed.elements = [CodeElement(filepath=relative_filepath, **fields) for fields in entry["elements"]]
+        parsed.imports = [ImportStatement(module, level, tuple(names)) for module, level, names in entry["imports"]]
+        return parsed
+
+    def record(self, parsed: ParsedFile):
+        self._current[parsed.blob_sha] = {
+            "elements": [
+                {
+                    "name": el.name,
+                    "type": el.type,
+                    "lineno_start": el.lineno_start,
+                    "lineno_end": el.lineno_end,
+                    "docstring": el.docstring,
+                    "source_span": el.source_span,
+                }
+                for el in parsed.elements
+            ],
+            "imports": [list(statement) for statement in parsed.imports],
+        }
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a sibling file first so an interrupted run can't leave a truncated manifest.
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"version": self.VERSION, "files": self._current}), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+
+# Blob SHAs already present in the crawl manifest, set per process by `_init_crawl_worker`.
+_manifest_blob_shas: FrozenSet[str] = frozenset()
+
+
+def _init_crawl_worker(manifest_blob_shas: FrozenSet[str]):
+    global _manifest_blob_shas
+    _manifest_blob_shas = manifest_blob_shas
+
+
+def _extract_elements(tree: ast.AST, source_text: str, relative_filepath: Path) -> List[CodeElement]:
+    """Runs the CodeVisitor over a parsed module and returns its code elements."""
+    visitor = CodeVisitor(filepath=relative_filepath, source_text=source_text)
+    visitor.visit(tree)
+    return visitor.elements
+
+
+def _crawl_file(py_file: Path, project_root: Path, keep_ast: bool = False) -> Optional[ParsedFile]:
+    """
+    (Worker) Reads and parses a single file exactly once, then extracts its code
+    elements and raw imports.
+
+    Only compact, picklable data is returned so that results can be shipped
+    cheaply back from a worker process. The AST is dropped as soon as the file
+    has been visited unless `keep_ast` is set. Files whose blob SHA is already
+    in the crawl manifest are not parsed at all; the main process restores them.
+    """
+    try:
+        source_bytes = py_file.read_bytes()
+    except OSError as e:
+        logging.warning(f"⚠️ Could not read '{py_file.name}': {e}")
+        return None
+
+    blob_sha = _git_blob_sha(source_bytes)
+    module_name = _module_name_for(py_file, project_root)
+    if blob_sha in _manifest_blob_shas:
+        return ParsedFile(
+            filepath=py_file, module_name=module_name, elements=[], imports=[],
+            blob_sha=blob_sha, from_manifest=True,
+        )
+
+    try:
+        source_text = _decode_source(source_bytes)
+        tree = ast.parse(source_text, filename=str(py_file))
+    except Exception as e:
+        logging.warning(f"⚠️ Could not parse '{py_file.name}': {e}")
+        return None
+
+    try:
+        elements = _extract_elements(tree, source_text, py_file.relative_to(project_root))
+    except Exception as e:
+        logging.error(f"💥 Failed to process file '{py_file.name}': {e}")
+        elements = []
+
+    return ParsedFile(
+        filepath=py_file,
+        module_name=module_name,
+        elements=elements,
+        imports=_collect_imports(tree),
+        tree=tree if keep_ast else None,
+        blob_sha=blob_sha,
+    )
+
+
+def _iter_crawled_files(
+    py_files: List[Path],
+    project_root: Path,
+    workers: int,
+    keep_asts: bool,
+    manifest_blob_shas: FrozenSet[str]
+) -> Iterator[ParsedFile]:
+    """
+    Streams per-file crawl results, either in-process or from a process pool.
+
+    `Executor.map` yields results in submission order, so the parallel stream is
+    ordered exactly like the serial one regardless of which worker finishes first.
+    """
+    keep_ast_args = [keep_asts] * len(py_files)
+    project_root_args = [project_root] * len(py_files)
+    if workers > 1:
+        chunksize = max(1, len(py_files) // (workers * 4))
+        with _process_pool(workers, initializer=_init_crawl_worker, initargs=(manifest_blob_shas,)) as executor:
+            results = executor.map(_crawl_file, py_files, project_root_args, keep_ast_args, chunksize=chunksize)
+            yield from (parsed for parsed in results if parsed is not None)
+    else:
+        _init_crawl_worker(manifest_blob_shas)
+        results = map(_crawl_file, py_files, project_root_args, keep_ast_args)
+        yield from (parsed for parsed in results if parsed is not None)
+
+
+def crawl_source_code(
+    src_path: Path,
+    workers: int = 1,
+    keep_asts: bool = False,
+    incremental: bool = True,
+    on_elements: Optional[Callable[[List[CodeElement]], None]] = None,
+    repo_key: Optional[str] = None
+) -> CrawlResult:
+    """
+    The main crawling function that orchestrates all data collection.
+
+    Files are streamed through a read-once pipeline: each one is read, parsed,
+    visited and then its tree is discarded, so only the extracted elements and
+    imports stay in memory. The returned AST map is only populated when
+    `keep_asts` is set (e.g. for `--save-debug-data`).
+
+    With `incremental` set, files whose content is unchanged since the last
+    run are restored from the crawl manifest instead of being re-parsed. The
+    manifest holds no ASTs, so `keep_asts` always re-parses every file. The
+    manifest is the one of `repo_key` (a repo URL or resolved local path),
+    which defaults to the resolved `src_path`.
+
+    `on_elements`, if given, is called with the elements of each file as soon
+    as the file is crawled (e.g. to start embedding them).
+    """
     logging.info(f"🐍 Starting source code crawl in '{src_path}'...")
-    
-    ast_map, module_map = build_ast_and_module_map(src_path)
-    import_graph = build_import_graph(ast_map, module_map)
+    project_root = src_path.parent
+    py_files = sorted(src_path.rglob("*.py"))
+    if workers > 1:
+        logging.info(f"⚡ Crawling {len(py_files)} files with {workers} worker processes...")
 
     all_elements: List[CodeElement] = []
-    logging.info(f"🌿 Visiting {len(ast_map)} parsed files to extract code elements...")
-    for filepath, tree in ast_map.items():
-        try:
-            source_text = filepath.read_text(encoding="utf-8")
-            # Add parent pointers to the tree for more advanced analysis
-            for node in ast.walk(tree):
-                for child in ast.iter_child_nodes(node):
-                    setattr(child, 'parent', node)
-            relative_filepath = filepath.relative_to(src_path.parent)
-            visitor = CodeVisitor(filepath=relative_filepath, source_text=source_text)
-            visitor.visit(tree)
-            all_elements.extend(visitor.elements)
-        except Exception as e:
-            logging.error(f"💥 Failed to process file '{filepath.name}': {e}")
+    ast_map: Dict[Path, ast.AST] = {}
+    module_map: Dict[str, Path] = {}
+    imports_by_file: Dict[Path, List[ImportStatement]] = {}
+
+    repo_key = repo_cache_key(repo_key or str(src_path.resolve()))
+    manifest = CrawlManifest(CRAWL_MANIFEST_DIR_NAME / f"{repo_key}.json")
+    previous_blob_shas = manifest.blob_shas
+    reusable_blob_shas = previous_blob_shas if incremental and not keep_asts else frozenset()
+    reused_count = 0
+    unchanged_files: Set[Path] = set()
+
+    for parsed in _iter_crawled_files(py_files, project_root, workers, keep_asts, reusable_blob_shas):
+        if parsed.from_manifest:
+            parsed = manifest.restore(parsed, project_root)
+            reused_count += 1
+        if parsed.blob_sha in previous_blob_shas:
+            unchanged_files.add(parsed.filepath)
+        manifest.record(parsed)
+        register_source_file(parsed.filepath.relative_to(project_root), parsed.filepath)
+        module_map[parsed.module_name] = parsed.filepath
+        imports_by_file[parsed.filepath] = parsed.imports
+        all_elements.extend(parsed.elements)
+        if on_elements is not None and parsed.elements:
+            on_elements(parsed.elements)
+        if parsed.tree is not None:
+            ast_map[parsed.filepath] = parsed.tree
+
+    manifest.save()
+    logging.info(
+        f"♻️ Crawl manifest: reused {reused_count} unchanged files, "
+        f"re-parsed {len(module_map) - reused_count} of {len(py_files)} files."
+    )
+    import_graph = build_import_graph(imports_by_file, module_map)
             
     logging.info(f"✅ Crawl complete. Found {len(all_elements)} code elements and built import graph.")
-    return all_elements, import_graph, ast_map, module_map
\ No newline at end of file
+    log_peak_memory("crawl")
+    return CrawlResult(
+        elements=all_elements,
+        import_graph=import_graph,
+        ast_map=ast_map,
+        module_map=module_map,
+        unchanged_files=unchanged_files,
+    )
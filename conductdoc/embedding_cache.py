@@ -0,0 +1,59 @@
+# conductdoc/embedding_cache.py
+"""💽 A persistent, on-disk cache of chunk embeddings.
+
+Embeddings are stored in SQLite, keyed by (model name, SHA-256 of the chunk
+text), so a chunk that hasn't changed since a previous run is never re-encoded.
+"""
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+
+def chunk_hash(chunk: str) -> str:
+    """The content key of a chunk."""
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Maps chunk content hashes to float32 embedding vectors for one model."""
+
+    def __init__(self, path: Path, model_name: str):
+        self.model_name = model_name
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, chunk_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, chunk_hash))"
+        )
+        self._connection.commit()
+
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Returns the cached vectors for whichever of `hashes` are present."""
+        found: Dict[str, np.ndarray] = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+        # Stay well below SQLite's limit on the number of bound parameters.
+        for start in range(0, len(unique_hashes), 500):
+            batch = unique_hashes[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._connection.execute(
+                f"SELECT chunk_hash, vector FROM embeddings WHERE model = ? AND chunk_hash IN ({placeholders})",
+                [self.model_name, *batch],
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, hashes: List[str], vectors: np.ndarray):
+        """Stores one vector per hash, in a single transaction."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, chunk_hash, vector) VALUES (?, ?, ?)",
+                [(self.model_name, key, vector.tobytes()) for key, vector in zip(hashes, vectors)],
+            )
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,62 @@
+# conductdoc/encoders.py
+"""⚡ Sentence-encoder backends for the Retriever.
+
+All backends run the same model, so they produce (near-)identical embeddings:
+
+- `torch`: full-precision PyTorch, the default.
+- `torch-int8`: PyTorch with the weights of every linear layer dynamically
+  quantized to int8, which speeds up CPU inference and needs no extra packages.
+- `onnx` / `onnx-int8`: ONNX Runtime, with the model's exported graph in full
+  precision or its int8 (AVX2) quantization. These need the optional
+  `sentence-transformers[onnx]` dependencies.
+
+Quantized embeddings differ slightly from full-precision ones, so every backend
+other than `torch` gets its own embedding cache and snapshot key.
+"""
+import logging
+import warnings
+from typing import Optional
+
+import torch
+from sentence_transformers import SentenceTransformer
+
+from .config import ENCODER_BACKENDS
+
+# The int8 ONNX graph published with the sentence-transformers models. The AVX2
+# variant runs on any x86-64 CPU from the last decade.
+ONNX_INT8_FILE_NAME = "onnx/model_quint8_avx2.onnx"
+
+
+def encoder_key(model_name: str, backend: str) -> str:
+    """The name embeddings of `model_name` are cached under when encoded by `backend`."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def load_encoder(model_name: str, backend: str = "torch", threads: Optional[int] = None) -> SentenceTransformer:
+    """Loads `model_name` for CPU inference with the given backend, using `threads` threads if set."""
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}'. Choose one of: {', '.join(ENCODER_BACKENDS)}")
+    logging.info(f"  -> Loading sentence-transformer model '{model_name}' ({backend} backend)...")
+
+    if backend.startswith("onnx"):
+        import onnxruntime
+
+        session_options = onnxruntime.SessionOptions()
+        if threads:
+            session_options.intra_op_num_threads = threads
+        model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+        if backend == "onnx-int8":
+            model_kwargs["file_name"] = ONNX_INT8_FILE_NAME
+        return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    if threads:
+        torch.set_num_threads(threads)
+    # Dynamically quantized layers only run on the CPU.
+    model = SentenceTransformer(model_name, device="cpu" if backend == "torch-int8" else None)
+    if backend == "torch-int8":
+        # Eager-mode dynamic quantization is deprecated in favour of torchao, but remains
+        # the only int8 path that needs no extra dependency.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
@@ -0,0 +1,123 @@
+# conductdoc/graph.py
+"""🕸️ An indexed view of the internal import graph.
+
+Besides the forward "file -> files it imports" edges, the index keeps reverse
+edges and the graph's strongly-connected components (import cycles), so
+"who depends on this file" and "what must be processed first" are cheap
+lookups instead of full scans of the graph.
+"""
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterator, List, Mapping, Set
+
+
+class ImportGraph(Mapping[Path, Set[Path]]):
+    """
+    A read-only mapping from each file to the internal files it imports,
+    with precomputed reverse edges and strongly-connected components.
+    """
+    def __init__(self, edges: Dict[Path, Set[Path]]):
+        self._forward = edges
+        self._reverse: Dict[Path, Set[Path]] = {filepath: set() for filepath in edges}
+        for filepath, dependencies in edges.items():
+            for dependency in dependencies:
+                self._reverse.setdefault(dependency, set()).add(filepath)
+
+        self._components = self._strongly_connected_components()
+        self._component_index: Dict[Path, int] = {
+            filepath: index
+            for index, component in enumerate(self._components)
+            for filepath in component
+        }
+
+    # --- Mapping interface (forward edges) ---
+
+    def __getitem__(self, filepath: Path) -> Set[Path]:
+        return self._forward[filepath]
+
+    def __iter__(self) -> Iterator[Path]:
+        return iter(self._forward)
+
+    def __len__(self) -> int:
+        return len(self._forward)
+
+    # --- Queries ---
+
+    def dependencies(self, filepath: Path) -> Set[Path]:
+        """The files that `filepath` imports directly."""
+        return self._forward.get(filepath, set())
+
+    def dependents(self, filepath: Path) -> Set[Path]:
+        """The files that import `filepath` directly."""
+        return self._reverse.get(filepath, set())
+
+    def transitive_dependents(self, filepath: Path) -> Set[Path]:
+        """Every file that depends on `filepath`, directly or indirectly."""
+        seen: Set[Path] = set()
+        pending = list(self.dependents(filepath))
+        while pending:
+            current = pending.pop()
+            if current not in seen:
+                seen.add(current)
+                pending.extend(self.dependents(current))
+        return seen
+
+    @property
+    def components(self) -> List[FrozenSet[Path]]:
+        """
+        The strongly-connected components, in dependency order: every component
+        appears after all the components it imports from.
+        """
+        return self._components
+
+    def component_of(self, filepath: Path) -> FrozenSet[Path]:
+        """The import cycle containing `filepath` (just the file itself if it's in none)."""
+        return self._components[self._component_index[filepath]]
+
+    def _strongly_connected_components(self) -> List[FrozenSet[Path]]:
+        """
+        (Helper) An iterative version of Tarjan's algorithm.
+
+        Tarjan emits a component only after every component reachable from it,
+        which for "imports" edges is exactly dependency order. Nodes and edges
+        are visited in sorted order so the result is deterministic.
+        """
+        index_of: Dict[Path, int] = {}
+        lowlink: Dict[Path, int] = {}
+        on_stack: Set[Path] = set()
+        stack: List[Path] = []
+        components: List[FrozenSet[Path]] = []
+
+        for root in sorted(self._reverse):
+            if root in index_of:
+                continue
+            # Each frame is a node plus an iterator over its remaining successors.
+            work = [(root, iter(sorted(self.dependencies(root))))]
+            index_of[root] = lowlink[root] = len(index_of)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, successors = work[-1]
+                for successor in successors:
+                    if successor not in index_of:
+                        index_of[successor] = lowlink[successor] = len(index_of)
+                        stack.append(successor)
+                        on_stack.add(successor)
+                        work.append((successor, iter(sorted(self.dependencies(successor)))))
+                        break
+                    if successor in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[successor])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index_of[node]:
+                        component = set()
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.add(member)
+                            if member == node:
+                                break
+                        components.append(frozenset(component))
+        return components
@@ -0,0 +1,78 @@
+# conductdoc/indexes.py
+"""🗂️ FAISS index backends for the Retriever's knowledge base.
+
+`flat` is an exact brute-force scan. The approximate (ANN) backends trade a
+little recall for sub-linear query time (`ivf-flat`, `hnsw`) or for a smaller
+memory footprint (`ivf-sq8`, `ivf-pq`). Below `ANN_MIN_CORPUS_SIZE` vectors a
+flat scan is both exact and fast enough, so every backend falls back to it and
+training only happens once the corpus is large enough to be worth it.
+"""
+import logging
+import math
+
+import faiss
+import numpy as np
+
+from .config import ANN_MIN_CORPUS_SIZE, INDEX_BACKENDS
+
+# Search-time parameters. They are stored in the saved index, so they survive a reload.
+HNSW_NEIGHBORS = 32
+HNSW_EF_SEARCH = 64
+IVF_NPROBE_FRACTION = 1 / 16
+# IVF training uses at most this many points per centroid.
+IVF_TRAINING_POINTS_PER_LIST = 64
+
+
+def _ivf_list_count(corpus_size: int) -> int:
+    """~4·sqrt(n) inverted lists, with at least the 39 training points per list FAISS asks for."""
+    return max(1, min(int(4 * math.sqrt(corpus_size)), corpus_size // 39))
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    """The number of 8-bit PQ sub-vectors: about one per 8 dimensions, dividing `dimension`."""
+    target = max(1, dimension // 8)
+    return max(m for m in range(1, target + 1) if dimension % m == 0)
+
+
+def _factory_string(backend: str, corpus_size: int, dimension: int) -> str:
+    nlist = _ivf_list_count(corpus_size)
+    return {
+        "flat": "Flat",
+        "ivf-flat": f"IVF{nlist},Flat",
+        "hnsw": f"HNSW{HNSW_NEIGHBORS},Flat",
+        "ivf-sq8": f"IVF{nlist},SQ8",
+        "ivf-pq": f"IVF{nlist},PQ{_pq_subquantizers(dimension)}",
+    }[backend]
+
+
+def effective_backend(backend: str, corpus_size: int) -> str:
+    """The backend actually used for a corpus of `corpus_size` vectors."""
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend '{backend}'. Choose one of: {', '.join(INDEX_BACKENDS)}")
+    return backend if corpus_size >= ANN_MIN_CORPUS_SIZE else "flat"
+
+
+def build_index(backend: str, embeddings: np.ndarray) -> faiss.Index:
+    """Builds (training it if needed) an L2 index of the given backend over `embeddings`."""
+    corpus_size, dimension = embeddings.shape
+    chosen = effective_backend(backend, corpus_size)
+    if chosen != backend:
+        logging.info(f"  -> Corpus of {corpus_size} chunks is below {ANN_MIN_CORPUS_SIZE}; using a flat index instead of '{backend}'.")
+
+    spec = _factory_string(chosen, corpus_size, dimension)
+    index = faiss.index_factory(dimension, spec, faiss.METRIC_L2)
+    if not index.is_trained:
+        nlist = faiss.extract_index_ivf(index).nlist
+        sample_size = min(corpus_size, nlist * IVF_TRAINING_POINTS_PER_LIST)
+        # A fixed seed keeps the trained index, and therefore retrieval, deterministic.
+        sample = np.random.default_rng(0).choice(corpus_size, size=sample_size, replace=False)
+        logging.info(f"  -> Training '{spec}' index on {sample_size} of {corpus_size} vectors...")
+        index.train(embeddings[np.sort(sample)])
+    index.add(embeddings)
+
+    if chosen.startswith("ivf"):
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = max(1, round(ivf.nlist * IVF_NPROBE_FRACTION))
+    elif chosen == "hnsw":
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
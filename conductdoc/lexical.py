@@ -0,0 +1,147 @@
+# conductdoc/lexical.py
+"""🔤 A BM25 inverted index over identifiers, paths and words in knowledge-base chunks.
+
+Dense embeddings are good at meaning but poor at exact names: "email/mime/text.py"
+or "parse_headers" are just more tokens to a sentence encoder. The lexical index
+keeps every identifier and path both whole and split into its parts (dotted or
+slashed components, snake_case and CamelCase words), so an exact symbol in a
+query finds the chunks that define or mention it. Such compound names are far
+more specific than any single word, so in queries they weigh more, and a chunk
+containing one is reported as an exact hit.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# An identifier, optionally a dotted or slashed chain of them (a module or file path).
+_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:[./][A-Za-z_][A-Za-z0-9_]*)*")
+_COMPONENT_SPLIT_RE = re.compile(r"[./]")
+_WORD_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+# Terms in more than this fraction of chunks carry almost no BM25 weight, and skipping
+# them avoids walking the longest posting lists for every query.
+MAX_DOCUMENT_FREQUENCY = 0.5
+
+# The query-side weight of a compound identifier or path, relative to a plain word.
+COMPOUND_TERM_WEIGHT = 3.0
+
+
+class LexicalHit(NamedTuple):
+    chunk_id: int
+    score: float
+    # Whether the chunk contains one of the query's compound identifiers or paths verbatim.
+    exact: bool
+
+
+def _split_identifier(token: str) -> List[str]:
+    """(Helper) The components and words of an identifier or path, excluding the token itself."""
+    parts = []
+    components = _COMPONENT_SPLIT_RE.split(token)
+    for component in components:
+        if len(components) > 1:
+            parts.append(component.lower())
+        words = _WORD_RE.findall(component)
+        if len(words) > 1:
+            parts.extend(word.lower() for word in words)
+    return parts
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms: each identifier or path whole, plus its components and words."""
+    terms = []
+    for token in _TOKEN_RE.findall(text):
+        terms.append(token.lower())
+        terms.extend(_split_identifier(token))
+    return terms
+
+
+def _query_terms(query: str) -> Dict[str, Tuple[float, bool]]:
+    """(Helper) Each distinct query term, with its weight and whether it is a compound name."""
+    terms: Dict[str, Tuple[float, bool]] = {}
+    for token in _TOKEN_RE.findall(query):
+        parts = _split_identifier(token)
+        if parts:
+            terms[token.lower()] = (COMPOUND_TERM_WEIGHT, True)
+        for term in [token.lower()] + parts:
+            terms.setdefault(term, (1.0, False))
+    return terms
+
+
+class LexicalIndex:
+    """Okapi BM25 over chunks numbered in the order they are added."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._lengths: List[int] = []
+        self._total_length = 0
+        # Corpus statistics fixed by `freeze_statistics`: chunk count, total length and document frequencies.
+        self._frozen_counts: Optional[Tuple[int, int]] = None
+        self._frozen_document_frequencies: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, texts: Iterable[str]):
+        for text in texts:
+            chunk_id = len(self._lengths)
+            term_counts = Counter(tokenize(text))
+            for term, count in term_counts.items():
+                self._postings[term].append((chunk_id, count))
+            length = sum(term_counts.values())
+            self._lengths.append(length)
+            self._total_length += length
+
+    def freeze_statistics(self):
+        """
+        Fixes the corpus statistics BM25 weighs terms by to those of the chunks added
+        so far. A chunk's score then no longer depends on which chunks were added
+        after it, or in what order.
+        """
+        self._frozen_counts = (len(self._lengths), self._total_length)
+        self._frozen_document_frequencies = {term: len(postings) for term, postings in self._postings.items()}
+
+    def _document_frequency(self, term: str) -> int:
+        if self._frozen_counts is not None:
+            return self._frozen_document_frequencies.get(term, 0)
+        return len(self._postings.get(term, ()))
+
+    def _idf(self, chunk_count: int, document_frequency: int) -> float:
+        return math.log(1 + (chunk_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        ids: Optional[Set[int]] = None,
+        tie_break: Callable[[int], Any] = lambda chunk_id: chunk_id
+    ) -> List[LexicalHit]:
+        """
+        The `k` best-matching chunks, only among `ids` if given, best first. Equal
+        scores are ordered by `tie_break`, e.g. the chunk's text, so that the order
+        chunks were added in doesn't decide which of them make the cut.
+        """
+        if not self._lengths:
+            return []
+        chunk_count, total_length = self._frozen_counts or (len(self._lengths), self._total_length)
+        average_length = total_length / max(1, chunk_count)
+        scores: Dict[int, float] = defaultdict(float)
+        exact: Set[int] = set()
+        for term, (weight, is_compound) in _query_terms(query).items():
+            postings = self._postings.get(term)
+            document_frequency = self._document_frequency(term)
+            if not postings or document_frequency > MAX_DOCUMENT_FREQUENCY * chunk_count:
+                continue
+            idf = self._idf(chunk_count, document_frequency)
+            for chunk_id, count in postings:
+                if ids is not None and chunk_id not in ids:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                scores[chunk_id] += weight * idf * count * (self.k1 + 1) / (count + norm)
+                if is_compound:
+                    exact.add(chunk_id)
+        best = heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], tie_break(item[0])))
+        return [LexicalHit(chunk_id, score, chunk_id in exact) for chunk_id, score in best]
@@ -0,0 +1,153 @@
+# conductdoc/llm_client.py
+"""🔌 Shared, rate-limited and retrying access to the OpenAI-compatible LLM services.
+
+One client is created per (mode, base URL) and reused for every call, so its
+HTTP connections are kept alive and pooled across prompts and threads. Every
+request first takes a token from its provider's bucket. Transient failures are
+retried with exponential backoff and jitter. Anything that still fails raises
+`LLMError`, so that callers (and the response cache) can tell a failure apart
+from an answer.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import openai
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from .config import (
+    LLM_BASE_URLS, LLM_MAX_RETRIES, LLM_RATE_LIMITS, LLM_REQUEST_TIMEOUT, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY
+)
+
+# The errors worth retrying: the request may well succeed a moment later.
+_TRANSIENT_ERRORS = (
+    openai.APIConnectionError,  # Includes timeouts.
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class LLMError(Exception):
+    """An LLM request that failed for good: misconfigured, rejected, or out of retries."""
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, and bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then takes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_clients: Dict[Tuple[str, str], OpenAI] = {}
+_buckets: Dict[str, TokenBucket] = {}
+_usage: Counter = Counter()
+_lock = threading.Lock()
+
+
+def record_usage(**counts: int):
+    """Adds to this process's running LLM usage totals (e.g. calls=1, prompt_tokens=...)."""
+    with _lock:
+        _usage.update(counts)
+
+
+def usage() -> Dict[str, int]:
+    """A snapshot of this process's LLM usage totals."""
+    with _lock:
+        return dict(_usage)
+
+
+def _base_url(mode: str) -> str:
+    """(Helper) The endpoint of `mode`, overridable through the environment."""
+    variable = "OPENROUTER_BASE_URL" if mode == "openrouter" else "OLLAMA_BASE_URL"
+    return os.getenv(variable, LLM_BASE_URLS[mode])
+
+
+def get_client(mode: str) -> OpenAI:
+    """The shared client for `mode` ('openrouter' or 'local'), created on first use."""
+    base_url = _base_url(mode)
+    with _lock:
+        client = _clients.get((mode, base_url))
+        if client is None:
+            if mode == "openrouter":
+                load_dotenv()
+                api_key = os.getenv("OPENROUTER_API_KEY")
+                if not api_key:
+                    raise LLMError("OPENROUTER_API_KEY not found in .env file for openrouter mode.")
+            else:
+                api_key = "ollama"
+            # Retries are ours, so they can share the rate limiter and never hide a failure.
+            client = OpenAI(base_url=base_url, api_key=api_key, max_retries=0, timeout=LLM_REQUEST_TIMEOUT)
+            _clients[(mode, base_url)] = client
+        return client
+
+
+def _bucket(mode: str) -> Optional[TokenBucket]:
+    """(Helper) The rate limiter of `mode`'s provider, or None if it is unlimited."""
+    rate = LLM_RATE_LIMITS.get(mode)
+    if rate is None:
+        return None
+    with _lock:
+        return _buckets.setdefault(mode, TokenBucket(rate))
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """(Helper) Exponential backoff with full jitter, or the server's Retry-After if it is longer."""
+    delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt))
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(delay, min(LLM_RETRY_MAX_DELAY, float(retry_after))) if retry_after else delay
+    except ValueError:  # An HTTP date rather than a number of seconds.
+        return delay
+
+
+def complete(mode: str, model: str, messages: List[Dict[str, str]], temperature: float) -> str:
+    """Returns the model's reply to `messages`, retrying transient failures. Raises LLMError otherwise."""
+    client = get_client(mode)
+    bucket = _bucket(mode)
+    attempt = 0
+    while True:
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            response = client.chat.completions.create(model=model, messages=messages, temperature=temperature)
+            if response.usage is not None:
+                record_usage(
+                    sent_calls=1,
+                    sent_prompt_tokens=response.usage.prompt_tokens,
+                    completion_tokens=response.usage.completion_tokens,
+                )
+            else:
+                record_usage(sent_calls=1)
+            return response.choices[0].message.content or ""
+        except _TRANSIENT_ERRORS as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise LLMError(f"Could not reach the '{mode}' LLM after {attempt + 1} attempts. Details: {e}") from e
+            delay = _retry_delay(attempt, e)
+            logging.warning(f"⚠️ '{mode}' LLM request failed ({type(e).__name__}); retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            attempt += 1
+        except openai.OpenAIError as e:
+            raise LLMError(f"The '{mode}' LLM rejected the request. Details: {e}") from e
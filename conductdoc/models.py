@@ -1,27 +1,218 @@
 # conductdoc/models.py
 """🧱 Core data structures for representing code and analysis results."""
+import ast
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict
+from typing import Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from .graph import ImportGraph
+
+class _SourceFiles:
+    """
+    A process-wide table of interned file paths and their source buffers.
+
+    Code elements refer to their file by a small integer id and to their source
+    by a byte span, so the text of a file is held once no matter how many
+    (possibly nested) elements it contains. Buffers are loaded lazily from the
+    file's on-disk origin the first time any element's source is requested.
+    """
+    def __init__(self):
+        self.paths: List[Path] = []
+        self.ids: Dict[Path, int] = {}
+        self.origins: Dict[int, Path] = {}
+        self.buffers: Dict[int, bytes] = {}
+
+    def intern(self, path: Path) -> int:
+        file_id = self.ids.get(path)
+        if file_id is None:
+            file_id = len(self.paths)
+            self.paths.append(path)
+            self.ids[path] = file_id
+        return file_id
+
+    def read(self, file_id: int, offset: int, length: int) -> str:
+        buffer = self.buffers.get(file_id)
+        if buffer is None:
+            origin = self.origins.get(file_id)
+            if origin is None:
+                raise LookupError(f"No source file registered for '{self.paths[file_id]}'.")
+            buffer = origin.read_bytes()
+            # Spans index into the text as `ast` saw it, i.e. with universal newlines.
+            if b"\r" in buffer:
+                buffer = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            self.buffers[file_id] = buffer
+        return buffer[offset:offset + length].decode("utf-8")
+
+
+_source_files = _SourceFiles()
+
+
+def register_source_file(filepath: Path, origin: Path):
+    """Tells code elements of `filepath` where to lazily load their source text from."""
+    _source_files.origins[_source_files.intern(filepath)] = origin
+
 
-@dataclass
 class CodeElement:
-    name: str
-    type: str
-    filepath: Path
-    lineno_start: int
-    lineno_end: int
-    source_code: str
-    docstring: str
-    ai_documentation: Dict[str, str] = field(default_factory=dict)
-    
+    """
+    A class, function or method extracted from a source file.
+
+    Instances use __slots__ and interned paths to stay small. `source_code` is
+    either given directly or materialized on first access from a
+    `(byte offset, length)` span into the file's shared source buffer.
+    """
+    __slots__ = (
+        "name", "type", "_file_id", "lineno_start", "lineno_end",
+        "_source_span", "_source_code", "docstring", "ai_documentation",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        type: str,
+        filepath: Path,
+        lineno_start: int,
+        lineno_end: int,
+        source_code: Optional[str] = None,
+        docstring: str = "",
+        ai_documentation: Optional[Dict[str, str]] = None,
+        source_span: Optional[Tuple[int, int]] = None,
+    ):
+        if source_code is None and source_span is None:
+            raise ValueError("CodeElement needs either source_code or a source_span.")
+        self.name = name
+        self.type = type
+        self._file_id = _source_files.intern(filepath)
+        self.lineno_start = lineno_start
+        self.lineno_end = lineno_end
+        self._source_span = source_span
+        self._source_code = source_code
+        self.docstring = docstring
+        self.ai_documentation: Dict[str, str] = ai_documentation if ai_documentation is not None else {}
+
+    @property
+    def filepath(self) -> Path:
+        return _source_files.paths[self._file_id]
+
+    @filepath.setter
+    def filepath(self, value: Path):
+        self._file_id = _source_files.intern(value)
+
+    @property
+    def source_span(self) -> Optional[Tuple[int, int]]:
+        return self._source_span
+
+    @property
+    def source_code(self) -> str:
+        if self._source_code is None:
+            offset, length = self._source_span
+            return _source_files.read(self._file_id, offset, length)
+        return self._source_code
+
+    @source_code.setter
+    def source_code(self, value: str):
+        self._source_code = value
+
     @property
     def html_filename(self) -> str:
         safe_path = str(self.filepath).replace("/", "_").replace("\\", "_")
         return f"{safe_path}_{self.name}.html"
 
+    def _astuple(self) -> tuple:
+        return (
+            self.name, self.type, self.filepath, self.lineno_start, self.lineno_end,
+            self.source_code, self.docstring, self.ai_documentation,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CodeElement):
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return (
+            f"CodeElement(name={self.name!r}, type={self.type!r}, filepath={self.filepath!r}, "
+            f"lineno_start={self.lineno_start!r}, lineno_end={self.lineno_end!r})"
+        )
+
+    def __reduce__(self):
+        # File ids are only meaningful inside one process, so pickle the path itself
+        # and re-intern it on the receiving side.
+        return (CodeElement, (
+            self.name, self.type, self.filepath, self.lineno_start, self.lineno_end,
+            self._source_code, self.docstring, self.ai_documentation, self._source_span,
+        ))
+
 @dataclass
 class AnalysisResult:
     summary: str
     architecture_diagram: str
-    examples: Dict[str, str]
\ No newline at end of file
+    examples: Dict[str, str]
+
+class ImportStatement(NamedTuple):
+    """A raw, unresolved import as written in a source file."""
+    module: Optional[str]
+    level: int
+    names: Tuple[str, ...]
+
+class ChunkFilter(NamedTuple):
+    """
+    Restricts a retrieval to knowledge-base chunks of the given kinds ('doc',
+    'code' or 'summary') and/or about the given files or directories.
+    A field left as None doesn't restrict anything.
+    """
+    kinds: Optional[FrozenSet[str]] = None
+    paths: Optional[FrozenSet[Path]] = None
+
+@dataclass
+class ParsedFile:
+    """The compact, picklable result of crawling a single source file."""
+    filepath: Path
+    module_name: str
+    elements: List[CodeElement]
+    imports: List[ImportStatement]
+    tree: Optional[ast.AST] = None
+    blob_sha: str = ""
+    from_manifest: bool = False
+
+@dataclass
+class CrawlResult:
+    """Everything the source crawl collects about a repository."""
+    elements: List[CodeElement]
+    import_graph: ImportGraph
+    ast_map: Dict[Path, ast.AST]
+    module_map: Dict[str, Path]
+    # Files whose content is identical to the previous run's crawl manifest.
+    unchanged_files: Set[Path] = field(default_factory=set)
+
+@dataclass
+class DocSection:
+    """A single documentation file, converted to HTML and split into text chunks."""
+    source: str
+    html: str
+    chunks: List[str]
+
+@dataclass
+class DocsContext:
+    """All ingested documentation, kept as structured sections rather than one HTML blob."""
+    sections: List[DocSection] = field(default_factory=list)
+
+    @property
+    def html(self) -> str:
+        """The labeled, concatenated HTML of every section (used for debug output)."""
+        if not self.sections:
+            return ""
+        parts = ["<h1>Full Context from Existing Documentation</h1>\n"]
+        for section in self.sections:
+            parts.append(f'<section data-source="{section.source}">\n')
+            parts.append(f"  <h2>--- Context from: {section.source} ---</h2>\n")
+            parts.append("  " + section.html.replace('\n', '\n  ') + "\n")
+            parts.append("</section>\n\n")
+        return "".join(parts)
+
+    def iter_chunks(self) -> Iterator[Tuple[str, str]]:
+        """Yields `(source, text)` pairs for every chunk in every section."""
+        for section in self.sections:
+            for text in section.chunks:
+                yield section.source, text
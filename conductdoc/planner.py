@@ -0,0 +1,173 @@
+# conductdoc/planner.py
+"""🧮 Dry-run planning: estimates the LLM cost of a full run from the crawl alone.
+
+The planner mirrors the call structure of the analyzer and builds the very same
+prompts and contexts through `prompts`. Parts of a context that only exist once
+earlier LLM calls have returned (summaries, retrieved chunks) are filled in with
+typical lengths. Cache hits are predicted from the prompt markers in the LLM
+cache, combined with which files are unchanged since the last crawl.
+"""
+import logging
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+from . import prompts
+from .chunking import chunk_code_elements
+from .config import CONTEXT_TOKEN_BUDGETS, DIAGRAM_LLM_MODEL, LOCAL_LLM_MODEL, OPENROUTER_LLM_MODEL, EXAMPLES_LLM_MODEL
+from .models import CodeElement, CrawlResult, DocsContext
+from .utils import estimate_tokens, has_cached_prompt
+
+# Typical lengths, in tokens, of LLM outputs that later prompts embed.
+TYPICAL_FILE_SUMMARY_TOKENS = 60
+TYPICAL_MODULE_SUMMARY_TOKENS = 150
+TYPICAL_OVERVIEW_TOKENS = 600
+# generate_code_examples asks the LLM for 5 to 7 example tasks.
+TYPICAL_EXAMPLE_TASKS = 6
+
+
+@dataclass
+class PhaseEstimate:
+    """The projected LLM usage of one pipeline phase."""
+    name: str
+    calls: int = 0
+    prompt_tokens: int = 0
+    expected_cache_hits: int = 0
+
+    def add_call(self, prompt_tokens: int, cache_hit: bool):
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.expected_cache_hits += int(cache_hit)
+
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.expected_cache_hits / self.calls if self.calls else 0.0
+
+    def wall_time_seconds(self, concurrency: int, latency: float) -> float:
+        """Projected time for the uncached calls, assuming `concurrency` of them overlap."""
+        return math.ceil((self.calls - self.expected_cache_hits) / concurrency) * latency
+
+
+def _packed(context_tokens: float, kind: str) -> int:
+    """(Helper) The tokens of a context once packed into the budget of its kind of call."""
+    return round(min(context_tokens, CONTEXT_TOKEN_BUDGETS[kind]))
+
+
+def plan_run(
+    crawl: CrawlResult,
+    docs_context: DocsContext,
+    readme_content: str,
+    project_root: Path,
+    llm_mode: str,
+    file_summary_mode: str = "combined"
+) -> List[PhaseEstimate]:
+    """
+    Estimates calls, prompt tokens and cache hits for each LLM phase of a full run.
+    Combined file summaries are assumed to validate, without falling back.
+    """
+    logging.info("🧮 Planning the LLM phases of a full run...")
+    model_name = OPENROUTER_LLM_MODEL if llm_mode == 'openrouter' else LOCAL_LLM_MODEL
+    unchanged_files = {path.relative_to(project_root) for path in crawl.unchanged_files}
+
+    # Retrieved chunks are unknown before the index exists, so use the average initial chunk.
+    chunk_tokens = [estimate_tokens(prompts.doc_chunk(source, text)) for source, text in docs_context.iter_chunks()]
+    chunk_tokens += [estimate_tokens(chunk) for _, chunk in chunk_code_elements(crawl.elements)]
+    mean_chunk_tokens = sum(chunk_tokens) / len(chunk_tokens) if chunk_tokens else 0
+
+    # Mirror generate_recursive_summary: only files with elements under the first top-level directory.
+    elements_by_file: Dict[Path, List[CodeElement]] = defaultdict(list)
+    for el in crawl.elements:
+        elements_by_file[el.filepath].append(el)
+    nested_files = [path for path in sorted(elements_by_file) if len(path.parts) > 1]
+    root_name = nested_files[0].parts[0] if nested_files else None
+    files = [path for path in nested_files if path.parts[0] == root_name]
+    directories = sorted({path.parents[i] for path in files for i in range(len(path.parts) - 1)})
+
+    summary_phase = PhaseEstimate("generate_recursive_summary")
+    for file_path in files:
+        file_elements = elements_by_file[file_path]
+        context = prompts.file_context(
+            file_path,
+            [el.name for el in file_elements if el.type == 'class'],
+            [el.name for el in file_elements if el.type == 'function'],
+            [],
+        )
+        context_tokens = _packed(estimate_tokens(context) + 5 * mean_chunk_tokens, "file")
+        if file_summary_mode == "combined":
+            file_prompts = [prompts.file_combined_prompt(file_path)]
+        else:
+            file_prompts = [prompts.file_abstractive_prompt(file_path), prompts.file_detailed_prompt(file_path)]
+        for prompt in file_prompts:
+            cache_hit = file_path in unchanged_files and has_cached_prompt(prompt, model_name)
+            summary_phase.add_call(estimate_tokens(prompt) + context_tokens, cache_hit)
+
+    for dir_path in directories:
+        prompt = prompts.directory_prompt(dir_path)
+        context_tokens = _packed(estimate_tokens(prompts.directory_context(dir_path, [])) + 7 * mean_chunk_tokens, "directory")
+        dir_unchanged = all(path in unchanged_files for path in files if dir_path in path.parents)
+        summary_phase.add_call(
+            estimate_tokens(prompt) + context_tokens,
+            dir_unchanged and has_cached_prompt(prompt, model_name),
+        )
+
+    all_unchanged = bool(files) and all(path in unchanged_files for path in files)
+    if files:
+        context_tokens = _packed(estimate_tokens(prompts.top_level_context(readme_content, "")) + TYPICAL_MODULE_SUMMARY_TOKENS, "top_level")
+        summary_phase.add_call(
+            estimate_tokens(prompts.TOP_LEVEL_PROMPT) + context_tokens,
+            all_unchanged and has_cached_prompt(prompts.TOP_LEVEL_PROMPT, model_name),
+        )
+    # Later phases are deterministic given the summaries, so they hit the cache exactly when
+    # every summary does.
+    summaries_cached = summary_phase.calls > 0 and summary_phase.expected_cache_hits == summary_phase.calls
+
+    diagram_phase = PhaseEstimate("generate_ai_architecture_diagram")
+    full_context = prompts.architecture_context(
+        top_level_summary_text="",
+        structure_summary="\n".join(str(path) for path in directories + files),
+        import_graph_size=len(crawl.import_graph),
+        formatted_file_summaries="\n".join(f'FILE: "{path}" - ' for path in files),
+        formatted_module_summaries="\n".join(f'MODULE: "{path}" - ' for path in directories),
+    )
+    summary_tokens = (
+        TYPICAL_OVERVIEW_TOKENS
+        + len(files) * TYPICAL_FILE_SUMMARY_TOKENS
+        + len(directories) * TYPICAL_MODULE_SUMMARY_TOKENS
+    )
+    diagram_phase.add_call(
+        estimate_tokens(prompts.ARCHITECTURE_DIAGRAM_PROMPT) + _packed(estimate_tokens(full_context) + summary_tokens, "architecture"),
+        summaries_cached and has_cached_prompt(prompts.ARCHITECTURE_DIAGRAM_PROMPT, DIAGRAM_LLM_MODEL),
+    )
+
+    examples_phase = PhaseEstimate("generate_code_examples")
+    capability_cached = summaries_cached and has_cached_prompt(prompts.CAPABILITY_PROMPT, EXAMPLES_LLM_MODEL)
+    examples_phase.add_call(
+        estimate_tokens(prompts.CAPABILITY_PROMPT) + _packed(TYPICAL_OVERVIEW_TOKENS, "capability"), capability_cached
+    )
+    for _ in range(TYPICAL_EXAMPLE_TASKS):
+        examples_phase.add_call(
+            estimate_tokens(prompts.example_prompt("")) + _packed(10 * mean_chunk_tokens, "example"),
+            capability_cached,
+        )
+
+    return [summary_phase, diagram_phase, examples_phase]
+
+
+def log_run_plan(phases: List[PhaseEstimate], concurrency: int, latency: float):
+    """Logs the plan as a table, followed by the totals across all phases."""
+    total = PhaseEstimate("TOTAL")
+    for phase in phases:
+        total.calls += phase.calls
+        total.prompt_tokens += phase.prompt_tokens
+        total.expected_cache_hits += phase.expected_cache_hits
+
+    logging.info(f"📋 Run plan ({concurrency} concurrent calls, ~{latency:.1f}s per uncached call):")
+    logging.info(f"  {'Phase':<34} {'Calls':>6} {'Prompt tokens':>14} {'Cache hits':>12} {'Wall time':>10}")
+    for phase in phases + [total]:
+        wall_time = phase.wall_time_seconds(concurrency, latency)
+        logging.info(
+            f"  {phase.name:<34} {phase.calls:>6} {phase.prompt_tokens:>14,} "
+            f"{phase.cache_hit_rate:>11.0%} {wall_time / 60:>8.1f}m"
+        )
@@ -0,0 +1,97 @@
+# conductdoc/prefetch.py
+"""🏭 Overlaps loading the encoder and embedding chunks with the crawl.
+
+A background thread imports and loads the Retriever's model while the crawl
+starts, then embeds the code elements of each crawled file and the chunks of
+each converted docs file as they arrive over a bounded queue. The embeddings
+land in the embedding cache, so the Retriever's `build_initial_indexes` finds
+all of them there once the crawl is done. The encoder (which releases the GIL)
+and the crawler work at the same time, so wall time tends towards the longer of
+the two instead of their sum.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from .config import ENCODE_BATCH_SIZE, PREFETCH_QUEUE_SIZE
+from .models import CodeElement, DocSection
+
+if TYPE_CHECKING:
+    from .retriever import Retriever
+
+# Tells the worker that nothing more will be submitted.
+_DONE = object()
+
+
+class EmbeddingPrefetcher:
+    """Embeds crawl output on a background thread, then hands over the warmed-up Retriever."""
+
+    def __init__(self, **retriever_kwargs):
+        self._retriever_kwargs = retriever_kwargs
+        # Once full, submitting blocks the crawl until the encoder catches up.
+        self._queue: "queue.Queue" = queue.Queue(maxsize=PREFETCH_QUEUE_SIZE)
+        self._retriever: Optional["Retriever"] = None
+        self._error: Optional[BaseException] = None
+        self._drained = False
+        self._prefetched_count = 0
+        self._thread = threading.Thread(target=self._run, name="embedding-prefetcher", daemon=True)
+        self._thread.start()
+
+    def submit_code(self, elements: List[CodeElement]):
+        """Queues the code elements of one crawled file."""
+        self._queue.put(("code", elements))
+
+    def submit_docs(self, section: DocSection):
+        """Queues the chunks of one converted docs file."""
+        self._queue.put(("doc", [(section.source, text) for text in section.chunks]))
+
+    def finish(self) -> "Retriever":
+        """Waits for everything submitted to be embedded and returns the Retriever."""
+        start = time.perf_counter()
+        self._queue.put(_DONE)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        logging.info(
+            f"🏭 Embedded {self._prefetched_count} code elements and docs passages alongside the crawl; "
+            f"waited {time.perf_counter() - start:.1f}s for the encoder afterwards."
+        )
+        return self._retriever
+
+    def _run(self):
+        try:
+            # Imported here, off the main thread, since torch alone takes seconds to import.
+            from .retriever import Retriever
+
+            self._retriever = Retriever(**self._retriever_kwargs)
+            while not self._drained:
+                self._embed_batch()
+        except BaseException as e:
+            self._error = e
+            # Keep draining, so producers blocked on a full queue can finish.
+            while not self._drained:
+                self._drained = self._queue.get() is _DONE
+
+    def _embed_batch(self):
+        """
+        (Helper) Waits for one submission, takes whatever else is already queued up
+        to about one encoder batch, and embeds it all.
+        """
+        doc_chunks: List[Tuple[str, str]] = []
+        code_elements: List[CodeElement] = []
+        item = self._queue.get()
+        self._drained = item is _DONE
+        while not self._drained:
+            kind, payload = item
+            (doc_chunks if kind == "doc" else code_elements).extend(payload)
+            if len(doc_chunks) + len(code_elements) >= ENCODE_BATCH_SIZE:
+                break
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._drained = item is _DONE
+        self._retriever.prefetch_embeddings(doc_chunks, code_elements)
+        self._prefetched_count += len(doc_chunks) + len(code_elements)
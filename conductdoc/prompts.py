@@ -0,0 +1,228 @@
+# conductdoc/prompts.py
+"""🗣️ Prompt, context, retrieval-query and chunk templates for every LLM call.
+
+These live apart from the analyzer so the run planner can build exactly the
+same prompts without loading any model dependencies. Note that any edit to a
+template changes the LLM cache key of every call that uses it.
+"""
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .models import CodeElement
+
+
+# --- Retrieval Chunks ---
+
+def code_chunk(el: CodeElement, source: Optional[str] = None, part: Optional[Tuple[int, int]] = None) -> str:
+    """
+    A chunk of `el`'s code: its full source by default, or `source` instead (e.g. a class
+    skeleton). A `part` (index, count) marks one window of a long element; windows leave
+    out the docstring line, since the source of the first window already contains it.
+    """
+    source = el.source_code if source is None else source
+    if part is None:
+        chunk = f'Code from file: {el.filepath}\nType: {el.type}\nName: {el.name}\nDocstring: "{el.docstring}"\nSource Code:\n```python\n{source}\n```'
+    else:
+        chunk = f'Code from file: {el.filepath}\nType: {el.type}\nName: {el.name} (part {part[0]} of {part[1]})\nSource Code:\n```python\n{source}\n```'
+    return chunk.strip()
+
+
+def doc_chunk(source: str, text: str) -> str:
+    return f"From documentation file '{source}': {text}"
+
+
+def file_summary_chunk(file_path: Path, summary: str) -> str:
+    return f"AI-Generated Summary for file '{file_path}': {summary}"
+
+
+def module_summary_chunk(dir_path: Path, summary: str) -> str:
+    return f"AI-Generated Summary for module '{dir_path}': {summary}"
+
+
+# --- File Summaries ---
+
+def file_query(file_path: Path) -> str:
+    return f"Detailed purpose and contents of the Python module '{file_path}'"
+
+
+def file_context(file_path: Path, class_names: List[str], function_names: List[str], retrieved_chunks: List[str]) -> str:
+    return (
+        f"File Path: {file_path}\nClasses: {', '.join(class_names)}\nFunctions: {', '.join(function_names)}\n"
+        + "Relevant context:\n- " + "\n- ".join(retrieved_chunks)
+    )
+
+
+def file_abstractive_prompt(file_path: Path) -> str:
+    return f"Write a very concise, one-sentence summary in an HTML `<p>` tag explaining the single primary purpose of the Python file '{file_path}'. Output only the `<p>` tag."
+
+
+def file_detailed_prompt(file_path: Path) -> str:
+    return f"""
+    You are a technical writer documenting the Python file '{file_path}'.
+    Based on the context, provide a detailed summary in HTML format. The summary should:
+    1. Start with a paragraph explaining the file's overall purpose.
+    2. If there are classes or functions, include a bulleted list (`<ul>`) of the most important ones.
+    3. For each item in the list, briefly explain its role.
+    Do not include a main `<h1>` title.
+    """
+
+
+# The keys of the JSON object answering `file_combined_prompt`.
+FILE_SUMMARY_KEYS = ("abstractive", "detailed")
+
+
+def file_combined_prompt(file_path: Path) -> str:
+    return f"""
+    You are a technical writer documenting the Python file '{file_path}'.
+    Based on the context, write two summaries of it, both in HTML format:
+    - "abstractive": a very concise, one-sentence summary in an HTML `<p>` tag explaining the single primary purpose of the file.
+    - "detailed": a detailed summary that starts with a paragraph explaining the file's overall purpose. If there are classes or functions, follow it with a bulleted list (`<ul>`) of the most important ones, briefly explaining the role of each. Do not include a main `<h1>` title.
+    Return ONLY a JSON object with this structure: {{"abstractive": "<p>...</p>", "detailed": "..."}}
+    """
+
+
+# --- Directory & Library Summaries ---
+
+def directory_query(dir_path: Path) -> str:
+    return f"High-level summary for the Python submodule '{dir_path}'"
+
+
+def directory_context(dir_path: Path, retrieved_chunks: List[str]) -> str:
+    return f"This is submodule '{dir_path}'. Relevant context, including summaries of its contents:\n- " + "\n- ".join(retrieved_chunks)
+
+
+def directory_prompt(dir_path: Path) -> str:
+    return f"Based on its contents' summaries, write a one-paragraph summary in an HTML `<p>` tag for the submodule '{dir_path}'. Explain its overall responsibility. Output only the `<p>` tag."
+
+
+TOP_LEVEL_PROMPT = "You are a senior technical writer. Using the project's README and the overall structural summary, write a comprehensive, multi-paragraph overview of the entire library in HTML format. Start with a high-level explanation of its purpose. Then, briefly describe the role of its key submodules."
+
+
+def top_level_context(readme_content: str, structure_summary: str) -> str:
+    return f"README:\n{readme_content}\n\nOverall structure summary:\n{structure_summary}"
+
+
+# --- Architecture Diagram ---
+
+def architecture_context(
+    top_level_summary_text: str,
+    structure_summary: str,
+    import_graph_size: int,
+    formatted_file_summaries: str,
+    formatted_module_summaries: str
+) -> str:
+    return f"""
+LIBRARY OVERVIEW:
+{top_level_summary_text}
+
+DIRECTORY STRUCTURE:
+{structure_summary}
+
+IMPORT RELATIONSHIPS:
+{import_graph_size} files with import dependencies
+
+FILE SUMMARIES:
+{formatted_file_summaries}
+
+MODULE SUMMARIES:
+{formatted_module_summaries}
+"""
+
+
+# The context (see architecture_context) is sent after the prompt, like every other call's.
+ARCHITECTURE_DIAGRAM_PROMPT = """
+You are creating an interactive D3.js library source code visualization. Generate a complete HTML page with an interactive tree diagram showing the library's architecture.
+
+**REQUIREMENTS:**
+
+1. **HTML Structure**: Complete HTML page with D3.js loaded from CDN
+2. **Interactive Tree**: Collapsible tree diagram using D3.js hierarchy layout
+3. **Node Types**: 
+   - 📁 Directories (collapsible)
+   - 🐍 Python modules (.py files)
+   - 📄 Other files (__init__.py, setup.py, etc.)
+4. **Popovers**: Interactive tooltips showing full summaries on hover
+5. **Styling**: Clean, modern design suitable for library documentation
+6. **Responsiveness**: Works on different screen sizes
+
+**TECHNICAL SPECS:**
+
+- Use D3.js v7 from CDN
+- Tree layout with smooth transitions
+- Click to expand/collapse directories
+- Hover for detailed summary popovers
+- Color coding: directories (blue), Python files (green), config files (orange)
+- Include import count badges for files with many dependencies
+- Zoom and pan functionality for large trees
+
+**DATA STRUCTURE:**
+Transform the provided summaries into a nested JSON structure where each node has:
+- name: file/directory name
+- type: "directory", "python", "config", or "other"
+- summary: the actual summary from the provided context
+- children: array of child nodes (for directories)
+- importCount: number of imports (for files)
+
+**POPOVER CONTENT:**
+- File/directory name
+- Type and purpose
+- Full summary from the provided context
+- Import count (if applicable)
+- Path information
+
+**EXAMPLE STRUCTURE:**
+```json
+{
+  "name": "library_root",
+  "type": "directory", 
+  "summary": "Main library package",
+  "children": [
+    {
+      "name": "core",
+      "type": "directory",
+      "summary": "Core functionality modules",
+      "children": [...]
+    },
+    {
+      "name": "utils.py",
+      "type": "python",
+      "summary": "Utility functions and helpers",
+      "importCount": 3
+    }
+  ]
+}
+```
+
+**STYLING REQUIREMENTS:**
+- Modern, clean design
+- Subtle shadows and gradients
+- Smooth animations
+- Readable typography
+- Professional color scheme
+- Responsive layout
+
+Generate the complete HTML page with embedded CSS and JavaScript. Use the actual summaries provided in the context below to populate the tree data.
+"""
+
+
+# --- Code Examples ---
+
+CAPABILITY_PROMPT = """
+    Based on the following summary of a Python library, identify 5 to 7 specific, realistic tasks a user would want to accomplish.
+    Return ONLY a JSON object with this structure: {"example_tasks": ["Specific task 1", "Specific task 2", ...]}
+    """
+
+
+def example_query(topic: str) -> str:
+    return f"How to {topic} with code examples"
+
+
+def example_prompt(topic: str) -> str:
+    return f"""
+        You are creating a code example for a Python library to demonstrate the task: "{topic}".
+        CRITICAL: Use ONLY functions, classes, and methods from the provided codebase context. The code must be self-contained and runnable.
+        Response MUST be valid HTML containing:
+        1. A `<p>` tag explaining what the code does.
+        2. A `<pre><code>` block with the well-commented Python code.
+        ONLY output this HTML content.
+        """
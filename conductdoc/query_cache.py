@@ -0,0 +1,59 @@
+# conductdoc/query_cache.py
+"""🗃️ A bounded, least-recently-used cache of retrieval results.
+
+Results are stored as chunk hashes under a string key that the Retriever derives
+from the query, its `k` and scopes, and the version of the index it searched.
+The cache can be saved next to an index snapshot and loaded again by a later
+run that maps the same snapshot. Hashes, unlike chunk ids, stay valid however
+the chunks added since were ordered.
+"""
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+
+class QueryCache:
+    """Maps retrieval keys to ranked chunk hashes, evicting the least recently used beyond `capacity`."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries: "OrderedDict[str, List[str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[List[str]]:
+        hashes = self._entries.get(key)
+        if hashes is not None:
+            self._entries.move_to_end(key)
+        return hashes
+
+    def put(self, key: str, hashes: List[str]):
+        self._entries[key] = hashes
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def load(self, path: Path):
+        """Replaces the entries with those saved at `path`, if it exists."""
+        self._entries.clear()
+        if not path.is_file():
+            return
+        try:
+            entries = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        # Saved least recently used first, so re-inserting preserves the order.
+        for key, hashes in entries[-self.capacity:]:
+            self._entries[key] = hashes
+
+    def save(self, path: Path):
+        """Writes the entries to `path` atomically."""
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(list(self._entries.items())), encoding="utf-8")
+        tmp_path.replace(path)
@@ -1,77 +1,544 @@
 # conductdoc/retriever.py
-"""🧠🔍 This module contains the Retriever, a dynamic, multi-source knowledge base."""
+"""🧠🔍 This module contains the Retriever, a dynamic, multi-source knowledge base.
+
+The initial knowledge base (docs and code chunks) is saved to disk as a FAISS
+snapshot named after the content of its chunks, and memory-mapped read-only on
+later runs, so concurrent jobs on one machine share its pages. Snapshots of
+other repos, encoders and backends are kept side by side; only those unused for
+FAISS_SNAPSHOT_MAX_AGE_DAYS are pruned. Chunks added while the pipeline runs
+(e.g. file summaries) go into a small in-memory delta index, and every search
+merges the results of both. The base index can be any of the backends in
+`indexes`; the delta stays a flat index, since it is small. Added chunks are
+buffered and encoded in batches, right before the next search needs them.
+
+Every chunk carries metadata (its kind and the file or directory it is about),
+so a search can be scoped with `ChunkFilter`s, e.g. "this file first, then its
+import-graph neighbours, then everything".
+
+Each search is hybrid: a BM25 index over identifiers and paths (see `lexical`)
+is ranked alongside FAISS and the two rankings are fused. A query whose lexical
+hits all contain an identifier or path it names verbatim skips the embedding
+pass entirely.
+
+Search results are memoized in an LRU `QueryCache`, keyed by the query, `k`,
+its scopes and the index version, which every `add_chunks` bumps. The cache is
+saved with the snapshot, so a later run that maps the same snapshot and adds
+the same chunks answers repeated queries without encoding or searching.
+
+Results depend only on which chunks are in the knowledge base, not on the order
+they were added in (which, with concurrent summaries, is down to thread timing):
+every ranking breaks ties on chunk text, the query cache stores chunk hashes
+rather than ids, and the digest of added chunks ignores their order.
+"""
+import hashlib
+import json
 import logging
-from typing import List, Sequence
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
-from bs4 import BeautifulSoup
-from bs4.element import Tag, PageElement
-from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
-from .models import CodeElement
+from . import prompts
+from .chunking import chunk_code_elements
+from .config import (
+    EMBEDDING_CACHE_PATH, ENCODE_BATCH_SIZE, FAISS_INDEX_DIR_NAME, FAISS_SNAPSHOT_MAX_AGE_DAYS, QUERY_CACHE_SIZE
+)
+from .embedding_cache import EmbeddingCache, chunk_hash
+from .encoders import encoder_key, load_encoder
+from .indexes import build_index, effective_backend
+from .lexical import LexicalHit, LexicalIndex
+from .models import ChunkFilter, CodeElement
+from .query_cache import QueryCache
+
+# Buffered chunks are flushed once this many are pending, even without a search.
+ADD_BATCH_SIZE = 256
+
+# Bumped whenever the layout of a saved snapshot changes, so old snapshots are rebuilt.
+SNAPSHOT_FORMAT = 3
+
+# The rank offset of reciprocal rank fusion; 60 is the customary value.
+RRF_RANK_OFFSET = 60
+
+# A chunk's kind ('doc', 'code' or 'summary') and the file or directory it is about.
+ChunkMetadata = Tuple[str, Optional[Path]]
 
 class Retriever:
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    def __init__(
+        self,
+        model_name: str = 'all-MiniLM-L6-v2',
+        index_backend: str = 'flat',
+        encoder_backend: str = 'torch',
+        encoder_threads: Optional[int] = None,
+        encode_batch_size: int = ENCODE_BATCH_SIZE
+    ):
         logging.info("🧠 Initializing a DYNAMIC RAG Retriever...")
-        logging.info(f"  -> Loading sentence-transformer model '{model_name}'...")
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.index_backend = index_backend
+        self.encoder_backend = encoder_backend
+        self.encode_batch_size = encode_batch_size
+        self.model = load_encoder(model_name, encoder_backend, encoder_threads)
+        # Embeddings differ slightly between encoder backends, so each has its own cache entries.
+        self.encoder_key = encoder_key(model_name, encoder_backend)
+        self.embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, self.encoder_key)
+        self.stats: Dict[str, int] = {
+            "embedding_cache_hits": 0, "embedding_cache_misses": 0,
+            "hybrid_searches": 0, "lexical_only_searches": 0,
+            "query_cache_hits": 0, "query_cache_misses": 0,
+        }
+        # Chunk i lives in the base index if i < base_index.ntotal, otherwise in the delta index.
         self.chunks: List[str] = []
-        self.embeddings: np.ndarray = np.array([])
-        self.index: faiss.Index | None = None
+        self.chunk_metadata: List[ChunkMetadata] = []
+        self._chunks_by_hash: Dict[str, str] = {}
+        self._chunk_hashes: List[str] = []
+        self._ids_by_kind: Dict[str, List[int]] = {}
+        self._ids_by_path: Dict[Path, List[int]] = {}
+        self.lexical_index = LexicalIndex()
+        self.snapshot_id: Optional[str] = None
+        self.base_index: faiss.Index | None = None
+        self.delta_index: faiss.Index | None = None
+        self._pending_chunks: List[Tuple[str, ChunkMetadata]] = []
+        # The version orders index states within a run; the digest of the set of chunks
+        # added since the snapshot tells apart runs that added different chunks.
+        self.index_version = 0
+        self._added_digest = 0
+        self.query_cache = QueryCache(QUERY_CACHE_SIZE)
         logging.info("✅ Retriever initialized. Ready to build knowledge base.")
 
-    def build_initial_indexes(self, docs_html: str, code_elements: List[CodeElement]):
+    def build_initial_indexes(self, doc_chunks: Iterable[Tuple[str, str]], code_elements: List[CodeElement]):
         logging.info("  -> Building initial knowledge base from docs and code...")
-        doc_chunks = self._chunk_html(docs_html)
+        doc_chunks = list(doc_chunks)
         code_chunks = self._chunk_code(code_elements)
-        initial_chunks = doc_chunks + code_chunks
+        initial_chunks = self._format_doc_chunks(doc_chunks) + [chunk for _, chunk in code_chunks]
+        initial_metadata = [("doc", Path(source)) for source, _ in doc_chunks]
+        initial_metadata += [("code", el.filepath) for el, _ in code_chunks]
         if not initial_chunks:
             logging.warning("⚠️ No initial chunks found to build index.")
             return
-        self.add_chunks(initial_chunks)
-        logging.info(f"  -> Initial knowledge base built with {len(initial_chunks)} chunks.")
 
-    def add_chunks(self, new_chunks: List[str]):
+        hashes = [chunk_hash(chunk) for chunk in initial_chunks]
+        backend = effective_backend(self.index_backend, len(initial_chunks))
+        self.snapshot_id = self._snapshot_id(backend, hashes)
+        if self._load_snapshot(self.snapshot_id):
+            logging.info(f"  -> Memory-mapped saved index snapshot {self.snapshot_id[:12]} ({len(initial_chunks)} chunks).")
+        else:
+            embeddings = self._encode_chunks(initial_chunks, hashes)
+            self._save_snapshot(self.snapshot_id, initial_chunks, initial_metadata, hashes, build_index(backend, embeddings))
+            self._load_snapshot(self.snapshot_id)
+            logging.info(f"  -> Initial knowledge base built with {len(initial_chunks)} chunks.")
+            logging.info(
+                f"  -> Embedding cache: {self.stats['embedding_cache_hits']} hits, "
+                f"{self.stats['embedding_cache_misses']} misses."
+            )
+        self.index_version, self._added_digest = 0, 0
+        self.query_cache.load(self._query_cache_path())
+
+    def prefetch_embeddings(self, doc_chunks: Iterable[Tuple[str, str]], code_elements: List[CodeElement]):
+        """
+        Embeds the initial chunks of some docs and code elements ahead of
+        `build_initial_indexes`, which then finds them in the embedding cache.
+        """
+        chunks = self._format_doc_chunks(doc_chunks)
+        chunks += [chunk for _, chunk in self._chunk_code(code_elements, log_summary=False)]
+        if chunks:
+            self._encode_chunks(chunks)
+
+    def add_chunks(self, new_chunks: List[str], kind: str = "summary", path: Optional[Path] = None):
+        """Adds chunks of the given kind, about the file or directory `path`, to the knowledge base."""
         if not new_chunks: return
         logging.info(f"  -> Dynamically adding {len(new_chunks)} new chunks to the knowledge base...")
-        new_embeddings = self.model.encode(new_chunks, show_progress_bar=False)
-        if self.index is None:
-            dimension = new_embeddings.shape[1]
-            self.index = faiss.IndexFlatL2(dimension)
-            self.embeddings = new_embeddings
-            self.chunks = new_chunks
-        else:
-            self.embeddings = np.vstack([self.embeddings, new_embeddings])
-            self.chunks.extend(new_chunks)
-        self.index.add(x=new_embeddings.astype('float32')) # type: ignore
-
-    def _chunk_html(self, html: str) -> List[str]:
-        soup = BeautifulSoup(html, 'html.parser')
-        chunks = []
-        all_sections: Sequence[PageElement] = soup.find_all('section')
-        for section in all_sections:
-            if not isinstance(section, Tag): continue
-            source = section.get('data-source', 'unknown_source')
-            content_tags = section.find_all(['h1', 'h2', 'h3', 'p', 'li', 'pre'])
-            for tag in content_tags:
-                text = tag.get_text(separator=' ', strip=True)
-                if len(text.split()) > 5:
-                    chunks.append(f"From documentation file '{source}': {text}")
-        return chunks
-
-    def _chunk_code(self, elements: List[CodeElement]) -> List[str]:
-        chunks = []
-        for el in elements:
-            chunk = f'Code from file: {el.filepath}\nType: {el.type}\nName: {el.name}\nDocstring: "{el.docstring}"\nSource Code:\n```python\n{el.source_code}\n```'
-            chunks.append(chunk.strip())
-        return chunks
-
-    def retrieve(self, query: str, k: int = 5) -> List[str]:
-        if self.index is None or not self.chunks: return []
+        self._pending_chunks.extend((chunk, (kind, path)) for chunk in new_chunks)
+        self.index_version += 1
+        # A sum of per-chunk hashes, so the same chunks give the same digest in any order.
+        for chunk in new_chunks:
+            entry = hashlib.sha256(f"{kind}\0{path}\0{chunk_hash(chunk)}".encode("utf-8")).digest()
+            self._added_digest = (self._added_digest + int.from_bytes(entry, "big")) % 2 ** 256
+        if len(self._pending_chunks) >= ADD_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Encodes the buffered chunks in one batch and appends them to the delta index."""
+        if not self._pending_chunks: return
+        # Sorted, so chunk ids don't depend on the order concurrent summaries finished in.
+        pending = sorted(self._pending_chunks, key=lambda item: (str(item[1][1]), item[1][0], item[0]))
+        self._pending_chunks = []
+        new_chunks = [chunk for chunk, _ in pending]
+        new_embeddings = self._encode_chunks(new_chunks)
+        if self.delta_index is None:
+            self.delta_index = faiss.IndexFlatL2(new_embeddings.shape[1])
+        # FAISS grows its code storage geometrically, so appending stays amortized O(1) per vector.
+        self.delta_index.add(x=new_embeddings) # type: ignore
+        self._register_chunks(new_chunks, [metadata for _, metadata in pending])
+
+    def log_stats(self):
+        """Logs the retriever's counters for this run."""
+        logging.info("📊 Retriever stats: " + ", ".join(f"{name}={value}" for name, value in self.stats.items()))
+        lookups = self.stats["query_cache_hits"] + self.stats["query_cache_misses"]
+        if lookups:
+            logging.info(f"  -> Query cache hit ratio: {self.stats['query_cache_hits'] / lookups:.1%} of {lookups} retrievals.")
+
+    def close(self):
+        """Saves the query cache with the snapshot and closes the embedding cache."""
+        if self.snapshot_id is not None:
+            self.query_cache.save(self._query_cache_path())
+        self.embedding_cache.close()
+
+    def _register_chunks(self, chunks: List[str], metadata: List[ChunkMetadata], hashes: Optional[List[str]] = None):
+        """(Helper) Appends chunks whose vectors were just added, indexing their metadata, hashes and terms."""
+        if hashes is None:
+            hashes = [chunk_hash(chunk) for chunk in chunks]
+        first_id = len(self.chunks)
+        self.chunks.extend(chunks)
+        self._chunk_hashes.extend(hashes)
+        self._chunks_by_hash.update(zip(hashes, chunks))
+        self.chunk_metadata.extend(metadata)
+        self.lexical_index.add(chunks)
+        for chunk_id, (kind, path) in enumerate(metadata, start=first_id):
+            self._ids_by_kind.setdefault(kind, []).append(chunk_id)
+            if path is not None:
+                self._ids_by_path.setdefault(path, []).append(chunk_id)
+
+    def _snapshot_id(self, backend: str, hashes: List[str]) -> str:
+        """Names a snapshot after the encoder, the index backend and the exact, ordered content of its chunks."""
+        digest = hashlib.sha256(f"{SNAPSHOT_FORMAT}\0{self.encoder_key}\0{backend}".encode("utf-8"))
+        for key in hashes:
+            digest.update(bytes.fromhex(key))
+        return digest.hexdigest()
+
+    def _query_cache_path(self) -> Path:
+        # Named after the snapshot, so it is pruned along with it.
+        return FAISS_INDEX_DIR_NAME / f"{self.snapshot_id}.queries.json"
+
+    def _load_snapshot(self, snapshot_id: str) -> bool:
+        """Memory-maps a saved snapshot as the base index. Returns False if there is none."""
+        index_path = FAISS_INDEX_DIR_NAME / f"{snapshot_id}.faiss"
+        chunks_path = FAISS_INDEX_DIR_NAME / f"{snapshot_id}.chunks.json"
+        if not index_path.is_file() or not chunks_path.is_file():
+            return False
+        # Marks the snapshot as in use, so that pruning by other jobs leaves it alone.
+        index_path.touch()
+        # A memory-mapped index must never be added to; new chunks go to the delta index.
+        self.base_index = faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        table = json.loads(chunks_path.read_text(encoding="utf-8"))
+        self.chunks, self.chunk_metadata, self._ids_by_kind, self._ids_by_path = [], [], {}, {}
+        self._chunks_by_hash, self._chunk_hashes = {}, []
+        self.lexical_index = LexicalIndex()
+        self._register_chunks(table["chunks"], [
+            (kind, Path(path) if path is not None else None)
+            for kind, path in zip(table["kinds"], table["paths"])
+        ], table["hashes"])
+        # Added chunks then can't change how the initial ones score, whatever order they arrive in.
+        self.lexical_index.freeze_statistics()
+        self.delta_index = None
+        return True
+
+    def _save_snapshot(
+        self,
+        snapshot_id: str,
+        chunks: List[str],
+        metadata: List[ChunkMetadata],
+        hashes: List[str],
+        index: faiss.Index
+    ):
+        """Writes a snapshot atomically and prunes those that have gone unused."""
+        FAISS_INDEX_DIR_NAME.mkdir(exist_ok=True)
+        table = {
+            "chunks": chunks,
+            "hashes": hashes,
+            "kinds": [kind for kind, _ in metadata],
+            "paths": [str(path) if path is not None else None for _, path in metadata],
+        }
+        suffix = f".{os.getpid()}.tmp"
+        # The index file is written last: its presence marks the snapshot as complete.
+        for name, write in (
+            (f"{snapshot_id}.chunks.json", lambda path: path.write_text(json.dumps(table), encoding="utf-8")),
+            (f"{snapshot_id}.faiss", lambda path: faiss.write_index(index, str(path))),
+        ):
+            tmp_path = FAISS_INDEX_DIR_NAME / (name + suffix)
+            write(tmp_path)
+            tmp_path.replace(FAISS_INDEX_DIR_NAME / name)
+        _prune_snapshots(time.time() - FAISS_SNAPSHOT_MAX_AGE_DAYS * 24 * 3600)
+
+    def _encode_chunks(self, chunks: List[str], hashes: Optional[List[str]] = None) -> np.ndarray:
+        """Embeds `chunks`, encoding only those not already in the embedding cache."""
+        if hashes is None:
+            hashes = [chunk_hash(chunk) for chunk in chunks]
+        cached = self.embedding_cache.get_many(hashes)
+        missing = {key: chunk for key, chunk in zip(hashes, chunks) if key not in cached}
+        self.stats["embedding_cache_hits"] += len(chunks) - len(missing)
+        self.stats["embedding_cache_misses"] += len(missing)
+        if missing:
+            encoded = self.model.encode(list(missing.values()), batch_size=self.encode_batch_size, show_progress_bar=False)
+            self.embedding_cache.put_many(list(missing), encoded)
+            cached.update(zip(missing, np.asarray(encoded, dtype=np.float32)))
+        return np.vstack([cached[key] for key in hashes])
+
+    def _format_doc_chunks(self, doc_chunks: Iterable[Tuple[str, str]]) -> List[str]:
+        return [prompts.doc_chunk(source, text) for source, text in doc_chunks]
+
+    def _chunk_code(self, elements: List[CodeElement], log_summary: bool = True) -> List[Tuple[CodeElement, str]]:
+        # The encoder adds two special tokens ([CLS] and [SEP]) to every input.
+        return chunk_code_elements(
+            elements,
+            max_tokens=self.model.max_seq_length - 2,
+            count_tokens=self._count_tokens,
+            log_summary=log_summary,
+        )
+
+    def _count_tokens(self, texts: List[str]) -> List[int]:
+        """Exact encoder token counts, in batches to bound the memory of the token ids."""
+        counts: List[int] = []
+        for start in range(0, len(texts), 1000):
+            encoded = self.model.tokenizer(texts[start:start + 1000], add_special_tokens=False)["input_ids"]
+            counts.extend(len(ids) for ids in encoded)
+        return counts
+
+    def retrieve(self, query: str, k: int = 5, scopes: Optional[Sequence[Optional[ChunkFilter]]] = None) -> List[str]:
+        """
+        Returns the `k` chunks closest to `query`. With `scopes`, results are filled
+        from each scope in turn (None meaning the whole corpus), skipping chunks
+        an earlier scope already returned.
+        """
+        self.flush()
+        if not self.chunks: return []
         logging.info(f"  -> Searching for top {k} chunks for query: '{query}'")
-        query_embedding = self.model.encode([query])
-        if query_embedding.ndim == 1:
-            query_embedding = np.expand_dims(query_embedding, axis=0)
-        distances, indices = self.index.search(x=query_embedding.astype('float32'), k=k) # type: ignore
-        valid_indices = [i for i in indices[0] if i != -1]
-        return [self.chunks[i] for i in valid_indices]
\ No newline at end of file
+        return self._cached_search([query], k, [scopes or [None]])[0]
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        k: int = 5,
+        scopes: Optional[List[Sequence[Optional[ChunkFilter]]]] = None
+    ) -> List[List[str]]:
+        """
+        Like `retrieve`, for many queries at once: at most one encoder batch per scope
+        tier, and one search per index for all queries over the whole corpus.
+        `scopes`, if given, holds the scopes of each query.
+        """
+        self.flush()
+        if not self.chunks: return [[] for _ in queries]
+        if not queries: return []
+        logging.info(f"  -> Searching for top {k} chunks for {len(queries)} queries in one batch...")
+        return self._cached_search(queries, k, scopes or [[None]] * len(queries))
+
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        query_embeddings = self.model.encode(queries, batch_size=self.encode_batch_size, show_progress_bar=False)
+        if query_embeddings.ndim == 1:
+            query_embeddings = np.expand_dims(query_embeddings, axis=0)
+        return query_embeddings.astype('float32')
+
+    def _query_key(self, query: str, k: int, query_scopes: Sequence[Optional[ChunkFilter]]) -> str:
+        """(Helper) The query cache key of one search against the current index version."""
+        scope_keys = [
+            None if chunk_filter is None else [
+                sorted(chunk_filter.kinds) if chunk_filter.kinds is not None else None,
+                sorted(str(path) for path in chunk_filter.paths) if chunk_filter.paths is not None else None,
+            ]
+            for chunk_filter in query_scopes
+        ]
+        key = json.dumps([self.index_version, f"{self._added_digest:064x}", query, k, scope_keys])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _cached_search(
+        self,
+        queries: List[str],
+        k: int,
+        scopes: List[Sequence[Optional[ChunkFilter]]]
+    ) -> List[List[str]]:
+        """
+        (Helper) `_search`, answering repeated queries from the query cache. Results are
+        cached as chunk hashes, since chunk ids depend on the order chunks were added in.
+        """
+        keys = [self._query_key(query, k, query_scopes) for query, query_scopes in zip(queries, scopes)]
+        results: List[Optional[List[str]]] = [self.query_cache.get(key) for key in keys]
+        misses = [
+            q for q, hashes in enumerate(results)
+            if hashes is None or not all(key in self._chunks_by_hash for key in hashes)
+        ]
+        self.stats["query_cache_hits"] += len(queries) - len(misses)
+        self.stats["query_cache_misses"] += len(misses)
+        if misses:
+            found = self._search([queries[q] for q in misses], k, [scopes[q] for q in misses])
+            for q, ids in zip(misses, found):
+                results[q] = [self._chunk_hashes[i] for i in ids]
+                self.query_cache.put(keys[q], results[q])
+        return [[self._chunks_by_hash[key] for key in hashes] for hashes in results]
+
+    def _search(
+        self,
+        queries: List[str],
+        k: int,
+        scopes: List[Sequence[Optional[ChunkFilter]]]
+    ) -> List[List[int]]:
+        """(Helper) Fills each query's results, as chunk ids, from its scopes in turn, fusing lexical and dense rankings."""
+        results: List[List[int]] = [[] for _ in queries]
+        query_embeddings: Dict[int, np.ndarray] = {}
+        for tier in range(max(len(query_scopes) for query_scopes in scopes)):
+            active = [q for q, query_scopes in enumerate(scopes) if tier < len(query_scopes) and len(results[q]) < k]
+            scope_ids = {q: self._ids_matching(scopes[q][tier]) for q in active}
+            # Searching each scope for k hits always leaves enough new ones after
+            # dropping those already taken from earlier scopes.
+            lexical_hits = {
+                q: self.lexical_index.search(
+                    queries[q], k,
+                    ids=set(scope_ids[q].tolist()) if scope_ids[q] is not None else None,
+                    tie_break=self.chunks.__getitem__,
+                )
+                for q in active
+            }
+            dense = [q for q in active if not self._is_strong_lexical_match(lexical_hits[q], scope_ids[q], k)]
+            self.stats["lexical_only_searches"] += len(active) - len(dense)
+            self.stats["hybrid_searches"] += len(dense)
+
+            to_encode = [q for q in dense if q not in query_embeddings]
+            if to_encode:
+                query_embeddings.update(zip(to_encode, self._encode_queries([queries[q] for q in to_encode])))
+            unrestricted = [q for q in dense if scope_ids[q] is None]
+            dense_hits: Dict[int, List[int]] = {}
+            if unrestricted:
+                dense_hits.update(zip(unrestricted, self._search_all(np.stack([query_embeddings[q] for q in unrestricted]), k)))
+            for q in dense:
+                if scope_ids[q] is not None:
+                    dense_hits[q] = self._search_subset(query_embeddings[q], scope_ids[q], k)
+
+            for q in active:
+                ranking = [hit.chunk_id for hit in lexical_hits[q]]
+                if q in dense_hits:
+                    ranking = _reciprocal_rank_fusion(dense_hits[q], ranking, tie_break=self.chunks.__getitem__)
+                results[q].extend([i for i in ranking if i not in results[q]][:k - len(results[q])])
+        return results
+
+    def _is_strong_lexical_match(self, hits: List[LexicalHit], ids: Optional[np.ndarray], k: int) -> bool:
+        """(Helper) Whether every result the scope can supply is already an exact identifier or path hit."""
+        needed = min(k, len(ids) if ids is not None else len(self.chunks))
+        return needed > 0 and len(hits) >= needed and all(hit.exact for hit in hits[:needed])
+
+    def _ids_matching(self, chunk_filter: Optional[ChunkFilter]) -> Optional[np.ndarray]:
+        """(Helper) The sorted ids of the chunks passing `chunk_filter`, or None if it allows all of them."""
+        if chunk_filter is None or (chunk_filter.kinds is None and chunk_filter.paths is None):
+            return None
+        selected: Optional[Set[int]] = None
+        if chunk_filter.kinds is not None:
+            selected = {i for kind in chunk_filter.kinds for i in self._ids_by_kind.get(kind, [])}
+        if chunk_filter.paths is not None:
+            # A path matches itself and, if it is a directory, everything below it.
+            in_paths = {
+                i
+                for path, ids in self._ids_by_path.items()
+                if path in chunk_filter.paths or not chunk_filter.paths.isdisjoint(path.parents)
+                for i in ids
+            }
+            selected = in_paths if selected is None else selected & in_paths
+        return np.array(sorted(selected), dtype=np.int64)
+
+    def _search_all(self, query_embeddings: np.ndarray, k: int) -> List[List[int]]:
+        """
+        (Helper) Searches the base and delta indexes separately, then merges each
+        query's hits by distance. Delta ids are offset by the size of the base,
+        matching their position in self.chunks.
+        """
+        hits: List[List[Tuple[float, int]]] = [[] for _ in range(len(query_embeddings))]
+        offset = 0
+        for index in (self.base_index, self.delta_index):
+            if index is None:
+                continue
+            if index.ntotal:
+                distances, indices = index.search(x=query_embeddings, k=min(k, index.ntotal)) # type: ignore
+                for query_hits, row_distances, row_indices in zip(hits, distances, indices):
+                    query_hits.extend((distance, offset + i) for distance, i in zip(row_distances, row_indices) if i != -1)
+            offset += index.ntotal
+        results = []
+        for query_hits in hits:
+            query_hits.sort(key=lambda hit: (hit[0], self.chunks[hit[1]]))
+            results.append([i for _, i in query_hits[:k]])
+        return results
+
+    def _search_subset(self, query_embedding: np.ndarray, ids: np.ndarray, k: int) -> List[int]:
+        """(Helper) Like `_search_all` for one query, considering only the chunks in `ids`."""
+        hits: List[Tuple[float, int]] = []
+        offset = 0
+        for index in (self.base_index, self.delta_index):
+            if index is None:
+                continue
+            local_ids = ids[(ids >= offset) & (ids < offset + index.ntotal)] - offset
+            if len(local_ids):
+                distances, found = self._search_index_subset(index, query_embedding, local_ids, k)
+                hits.extend((distance, offset + int(i)) for distance, i in zip(distances, found))
+            offset += index.ntotal
+        hits.sort(key=lambda hit: (hit[0], self.chunks[hit[1]]))
+        return [i for _, i in hits[:k]]
+
+    def _search_index_subset(
+        self,
+        index: faiss.Index,
+        query_embedding: np.ndarray,
+        local_ids: np.ndarray,
+        k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (Helper) The `k` nearest of `local_ids` within a single index, as (distances, ids),
+        nearest first. Where exact distances are at hand, every id tied with the k-th is
+        included, leaving the caller to break ties on content.
+        """
+        if len(local_ids) == index.ntotal:
+            # The scope covers the whole index (e.g. all initial chunks), so no filtering is needed.
+            distances, found = index.search(query_embedding[None, :], min(k, index.ntotal)) # type: ignore
+            keep = found[0] != -1
+            return distances[0][keep], found[0][keep]
+        if isinstance(index, faiss.IndexHNSWFlat):
+            index = faiss.downcast_index(index.storage)
+        if isinstance(index, faiss.IndexFlat):
+            # Exact distances over just the partition, instead of a scan of the whole index.
+            vectors = index.reconstruct_batch(local_ids)
+            distances = ((vectors - query_embedding) ** 2).sum(axis=1)
+            candidates = np.arange(len(distances))
+            if len(distances) > k:
+                candidates = np.flatnonzero(distances <= np.partition(distances, k - 1)[k - 1])
+            order = candidates[np.argsort(distances[candidates], kind="stable")]
+            return distances[order], local_ids[order]
+        # Quantized IVF vectors can't be reconstructed exactly, so the search itself is
+        # filtered. Every list is probed, or members in distant lists would be missed.
+        params = faiss.SearchParametersIVF(
+            sel=faiss.IDSelectorBatch(local_ids),
+            nprobe=faiss.extract_index_ivf(index).nlist,
+        )
+        distances, found = index.search(query_embedding[None, :], min(k, len(local_ids)), params=params) # type: ignore
+        keep = found[0] != -1
+        return distances[0][keep], found[0][keep]
+
+
+def _prune_snapshots(unused_since: float):
+    """
+    Deletes the snapshots (with their chunk tables and query caches) whose index file
+    was last written or mapped before `unused_since`, a Unix time, along with any
+    leftovers of interrupted writes from before then.
+    """
+    last_used: Dict[str, float] = {}
+    for path in FAISS_INDEX_DIR_NAME.glob("*.faiss"):
+        try:
+            last_used[path.name[:-len(".faiss")]] = path.stat().st_mtime
+        except FileNotFoundError:  # Pruned by a concurrent job.
+            continue
+    for path in FAISS_INDEX_DIR_NAME.iterdir():
+        snapshot_id = path.name.split(".", 1)[0]
+        try:
+            stale = last_used.get(snapshot_id, path.stat().st_mtime) < unused_since
+        except FileNotFoundError:
+            continue
+        if stale:
+            path.unlink(missing_ok=True)
+
+
+def _reciprocal_rank_fusion(*rankings: List[int], tie_break: Callable[[int], Any] = lambda chunk_id: chunk_id) -> List[int]:
+    """
+    Merges rankings of chunk ids, favouring ids ranked highly by any of them.
+    Equal scores are common (e.g. first in one ranking vs first in the other), so
+    they are ordered by `tie_break`.
+    """
+    scores: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            scores[chunk_id] += 1 / (RRF_RANK_OFFSET + rank + 1)
+    return sorted(scores, key=lambda chunk_id: (-scores[chunk_id], tie_break(chunk_id)))
@@ -0,0 +1,70 @@
+# conductdoc/scheduler.py
+"""🗓️ Runs a graph of dependent tasks with bounded concurrency.
+
+A task starts once every task it depends on has finished. Starting and
+finishing tasks happens on the calling thread, so that is where shared state
+(e.g. the Retriever) may be touched; only the work each task returns runs on
+the worker threads. That suits LLM calls, which spend their time waiting on
+the network.
+"""
+import heapq
+import itertools
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Set, Tuple, TypeVar
+
+Task = TypeVar("Task", bound=Hashable)
+
+
+def run_task_graph(
+    prerequisites: Mapping[Task, Set[Task]],
+    start: Callable[[List[Task]], List[Callable[[], Any]]],
+    finish: Callable[[Task, Any], None],
+    concurrency: int,
+    priority: Callable[[Task], Any]
+):
+    """
+    Runs every task in `prerequisites`, a mapping from each task to the tasks
+    that must finish before it starts.
+
+    Whenever workers are free, the ready tasks with the lowest `priority` are
+    passed to `start` in one batch, which returns the work to run for each.
+    `finish` receives each task's result as soon as it is done. At most
+    `concurrency` tasks run at a time.
+    """
+    remaining: Dict[Task, Set[Task]] = {task: set(required) for task, required in prerequisites.items()}
+    dependents: Dict[Task, List[Task]] = defaultdict(list)
+    for task, required in remaining.items():
+        for prerequisite in required:
+            if prerequisite not in remaining:
+                raise ValueError(f"Task {task!r} depends on unknown task {prerequisite!r}.")
+            dependents[prerequisite].append(task)
+
+    # Heap entries are (priority, tie-breaker, task), so tasks themselves are never compared.
+    counter = itertools.count()
+    ready: List[Tuple[Any, int, Task]] = [
+        (priority(task), next(counter), task) for task, required in remaining.items() if not required
+    ]
+    heapq.heapify(ready)
+    finished = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        running: Dict[Future, Task] = {}
+        while ready or running:
+            batch = [heapq.heappop(ready)[2] for _ in range(min(len(ready), max(1, concurrency) - len(running)))]
+            if batch:
+                for task, work in zip(batch, start(batch)):
+                    running[executor.submit(work)] = task
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda future: priority(running[future])):
+                task = running.pop(future)
+                finish(task, future.result())
+                finished += 1
+                for dependent in dependents[task]:
+                    remaining[dependent].discard(task)
+                    if not remaining[dependent]:
+                        heapq.heappush(ready, (priority(dependent), next(counter), dependent))
+
+    if finished < len(remaining):
+        raise ValueError(f"{len(remaining) - finished} tasks could never start: their prerequisites form a cycle.")
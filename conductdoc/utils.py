@@ -4,10 +4,19 @@ import json
 import logging
 import hashlib
 import functools
+import os
+import sys
+import threading
 from pathlib import Path
-from typing import Dict, Set, Any, Callable
+from typing import Dict, Mapping, Set, Any, Callable, Optional
 
-from .config import DEBUG_DIR_NAME, CACHE_DIR_NAME
+# `resource` is POSIX-only. Memory reporting is simply skipped where it's unavailable.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from .config import DEBUG_DIR_NAME, CACHE_DIR_NAME, ERROR_RESPONSE_PREFIX
 
 
 def setup_logging():
@@ -19,8 +28,30 @@ def setup_logging():
     )
 
 
+def _peak_rss_mb(who: int) -> Optional[float]:
+    """Returns the peak resident set size for `who` (a resource.RUSAGE_* constant) in MB."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS but in kilobytes on Linux.
+    bytes_per_unit = 1 if sys.platform == "darwin" else 1024
+    return max_rss * bytes_per_unit / (1024 * 1024)
+
+
+def log_peak_memory(stage: str):
+    """Logs the peak RSS of this process and of its largest child (e.g. a crawl worker)."""
+    if resource is None:
+        return
+    main_rss = _peak_rss_mb(resource.RUSAGE_SELF)
+    child_rss = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+    message = f"📈 Peak RSS after {stage}: {main_rss:.1f} MB"
+    if child_rss:
+        message += f" (largest worker process: {child_rss:.1f} MB)"
+    logging.info(message)
+
+
 def save_debug_data(
-    import_graph: Dict[Path, Set[Path]],
+    import_graph: Mapping[Path, Set[Path]],
     module_map: Dict[str, Path],
     ast_map: Dict[Path, Any],
     project_root: Path,
@@ -62,6 +93,25 @@ def save_debug_data(
     logging.info(f"  -> Saved '{docs_context_path}'")
 
 
+def estimate_tokens(text: str) -> int:
+    """A rough, tokenizer-free token count (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def _prompt_marker_path(prompt: str, model_name: str) -> Path:
+    """(Helper) The marker file recording that `prompt` was answered by `model_name` before."""
+    key_string = f"prompt: {prompt} | model: {model_name}"
+    return CACHE_DIR_NAME / "prompts" / hashlib.md5(key_string.encode('utf-8')).hexdigest()
+
+
+def has_cached_prompt(prompt: str, model_name: str) -> bool:
+    """
+    Whether a response for this prompt and model exists in the cache, for any
+    context. Used by the run planner to predict cache hits without a context.
+    """
+    return _prompt_marker_path(prompt, model_name).is_file()
+
+
 def cache_llm_call(func: Callable) -> Callable:
     """
     A decorator that caches the results of an LLM call to a file-based cache.
@@ -92,17 +142,30 @@ def cache_llm_call(func: Callable) -> Callable:
         CACHE_DIR_NAME.mkdir(exist_ok=True)
         cache_file = CACHE_DIR_NAME / f"{hash_key}.txt"
 
-        # 4. Check for a cache hit. If the file exists, return its content.
+        # Every cached prompt also gets a context-free marker, which lets the run
+        # planner estimate hit rates before any context has been built.
+        prompt_marker = _prompt_marker_path(prompt, model_name)
+        prompt_marker.parent.mkdir(exist_ok=True)
+
+        # 4. Check for a cache hit. If the file exists, return its content. Older
+        #    versions also cached error messages; those are retried instead.
         if cache_file.is_file():
-            logging.info(f"  -> ✅ Cache HIT for prompt: {prompt[:50]}...")
-            return cache_file.read_text(encoding="utf-8")
+            cached = cache_file.read_text(encoding="utf-8")
+            if not cached.startswith(ERROR_RESPONSE_PREFIX):
+                logging.info(f"  -> ✅ Cache HIT for prompt: {prompt[:50]}...")
+                prompt_marker.touch()
+                return cached
 
         # 5. Cache miss: run the original, decorated function to get the live result.
         logging.info(f"  -> 🐢 Cache MISS for prompt: {prompt[:50]}...")
         result = func(*args, **kwargs)
         
-        # 6. Save the new result to the cache file for future use.
-        cache_file.write_text(result, encoding="utf-8")
+        # 6. Save the new result to the cache file for future use. Concurrent calls may
+        #    share a cache file, so it is written to a unique sibling and renamed into place.
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_file.write_text(result, encoding="utf-8")
+        tmp_file.replace(cache_file)
+        prompt_marker.touch()
         
         return result
 
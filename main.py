@@ -4,25 +4,60 @@
 
 This script orchestrates the entire AI documentation pipeline by calling
 modules from the 'conductdoc' library in a clear, sequential manner.
+
+Modules with heavy dependencies (torch, faiss, openai) are only imported once
+the phase that needs them starts, so cache maintenance and partial runs stay
+fast. `benchmarks/check_import_time.py` guards this.
 """
 import argparse
 import logging
 import shutil
+from contextlib import nullcontext
 from pathlib import Path
-import tempfile
+from typing import Iterable
 
-# Local application imports
+# Local application imports. The analyzer is imported in the analyze phase.
 from conductdoc.utils import setup_logging, save_debug_data
 from conductdoc.crawler import (
-    clone_repo,
+    checkout_repo,
     find_source_directory,
     find_docs_directory,
     crawl_source_code,
     ingest_docs_context,
 )
-from conductdoc.analyzer import analyze_repo_with_rag
 from conductdoc.generator import create_documentation_file
-from conductdoc.config import OUTPUT_DIR_NAME, CACHE_DIR_NAME
+from conductdoc.planner import plan_run, log_run_plan
+from conductdoc.prefetch import EmbeddingPrefetcher
+from conductdoc.config import (
+    OUTPUT_DIR_NAME, CACHE_DIR_NAME, CACHE_PATHS, ANN_MIN_CORPUS_SIZE, ENCODER_BACKENDS, FILE_SUMMARY_MODES, INDEX_BACKENDS,
+    PIPELINE_PHASES
+)
+from conductdoc.models import DocsContext
+
+
+def positive_int(value: str) -> int:
+    """(Helper) An argparse type for counts of workers, threads or concurrent calls, which must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def clear_caches(cache_paths: Iterable[Path]):
+    """(Helper) Deletes each cache directory or file in `cache_paths` that exists."""
+    for cache_path in cache_paths:
+        if not cache_path.exists():
+            logging.info(f"✨ Cache '{cache_path}' does not exist, nothing to clear.")
+            continue
+        logging.info(f"🔥 Clearing cache at '{cache_path}'...")
+        if cache_path.is_dir():
+            shutil.rmtree(cache_path)
+        else:
+            cache_path.unlink()
+    logging.info("✅ Cache cleared.")
 
 
 def main():
@@ -33,7 +68,9 @@ def main():
         description="ConductDoc AI Documentation Generator",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
-    parser.add_argument("--repo-url", required=True, help="URL of the Git repository to analyze.")
+    repo_source = parser.add_mutually_exclusive_group(required=True)
+    repo_source.add_argument("--repo-url", help="URL of the Git repository to analyze. A mirror of it is cached in .mirrors/.")
+    repo_source.add_argument("--repo-path", help="Path to an existing local checkout to document in place, without cloning.")
     parser.add_argument("--src-dir", help="(Optional) Override for the main source code directory.")
     parser.add_argument("--docs-dir", help="(Optional) Override for the documentation source directory.")
     parser.add_argument(
@@ -42,6 +79,75 @@ def main():
         default='local',
         help="Specify the LLM service: 'local' for Ollama or 'openrouter' for hosted models."
     )
+    parser.add_argument(
+        "--phase",
+        choices=PIPELINE_PHASES,
+        default='generate',
+        help="Run the pipeline up to and including this phase. 'crawl' only parses the sources and docs; 'analyze' also fills the LLM and index caches."
+    )
+    parser.add_argument(
+        "--index-backend",
+        choices=INDEX_BACKENDS,
+        default='flat',
+        help=f"FAISS index for the knowledge base. Approximate backends are only used once it has at least {ANN_MIN_CORPUS_SIZE} chunks."
+    )
+    parser.add_argument(
+        "--encoder-backend",
+        choices=ENCODER_BACKENDS,
+        default='torch',
+        help="Sentence-encoder runtime. 'torch-int8' quantizes the model's linear layers to int8; the ONNX backends need sentence-transformers[onnx]."
+    )
+    parser.add_argument(
+        "--encoder-threads",
+        type=positive_int,
+        default=None,
+        help="(Optional) Number of CPU threads the sentence encoder may use. Defaults to the runtime's own choice."
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=positive_int,
+        default=1,
+        help="Maximum number of file and directory summaries generated at the same time."
+    )
+    parser.add_argument(
+        "--file-summary-mode",
+        choices=FILE_SUMMARY_MODES,
+        default='combined',
+        help="'combined' requests both summaries of a file in one JSON response, falling back to 'separate' (one call each) when it doesn't validate."
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Load the sentence encoder and embed chunks in a background thread while the crawl is still running."
+    )
+    parser.add_argument(
+        "--crawl-workers",
+        type=positive_int,
+        default=1,
+        help="Number of worker processes used to parse source files and convert docs. 1 runs serially in-process."
+    )
+    parser.add_argument(
+        "--full-crawl",
+        action="store_true",
+        help="Ignore the incremental crawl manifest and re-parse every source file."
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Dry run: crawl, then report the LLM calls, prompt tokens, expected cache hits and wall time of a full run, without calling any LLM."
+    )
+    parser.add_argument(
+        "--plan-concurrency",
+        type=positive_int,
+        default=1,
+        help="Number of concurrent LLM calls assumed by the --plan wall-time projection."
+    )
+    parser.add_argument(
+        "--plan-latency",
+        type=float,
+        default=5.0,
+        help="Seconds per uncached LLM call assumed by the --plan wall-time projection."
+    )
     parser.add_argument(
         "--save-debug-data",
         action="store_true",
@@ -50,27 +156,34 @@ def main():
     parser.add_argument(
         "--clear-cache",
         action="store_true",
-        help="Delete all cached LLM responses in the .cache/ directory before running."
+        help="Delete all cached LLM responses in the .cache/ directory before running. The crawl, docs, "
+             "mirror, embedding and index caches are kept; use --clear-all-caches to delete those too."
+    )
+    parser.add_argument(
+        "--clear-all-caches",
+        action="store_true",
+        help="Delete every cache before running: LLM responses (.cache/), crawl manifests (.crawl_manifests/), "
+             "converted docs (.docs_cache/), mirror clones (.mirrors/), embeddings (.embedding_cache.sqlite) "
+             "and index snapshots (.faiss_index/)."
     )
     args = parser.parse_args()
 
     # Handle cache clearing before any main logic
-    if args.clear_cache:
-        if CACHE_DIR_NAME.exists():
-            logging.info(f"🔥 Clearing LLM response cache at '{CACHE_DIR_NAME}'...")
-            shutil.rmtree(CACHE_DIR_NAME)
-            logging.info("✅ Cache cleared.")
-        else:
-            logging.info("✨ Cache directory does not exist, nothing to clear.")
+    if args.clear_all_caches:
+        clear_caches(CACHE_PATHS)
+    elif args.clear_cache:
+        clear_caches([CACHE_DIR_NAME])
 
     try:
-        # Use a temporary directory for cloning to ensure automatic cleanup
-        with tempfile.TemporaryDirectory() as temp_dir_str:
-            repo_path = Path(temp_dir_str)
-            
+        # A local checkout is used in place; a URL gets a temporary worktree of
+        # its cached mirror, which is removed automatically afterwards.
+        if args.repo_path:
+            repo_context = nullcontext(Path(args.repo_path))
+        else:
+            repo_context = checkout_repo(args.repo_url, src_dir=args.src_dir, docs_dir=args.docs_dir)
+
+        with repo_context as repo_path:
             # === PHASE 1: CRAWL & COLLECT 🕷️ ===
-            clone_repo(args.repo_url, repo_path)
-            
             src_path = repo_path / args.src_dir if args.src_dir else find_source_directory(repo_path)
             docs_path = repo_path / args.docs_dir if args.docs_dir else find_docs_directory(repo_path)
             
@@ -78,30 +191,75 @@ def main():
                 logging.error(f"❌ Source directory not found. Cannot proceed. Attempted path: {src_path}")
                 return
 
-            all_elements, import_graph, ast_map, module_map = crawl_source_code(src_path)
-            docs_context = ingest_docs_context(docs_path) if docs_path and docs_path.is_dir() else ""
-            
+            prefetcher = None
+            if args.pipeline and args.phase != 'crawl' and not args.plan:
+                prefetcher = EmbeddingPrefetcher(
+                    index_backend=args.index_backend,
+                    encoder_backend=args.encoder_backend,
+                    encoder_threads=args.encoder_threads,
+                )
+
+            crawl = crawl_source_code(
+                src_path,
+                workers=args.crawl_workers,
+                keep_asts=args.save_debug_data,
+                incremental=not args.full_crawl,
+                on_elements=prefetcher.submit_code if prefetcher else None,
+                repo_key=args.repo_url or str(Path(args.repo_path).resolve()),
+            )
+            if docs_path and docs_path.is_dir():
+                docs_context = ingest_docs_context(
+                    docs_path,
+                    workers=args.crawl_workers,
+                    on_section=prefetcher.submit_docs if prefetcher else None,
+                )
+            else:
+                docs_context = DocsContext()
+
             if args.save_debug_data:
                 save_debug_data(
-                    import_graph=import_graph,
-                    module_map=module_map,
-                    ast_map=ast_map,
+                    import_graph=crawl.import_graph,
+                    module_map=crawl.module_map,
+                    ast_map=crawl.ast_map,
                     project_root=src_path.parent,
-                    docs_context=docs_context
+                    docs_context=docs_context.html
                 )
 
             readme_content = (repo_path / "README.md").read_text(encoding="utf-8") if (repo_path / "README.md").is_file() else ""
-            
+
+            if args.plan:
+                phases = plan_run(crawl, docs_context, readme_content, src_path.parent, args.llm_mode, args.file_summary_mode)
+                log_run_plan(phases, concurrency=args.plan_concurrency, latency=args.plan_latency)
+                return
+
+            if args.phase == 'crawl':
+                logging.info(f"🏁 Stopping after the crawl phase: {len(crawl.elements)} code elements found.")
+                return
+
             # === PHASE 2: ANALYZE 🧠 ===
+            # Deferred import: this pulls in sentence-transformers, torch, faiss and openai.
+            from conductdoc.analyzer import analyze_repo_with_rag
+
+            retriever = prefetcher.finish() if prefetcher else None
             analysis_result, all_elements_with_docs = analyze_repo_with_rag(
-                elements=all_elements, 
-                import_graph=import_graph,
+                elements=crawl.elements,
+                import_graph=crawl.import_graph,
                 project_root=src_path.parent,
                 readme_content=readme_content, 
                 docs_context=docs_context,
-                llm_mode=args.llm_mode
+                llm_mode=args.llm_mode,
+                index_backend=args.index_backend,
+                encoder_backend=args.encoder_backend,
+                encoder_threads=args.encoder_threads,
+                retriever=retriever,
+                llm_concurrency=args.llm_concurrency,
+                file_summary_mode=args.file_summary_mode
             )
             
+            if args.phase == 'analyze':
+                logging.info("🏁 Stopping after the analyze phase. LLM responses and the index snapshot are cached for the next run.")
+                return
+
             # === PHASE 3: GENERATE 📝 ===
             create_documentation_file(analysis_result, all_elements_with_docs)
 
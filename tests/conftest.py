@@ -0,0 +1,42 @@
+# tests/conftest.py
+"""Shared fixtures: the repository root on sys.path, and a fast, deterministic stub encoder."""
+import hashlib
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_WORD = re.compile(r"\w+")
+
+
+class _StubTokenizer:
+    def __call__(self, texts, add_special_tokens=True):
+        return {"input_ids": [_WORD.findall(text) for text in texts]}
+
+
+class StubEncoder:
+    """Embeds a text as its bag of hashed words: cheap, stable across runs, and with plenty of ties."""
+    max_seq_length = 256
+    tokenizer = _StubTokenizer()
+    dimensions = 16
+
+    def encode(self, texts, batch_size=32, show_progress_bar=True):
+        import numpy as np
+
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in _WORD.findall(text.lower()):
+                vectors[row, int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dimensions] += 1
+        return vectors
+
+
+@pytest.fixture
+def stub_encoder(monkeypatch, tmp_path):
+    """Makes every Retriever use StubEncoder, with its caches in a fresh working directory."""
+    retriever = pytest.importorskip("conductdoc.retriever")
+    monkeypatch.setattr(retriever, "load_encoder", lambda *args, **kwargs: StubEncoder())
+    monkeypatch.chdir(tmp_path)
+    return StubEncoder
@@ -0,0 +1,183 @@
+# tests/test_analyzer.py
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("faiss")
+
+from conductdoc import analyzer, prompts
+from conductdoc.crawler import crawl_source_code
+from conductdoc.models import DocsContext
+from conductdoc.retriever import Retriever
+
+
+def _write_package(root: Path) -> Path:
+    """A small package with an import chain, siblings that look alike and a subpackage."""
+    src = root / "pkg"
+    (src / "sub").mkdir(parents=True)
+    (src / "__init__.py").write_text('"""The package."""\n')
+    (src / "base.py").write_text('class Base:\n    """A base."""\n    def run(self):\n        return 1\n')
+    for name in ("alpha", "beta", "gamma", "delta", "epsilon"):
+        (src / f"{name}.py").write_text(
+            f'from pkg.base import Base\n\nclass {name.title()}(Base):\n    """The {name} variant."""\n'
+            f'    def run(self):\n        return "{name}"\n'
+        )
+    (src / "sub" / "__init__.py").write_text("")
+    for name in ("one", "two", "three"):
+        (src / "sub" / f"{name}.py").write_text(
+            f'from pkg.alpha import Alpha\n\ndef {name}():\n    """Run {name}."""\n    return Alpha().run()\n'
+        )
+    return src
+
+
+def _recording_llm(calls):
+    """A stub LLM that records every request and finishes them in a scrambled order."""
+    lock = threading.Lock()
+
+    def get_llm_response(prompt, context, mode, model_name_for_cache):
+        digest = hashlib.sha256((prompt + context).encode("utf-8")).hexdigest()
+        with lock:
+            calls.append((prompt, context))
+        time.sleep(int(digest[:2], 16) / 255 * 0.02)
+        # Formulaic answers, so that summaries tie in both BM25 and embedding rankings.
+        summary = f"<p>This module handles part {int(digest[:1], 16) % 3}.</p>"
+        if "Return ONLY a JSON object" in prompt:
+            return json.dumps({key: summary for key in prompts.FILE_SUMMARY_KEYS})
+        return summary
+
+    return get_llm_response
+
+
+def test_summary_prompts_do_not_depend_on_concurrency(stub_encoder, tmp_path, monkeypatch):
+    src = _write_package(tmp_path)
+    crawl = crawl_source_code(src)
+
+    prompts_by_concurrency = {}
+    for concurrency in (1, 8, 8):
+        calls = []
+        monkeypatch.setattr(analyzer, "get_llm_response", _recording_llm(calls))
+        retriever = Retriever()
+        retriever.build_initial_indexes(doc_chunks=[], code_elements=crawl.elements)
+        html, _, _, _ = analyzer.generate_recursive_summary(
+            crawl.elements, retriever, "A readme.", "local", "model",
+            crawl.import_graph, src.parent, llm_concurrency=concurrency,
+        )
+        retriever.close()
+        prompts_by_concurrency.setdefault(concurrency, []).append((sorted(calls), html))
+
+    (sequential,) = prompts_by_concurrency[1]
+    assert len(sequential[0]) > 10
+    for concurrent in prompts_by_concurrency[8]:
+        assert concurrent == sequential
+
+
+@pytest.mark.parametrize("response", [
+    '{"abstractive": "<p>Short.</p>", "detailed": "<p>Long.</p>"}',
+    '```json\n{"abstractive": " <p>Short.</p> ", "detailed": "<p>Long.</p>", "extra": 1}\n```',
+])
+def test_parse_file_summaries_accepts_both_summaries(response):
+    assert analyzer._parse_file_summaries(response) == {"abstractive": "<p>Short.</p>", "detailed": "<p>Long.</p>"}
+
+
+@pytest.mark.parametrize("response", [
+    "<p>Plain HTML instead of JSON.</p>",
+    '{"abstractive": "<p>Short.</p>", "detailed": "<p>Long.</p>"',
+    '["<p>Short.</p>", "<p>Long.</p>"]',
+    '{"abstractive": "<p>Short.</p>"}',
+    '{"abstractive": "<p>Short.</p>", "detailed": "   "}',
+    '{"abstractive": "<p>Short.</p>", "detailed": ["<p>Long.</p>"]}',
+    '{"abstractive": null, "detailed": "<p>Long.</p>"}',
+])
+def test_parse_file_summaries_rejects_invalid_responses(response):
+    assert analyzer._parse_file_summaries(response) is None
+
+
+def test_invalid_combined_summaries_fall_back_to_separate_calls(monkeypatch):
+    prompts_sent = []
+
+    def get_llm_response(prompt, context, mode, model_name_for_cache):
+        prompts_sent.append(prompt)
+        return "<p>Not JSON.</p>" if "JSON" in prompt else f"<p>Summary {len(prompts_sent)}.</p>"
+
+    monkeypatch.setattr(analyzer, "get_llm_response", get_llm_response)
+    summaries = analyzer._summarize_code_file(Path("pkg/core.py"), [], [], "local", "model")
+
+    assert prompts_sent == [
+        prompts.file_combined_prompt(Path("pkg/core.py")),
+        prompts.file_abstractive_prompt(Path("pkg/core.py")),
+        prompts.file_detailed_prompt(Path("pkg/core.py")),
+    ]
+    assert summaries == {"abstractive": "<p>Summary 2.</p>", "detailed": "<p>Summary 3.</p>"}
+
+
+def test_architecture_context_keeps_alike_summaries_and_logs_dropped_ones(caplog):
+    boilerplate = "<p>This module provides the command line entry point that parses the options and runs the job.</p>"
+    summaries = {Path(f"pkg/cli/{name}.py"): boilerplate for name in ("build", "serve", "clean")}
+    summaries[Path("pkg/cli/huge.py")] = "<p>" + "details " * 20000 + "</p>"
+
+    packer = analyzer._context_packer("architecture", near_duplicates=False)
+    packer.reserve(boilerplate)
+    packed = analyzer._pack_summaries(packer, summaries, "MODULE")
+
+    assert set(packed) == {Path("pkg/cli/build.py"), Path("pkg/cli/serve.py"), Path("pkg/cli/clean.py")}
+    assert "pkg/cli/huge.py" in caplog.text
+
+
+def test_code_examples_run_concurrently_and_keep_the_task_order(stub_encoder, monkeypatch):
+    tasks = [f"Task {i}" for i in range(6)]
+    lock = threading.Lock()
+    in_flight, peak = [0], [0]
+
+    def get_llm_response(prompt, context, mode, model_name_for_cache):
+        if prompt == prompts.CAPABILITY_PROMPT:
+            return json.dumps({"example_tasks": tasks})
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        # Later tasks finish first.
+        topic = next(topic for topic in tasks if prompt == prompts.example_prompt(topic))
+        time.sleep(0.01 * (len(tasks) - tasks.index(topic)))
+        with lock:
+            in_flight[0] -= 1
+        return f"<pre>{topic}</pre>"
+
+    monkeypatch.setattr(analyzer, "get_llm_response", get_llm_response)
+    retriever = Retriever()
+    retriever.build_initial_indexes([("guide.md", "Call run() to start a job.")], [])
+    examples = analyzer.generate_code_examples("<p>A job runner.</p>", retriever, "local", "model", concurrency=3)
+    retriever.close()
+
+    assert list(examples.items()) == [(topic, f"<pre>{topic}</pre>") for topic in tasks]
+    assert 1 < peak[0] <= 3
+
+
+def test_architecture_diagram_overlaps_the_code_examples(monkeypatch):
+    examples_started = threading.Event()
+
+    class StubRetriever:
+        def build_initial_indexes(self, doc_chunks, code_elements): pass
+        def log_stats(self): pass
+        def close(self): pass
+
+    def generate_ai_architecture_diagram(**kwargs):
+        # Only finishes if the examples start while it runs.
+        assert examples_started.wait(timeout=5)
+        return "<svg/>"
+
+    def generate_code_examples(*args, **kwargs):
+        examples_started.set()
+        return {"Task": "<pre>example</pre>"}
+
+    monkeypatch.setattr(analyzer, "generate_recursive_summary", lambda *args: ("<p>Summary.</p>", "Summary.", {}, {}))
+    monkeypatch.setattr(analyzer, "generate_ai_architecture_diagram", generate_ai_architecture_diagram)
+    monkeypatch.setattr(analyzer, "generate_code_examples", generate_code_examples)
+    result, _ = analyzer.analyze_repo_with_rag(
+        [], {}, Path("."), "A readme.", DocsContext(), "local", retriever=StubRetriever(),
+    )
+
+    assert result.architecture_diagram == "<svg/>"
+    assert result.examples == {"Task": "<pre>example</pre>"}
@@ -0,0 +1,62 @@
+# tests/test_chunking.py
+from pathlib import Path
+
+from conductdoc.chunking import chunk_code_elements, class_skeleton
+from conductdoc.crawler import crawl_source_code
+
+MODULE = '''class Outer:
+    """The outer class."""
+
+    class Inner:
+        """The inner class."""
+        size = 3
+
+        @property
+        def grow(self):
+            return self.size + 1
+
+    def run(self):
+        return "running"
+'''
+
+
+def _elements(tmp_path: Path):
+    src = tmp_path / "pkg"
+    src.mkdir()
+    (src / "__init__.py").write_text("")
+    (src / "shapes.py").write_text(MODULE)
+    return {element.name: element for element in crawl_source_code(src, incremental=False).elements}
+
+
+def test_class_skeletons_leave_out_method_bodies(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    outer = _elements(tmp_path)["Outer"]
+
+    skeleton = class_skeleton(outer.source_code)
+
+    assert '"""The outer class."""' in skeleton
+    assert "    def run(self):\n        ..." in skeleton
+    assert "class Inner:\n        ..." in skeleton
+    assert "running" not in skeleton and "self.size + 1" not in skeleton
+
+
+def test_nested_classes_get_a_skeleton_too(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    elements = _elements(tmp_path)
+
+    skeleton = class_skeleton(elements["Inner"].source_code)
+
+    assert skeleton == (
+        'class Inner:\n    """The inner class."""\n    size = 3\n'
+        '    @property\n    def grow(self):\n        ...'
+    )
+
+
+def test_method_bodies_are_embedded_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    elements = _elements(tmp_path)
+
+    chunks = [chunk for _, chunk in chunk_code_elements(list(elements.values()), log_summary=False)]
+
+    assert sum("self.size + 1" in chunk for chunk in chunks) == 1
+    assert sum('return "running"' in chunk for chunk in chunks) == 1
@@ -0,0 +1,98 @@
+# tests/test_context.py
+import pytest
+
+from conductdoc.context import ContextPacker
+
+
+def words(text: str) -> int:
+    """Counts one token per word, so budgets are easy to reason about."""
+    return len(text.split())
+
+
+CHUNK = "def load(path): reads the configuration file and returns the parsed settings"
+
+
+def test_pieces_are_packed_in_order_until_the_budget_is_spent():
+    packer = ContextPacker(budget=10, count=words)
+
+    packed = packer.pack(["one two three four", "five six seven eight nine ten eleven", "twelve thirteen"])
+
+    assert packed == ["one two three four", "twelve thirteen"]
+    assert packer.used == 6
+    assert packer.over_budget == 1
+
+
+def test_reserved_text_counts_against_the_budget():
+    packer = ContextPacker(budget=5, count=words)
+    packer.reserve("a fixed header")
+
+    assert packer.add("alpha beta gamma") is None
+    assert packer.add("alpha beta") == "alpha beta"
+    assert packer.used == 5
+
+
+def test_exact_repeats_are_dropped_ignoring_whitespace():
+    packer = ContextPacker(budget=100, count=words)
+
+    packed = packer.pack([CHUNK, "  " + CHUNK.replace(" ", "\n  ") + "\n"])
+
+    assert packed == [CHUNK]
+    assert packer.duplicates == 1
+
+
+def test_near_duplicates_are_dropped_but_different_text_is_kept():
+    packer = ContextPacker(budget=100, count=words)
+    restated = CHUNK + " quickly"
+    different = "class Server: accepts connections and dispatches every request to a handler"
+
+    assert packer.pack([CHUNK, restated, different]) == [CHUNK, different]
+    assert packer.duplicates == 1
+
+
+def test_near_duplicates_can_be_kept():
+    packer = ContextPacker(budget=100, count=words, near_duplicates=False)
+
+    assert packer.pack([CHUNK, CHUNK + " quickly", CHUNK]) == [CHUNK, CHUNK + " quickly"]
+    assert packer.duplicates == 1
+
+
+def test_reserved_text_is_not_repeated():
+    packer = ContextPacker(budget=100, count=words)
+    packer.reserve(f"File overview: {CHUNK}")
+
+    assert packer.add(CHUNK) is None
+
+
+def test_truncation_keeps_the_whole_leading_lines_that_fit():
+    packer = ContextPacker(budget=6, count=words)
+    readme = "Title line\nfirst paragraph here\nsecond paragraph that does not fit\n"
+
+    assert packer.add(readme, truncate=True) == "Title line\nfirst paragraph here\n"
+    assert packer.used == 5
+    assert packer.truncated == 1
+    assert packer.add("more", truncate=True) == "more"
+    assert packer.add("no room left", truncate=True) is None
+    assert packer.over_budget == 1
+
+
+def test_tokens_are_counted_with_tiktoken_when_it_is_available():
+    from conductdoc import context
+
+    encoding = context._tiktoken_encoding()
+    if encoding is None:
+        pytest.skip("tiktoken or its encoding file is not available")
+    text = "def load(path):\n    return json.loads(Path(path).read_text())\n"
+
+    assert context.count_tokens(text) == len(encoding.encode(text))
+    packer = ContextPacker(budget=context.count_tokens(text))
+    assert packer.add(text) == text
+    assert packer.used == packer.budget
+
+
+def test_tokens_are_estimated_without_tiktoken(monkeypatch):
+    from conductdoc import context
+    from conductdoc.utils import estimate_tokens
+
+    monkeypatch.setattr(context, "_tiktoken_encoding", lambda: None)
+
+    assert context.count_tokens(CHUNK) == estimate_tokens(CHUNK)
@@ -0,0 +1,165 @@
+# tests/test_crawler.py
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from conductdoc.config import DOCS_CACHE_DIR_NAME, MIRROR_CACHE_DIR_NAME
+from conductdoc.crawler import checkout_repo, crawl_source_code, ingest_docs_context
+
+
+def _write_package(root: Path, name: str, functions) -> Path:
+    src = root / name / "src"
+    src.mkdir(parents=True)
+    for function in functions:
+        (src / f"{function}.py").write_text(f'def {function}():\n    """Run {function}."""\n    return 1\n')
+    return src
+
+
+def test_crawl_manifests_of_different_repos_do_not_evict_each_other(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = _write_package(tmp_path, "first", ["load", "save"])
+    second = _write_package(tmp_path, "second", ["fetch", "send"])
+
+    crawl_source_code(first)
+    crawl_source_code(second)
+    again = crawl_source_code(first)
+
+    assert again.unchanged_files == set(first.glob("*.py"))
+
+
+def _write_project(root: Path) -> Path:
+    """A package with relative and absolute imports, a subpackage, and a docs folder."""
+    src = root / "pkg"
+    (src / "sub").mkdir(parents=True)
+    (src / "__init__.py").write_text('"""The package."""\nfrom .core import Engine\n')
+    (src / "core.py").write_text(
+        'class Engine:\n    """Runs jobs."""\n\n    def run(self, job):\n        """Run one job."""\n        return job()\n'
+    )
+    (src / "sub" / "__init__.py").write_text("")
+    for name in ("alpha", "beta", "gamma"):
+        (src / "sub" / f"{name}.py").write_text(
+            f'from pkg.core import Engine\nfrom . import alpha\n\n\ndef {name}():\n    """Run {name}."""\n'
+            f'    return Engine().run(lambda: "{name}")\n'
+        )
+    docs = root / "docs"
+    docs.mkdir()
+    (docs / "index.rst").write_text("Welcome\n=======\n\nThe engine runs jobs.\n")
+    (docs / "guide.md").write_text("# Guide\n\nCall `Engine.run` with a job.\n")
+    return src
+
+
+def test_parallel_crawl_matches_serial_crawl(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    src = _write_project(tmp_path)
+
+    serial = crawl_source_code(src, workers=1, incremental=False)
+    parallel = crawl_source_code(src, workers=2, incremental=False)
+
+    assert parallel.elements == serial.elements
+    assert [element.source_code for element in parallel.elements] == [element.source_code for element in serial.elements]
+    assert parallel.module_map == serial.module_map
+    assert dict(parallel.import_graph) == dict(serial.import_graph)
+    assert serial.import_graph[src / "sub" / "beta.py"] == {src / "core.py", src / "sub" / "alpha.py"}
+
+
+def test_parallel_docs_ingestion_matches_serial_ingestion(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write_project(tmp_path)
+
+    serial = ingest_docs_context(tmp_path / "docs", workers=1)
+    shutil.rmtree(DOCS_CACHE_DIR_NAME)  # Make the workers convert the files again.
+    parallel = ingest_docs_context(tmp_path / "docs", workers=2)
+
+    assert [section.source for section in serial.sections] == ["index.rst", "guide.md"]
+    assert parallel.sections == serial.sections
+
+
+def _git(*args: str):
+    subprocess.run(["git", *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def origin(tmp_path, monkeypatch):
+    """A file:// repository with a src package, docs, and directories a run never reads."""
+    for variable in ("GIT_AUTHOR_NAME", "GIT_COMMITTER_NAME"):
+        monkeypatch.setenv(variable, "Test")
+    for variable in ("GIT_AUTHOR_EMAIL", "GIT_COMMITTER_EMAIL"):
+        monkeypatch.setenv(variable, "test@example.com")
+    repo = tmp_path / "origin"
+    for relative, content in {
+        "README.md": "# Origin\n",
+        "src/__init__.py": "",
+        "src/core.py": "def run():\n    return 1\n",
+        "docs/index.rst": "Origin\n======\n",
+        "tests/test_core.py": "def test_run():\n    pass\n",
+        "assets/logo.svg": "<svg/>\n",
+    }.items():
+        (repo / relative).parent.mkdir(parents=True, exist_ok=True)
+        (repo / relative).write_text(content)
+    _git("-C", str(repo), "init", "-q")
+    _git("-C", str(repo), "add", ".")
+    _git("-C", str(repo), "commit", "-q", "-m", "Initial commit")
+    return repo
+
+
+def test_checkout_is_sparse_and_removed_afterwards(origin, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    with checkout_repo(origin.as_uri()) as worktree:
+        files = {
+            str(path.relative_to(worktree)) for path in worktree.rglob("*")
+            if path.is_file() and path.name != ".git"
+        }
+        assert files == {"README.md", "src/__init__.py", "src/core.py", "docs/index.rst"}
+
+    assert not worktree.exists()
+
+
+def test_checkout_fetches_new_commits_into_the_same_mirror(origin, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with checkout_repo(origin.as_uri()):
+        pass
+    mirrors = list(MIRROR_CACHE_DIR_NAME.iterdir())
+
+    (origin / "src" / "extra.py").write_text("def extra():\n    return 2\n")
+    _git("-C", str(origin), "add", ".")
+    _git("-C", str(origin), "commit", "-q", "-m", "Add extra")
+    with checkout_repo(origin.as_uri(), src_dir="src", docs_dir="docs") as worktree:
+        assert (worktree / "src" / "extra.py").read_text() == "def extra():\n    return 2\n"
+        assert not (worktree / "tests").exists()
+
+    assert list(MIRROR_CACHE_DIR_NAME.iterdir()) == mirrors
+
+
+def test_relative_imports_from_above_the_top_level_package_create_no_edges(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    src = tmp_path / "pkg"
+    (src / "sub").mkdir(parents=True)
+    (src / "__init__.py").write_text("")
+    (src / "helpers.py").write_text("def helper():\n    return 1\n")
+    (src / "sub" / "__init__.py").write_text("from ... import outside\n")
+    (src / "sub" / "m.py").write_text("from .... import y\nfrom ...helpers import helper\nfrom .. import helpers\n")
+
+    graph = crawl_source_code(src, incremental=False).import_graph
+
+    assert graph[src / "sub" / "m.py"] == {src / "helpers.py"}
+    assert graph[src / "sub" / "__init__.py"] == set()
+
+
+def test_each_file_is_read_once_and_asts_are_only_kept_on_request(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    src = _write_project(tmp_path)
+    reads = []
+    read_bytes = Path.read_bytes
+    monkeypatch.setattr(Path, "read_bytes", lambda path: reads.append(path) or read_bytes(path))
+
+    streamed = crawl_source_code(src, incremental=False)
+    kept = crawl_source_code(src, keep_asts=True, incremental=False)
+
+    py_files = sorted(src.rglob("*.py"))
+    assert sorted(reads) == sorted(py_files * 2)
+    assert streamed.ast_map == {}
+    assert sorted(kept.ast_map) == py_files
+    assert streamed.elements == kept.elements
@@ -0,0 +1,54 @@
+# tests/test_embedding_cache.py
+import shutil
+
+import numpy as np
+import pytest
+
+from conductdoc.config import FAISS_INDEX_DIR_NAME
+from conductdoc.embedding_cache import EmbeddingCache, chunk_hash
+
+DOCS = [("guide.md", f"Section {i} explains how the scheduler orders task {i}.") for i in range(6)]
+
+
+def test_vectors_round_trip_per_model_and_persist(tmp_path):
+    path = tmp_path / "embeddings.sqlite"
+    keys = [chunk_hash("alpha"), chunk_hash("beta")]
+    vectors = np.arange(8, dtype=np.float32).reshape(2, 4)
+    cache = EmbeddingCache(path, "model-a")
+    cache.put_many(keys, vectors)
+    cache.close()
+
+    reopened = EmbeddingCache(path, "model-a")
+    found = reopened.get_many(keys + [chunk_hash("gamma")])
+    other_model = EmbeddingCache(path, "model-b").get_many(keys)
+
+    assert set(found) == set(keys)
+    np.testing.assert_array_equal(found[keys[1]], vectors[1])
+    assert other_model == {}
+
+
+def test_lookups_beyond_the_sqlite_parameter_limit(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite", "model")
+    keys = [chunk_hash(str(i)) for i in range(1200)]
+    cache.put_many(keys, np.ones((1200, 2), dtype=np.float32))
+
+    assert len(cache.get_many(keys)) == 1200
+
+
+def test_unchanged_chunks_are_not_re_encoded(stub_encoder):
+    retriever_module = pytest.importorskip("conductdoc.retriever")
+
+    first = retriever_module.Retriever()
+    first.build_initial_indexes(DOCS, [])
+    first.close()
+    # Without the saved index, the next run has to look up every embedding.
+    shutil.rmtree(FAISS_INDEX_DIR_NAME)
+    changed = DOCS[:-1] + [("guide.md", "A rewritten section about retries.")]
+    second = retriever_module.Retriever()
+    second.build_initial_indexes(changed, [])
+
+    assert first.stats["embedding_cache_misses"] == len(DOCS)
+    assert second.stats["embedding_cache_hits"] == len(DOCS) - 1
+    assert second.stats["embedding_cache_misses"] == 1
+    assert second.retrieve("retries", k=1) == [second.chunks[-1]]
+    second.close()
@@ -0,0 +1,83 @@
+# tests/test_encoders.py
+import shutil
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+
+from conductdoc import encoders
+from conductdoc.config import FAISS_INDEX_DIR_NAME
+
+
+class FakeSentenceTransformer(torch.nn.Sequential):
+    """Records how it was loaded, and has one linear layer to quantize."""
+
+    def __init__(self, model_name, device=None, **kwargs):
+        super().__init__(torch.nn.Linear(4, 4))
+        self.model_name = model_name
+        self.device_name = device
+        self.load_kwargs = kwargs
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    threads = []
+    monkeypatch.setattr(encoders, "SentenceTransformer", FakeSentenceTransformer)
+    monkeypatch.setattr(encoders.torch, "set_num_threads", threads.append)
+    return threads
+
+
+def test_every_backend_but_torch_has_its_own_cache_key():
+    keys = {encoders.encoder_key("all-MiniLM-L6-v2", backend) for backend in encoders.ENCODER_BACKENDS}
+
+    assert encoders.encoder_key("all-MiniLM-L6-v2", "torch") == "all-MiniLM-L6-v2"
+    assert len(keys) == len(encoders.ENCODER_BACKENDS)
+
+
+def test_torch_backend_loads_the_model_as_is(fake_models):
+    model = encoders.load_encoder("model", "torch", threads=3)
+
+    assert isinstance(model[0], torch.nn.Linear)
+    assert model.device_name is None
+    assert fake_models == [3]
+
+
+def test_torch_int8_backend_quantizes_linear_layers_on_the_cpu(fake_models):
+    model = encoders.load_encoder("model", "torch-int8")
+
+    assert type(model[0]).__module__.startswith("torch.ao.nn.quantized.dynamic")
+    assert model.device_name == "cpu"
+    assert fake_models == []
+
+
+def test_onnx_backends_load_the_exported_graph(fake_models):
+    pytest.importorskip("onnxruntime")
+
+    full = encoders.load_encoder("model", "onnx", threads=2)
+    quantized = encoders.load_encoder("model", "onnx-int8")
+
+    assert full.load_kwargs["backend"] == "onnx"
+    assert full.load_kwargs["model_kwargs"]["session_options"].intra_op_num_threads == 2
+    assert "file_name" not in full.load_kwargs["model_kwargs"]
+    assert quantized.load_kwargs["model_kwargs"]["file_name"] == encoders.ONNX_INT8_FILE_NAME
+
+
+def test_unknown_backends_are_rejected():
+    with pytest.raises(ValueError, match="Unknown encoder backend"):
+        encoders.load_encoder("model", "tensorrt")
+
+
+def test_retrievers_cache_embeddings_per_encoder_backend(stub_encoder):
+    from conductdoc.retriever import Retriever
+
+    docs = [("guide.md", "Quantized embeddings differ slightly.")]
+    stats = {}
+    for backend in ("torch", "torch-int8", "torch"):
+        shutil.rmtree(FAISS_INDEX_DIR_NAME, ignore_errors=True)
+        retriever = Retriever(encoder_backend=backend)
+        retriever.build_initial_indexes(docs, [])
+        retriever.close()
+        stats.setdefault(backend, []).append(retriever.stats["embedding_cache_hits"])
+
+    assert stats == {"torch": [0, 1], "torch-int8": [0]}
@@ -0,0 +1,61 @@
+# tests/test_graph.py
+import sys
+from pathlib import Path
+
+from conductdoc.graph import ImportGraph
+
+A, B, C, D, E, F = (Path(f"{name}.py") for name in "abcdef")
+
+
+def _graph() -> ImportGraph:
+    # a -> b -> c -> b is a cycle; d imports the cycle and e; f imports nothing and isn't imported.
+    return ImportGraph({A: {B}, B: {C}, C: {B}, D: {C, E}, E: set(), F: set()})
+
+
+def _position(components, filepath: Path) -> int:
+    return next(index for index, component in enumerate(components) if filepath in component)
+
+
+def test_components_group_cycles_and_come_in_dependency_order():
+    graph = _graph()
+
+    assert sorted(map(sorted, graph.components)) == [[A], [B, C], [D], [E], [F]]
+    for filepath, dependencies in graph.items():
+        for dependency in dependencies:
+            if dependency not in graph.component_of(filepath):
+                assert _position(graph.components, dependency) < _position(graph.components, filepath)
+    assert graph.component_of(C) == frozenset({B, C})
+    assert graph.component_of(F) == frozenset({F})
+
+
+def test_components_are_deterministic():
+    edges = {A: {B}, B: {C}, C: {B}, D: {C, E}, E: set(), F: set()}
+
+    shuffled = ImportGraph(dict(reversed(list(edges.items()))))
+
+    assert shuffled.components == _graph().components
+
+
+def test_components_include_imported_files_without_edges_of_their_own():
+    graph = ImportGraph({A: {B}})
+
+    assert graph.components == [frozenset({B}), frozenset({A})]
+
+
+def test_dependents_are_reverse_edges():
+    graph = _graph()
+
+    assert graph.dependents(B) == {A, C}
+    assert graph.dependents(C) == {B, D}
+    assert graph.dependents(F) == set()
+    assert graph.dependents(Path("missing.py")) == set()
+    assert graph.dependencies(D) == {C, E}
+    assert graph.transitive_dependents(E) == {D}
+    assert graph.transitive_dependents(C) == {A, B, C, D}
+
+
+def test_long_import_chains_do_not_hit_the_recursion_limit():
+    chain = [Path(f"m{i}.py") for i in range(sys.getrecursionlimit() * 2)]
+    graph = ImportGraph({filepath: {chain[i + 1]} for i, filepath in enumerate(chain[:-1])})
+
+    assert graph.components == [frozenset({filepath}) for filepath in reversed(chain)]
@@ -0,0 +1,52 @@
+# tests/test_indexes.py
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from conductdoc import indexes
+from conductdoc.config import INDEX_BACKENDS
+
+
+@pytest.fixture
+def clustered():
+    """2,000 vectors around 20 centers, and 50 queries near them."""
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(20, 32)).astype(np.float32) * 4
+    vectors = centers[rng.integers(0, 20, size=2000)] + rng.normal(size=(2000, 32)).astype(np.float32)
+    queries = centers[rng.integers(0, 20, size=50)] + rng.normal(size=(50, 32)).astype(np.float32)
+    return vectors, queries
+
+
+def test_small_corpora_fall_back_to_a_flat_index():
+    assert indexes.effective_backend("hnsw", indexes.ANN_MIN_CORPUS_SIZE - 1) == "flat"
+    assert indexes.effective_backend("hnsw", indexes.ANN_MIN_CORPUS_SIZE) == "hnsw"
+    with pytest.raises(ValueError, match="Unknown index backend"):
+        indexes.effective_backend("annoy", 10)
+
+
+@pytest.mark.parametrize("backend", INDEX_BACKENDS)
+def test_backends_recall_most_exact_neighbours_and_survive_a_reload(backend, clustered, monkeypatch, tmp_path):
+    monkeypatch.setattr(indexes, "ANN_MIN_CORPUS_SIZE", 100)
+    vectors, queries = clustered
+    _, exact = indexes.build_index("flat", vectors).search(queries, 10)
+
+    index = indexes.build_index(backend, vectors)
+    faiss.write_index(index, str(tmp_path / "index.faiss"))
+    reloaded = faiss.read_index(str(tmp_path / "index.faiss"))
+    _, found = reloaded.search(queries, 10)
+
+    assert reloaded.ntotal == len(vectors)
+    recall = np.mean([len(set(row) & set(exact_row)) / 10 for row, exact_row in zip(found, exact)])
+    assert recall >= (0.4 if backend == "ivf-pq" else 0.9)
+
+
+@pytest.mark.parametrize("backend", ["ivf-flat", "hnsw", "ivf-sq8"])
+def test_trained_indexes_are_deterministic(backend, clustered, monkeypatch):
+    monkeypatch.setattr(indexes, "ANN_MIN_CORPUS_SIZE", 100)
+    vectors, queries = clustered
+
+    _, first = indexes.build_index(backend, vectors).search(queries, 10)
+    _, second = indexes.build_index(backend, vectors).search(queries, 10)
+
+    np.testing.assert_array_equal(first, second)
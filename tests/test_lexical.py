@@ -0,0 +1,46 @@
+# tests/test_lexical.py
+from conductdoc.lexical import LexicalIndex, tokenize
+
+CHUNKS = [
+    "def parse_headers(raw): splits the raw message into header lines",
+    "class HTTPResponse: wraps a response from email/mime/text.py",
+    "def send(message): sends a message over the connection",
+    "def close(): closes the connection",
+]
+
+
+def test_identifiers_and_paths_are_indexed_whole_and_in_parts():
+    assert tokenize("parse_headers") == ["parse_headers", "parse", "headers"]
+    assert tokenize("HTTPResponse") == ["httpresponse", "http", "response"]
+    assert tokenize("email/mime/text.py")[:5] == ["email/mime/text.py", "email", "mime", "text", "py"]
+
+
+def test_exact_identifiers_rank_first_and_are_marked_exact():
+    index = LexicalIndex()
+    index.add(CHUNKS)
+
+    hits = index.search("where is parse_headers defined", k=2)
+
+    assert hits[0].chunk_id == 0
+    assert hits[0].exact
+    assert all(not hit.exact for hit in hits[1:])
+    assert index.search("email/mime/text.py", k=1)[0].chunk_id == 1
+
+
+def test_search_is_restricted_to_ids_and_ties_are_broken_by_tie_break():
+    index = LexicalIndex()
+    index.add(["connection pool", "connection pool", "unrelated words", "more unrelated text"])
+
+    assert [hit.chunk_id for hit in index.search("connection", k=1, ids={1, 2})] == [1]
+    assert [hit.chunk_id for hit in index.search("connection", k=2, tie_break=lambda chunk_id: -chunk_id)] == [1, 0]
+
+
+def test_frozen_statistics_ignore_chunks_added_later():
+    index = LexicalIndex()
+    index.add(CHUNKS)
+    index.freeze_statistics()
+    before = index.search("connection", k=2)
+
+    index.add(["the connection is retried"] * 10)
+
+    assert index.search("connection", k=2, ids={0, 1, 2, 3}) == before
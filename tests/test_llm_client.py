@@ -0,0 +1,90 @@
+# tests/test_llm_client.py
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+
+from benchmarks.fake_llm_server import FakeLLMServer
+from conductdoc import llm_client
+from conductdoc.config import ERROR_RESPONSE_PREFIX
+
+MESSAGES = [{"role": "user", "content": "Summarize the module."}]
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Serves the fake LLM on a free port as the 'local' provider, with near-instant retries."""
+    server = FakeLLMServer(("127.0.0.1", 0), latency=0.0, fail_every=0, fail_with=503)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OLLAMA_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    monkeypatch.setattr(llm_client, "LLM_RETRY_BASE_DELAY", 0.001)
+    monkeypatch.setattr(llm_client, "LLM_RETRY_MAX_DELAY", 0.01)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_transient_failures_are_retried(fake_llm, status):
+    fake_llm.fail_every, fake_llm.fail_with = 2, status
+
+    first = llm_client.complete("local", "model", MESSAGES, temperature=0.2)
+    second = llm_client.complete("local", "model", MESSAGES, temperature=0.2)
+
+    assert first == second
+    assert first.startswith("<p>Fake answer")
+    assert fake_llm.counters["requests"] == 3
+    assert fake_llm.counters["failures"] == 1
+
+
+def test_persistent_failures_raise_after_the_last_retry(fake_llm, monkeypatch):
+    fake_llm.fail_every = 1
+    monkeypatch.setattr(llm_client, "LLM_MAX_RETRIES", 2)
+
+    with pytest.raises(llm_client.LLMError, match="after 3 attempts"):
+        llm_client.complete("local", "model", MESSAGES, temperature=0.2)
+    assert fake_llm.counters["requests"] == 3
+
+
+def test_retry_delays_back_off_exponentially_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(llm_client.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(llm_client, "LLM_RETRY_BASE_DELAY", 1.0)
+    monkeypatch.setattr(llm_client, "LLM_RETRY_MAX_DELAY", 10.0)
+    error = RuntimeError("connection reset")
+
+    assert [llm_client._retry_delay(attempt, error) for attempt in range(6)] == [1.0, 2.0, 4.0, 8.0, 10.0, 10.0]
+
+
+def test_retry_delays_honour_retry_after(monkeypatch):
+    monkeypatch.setattr(llm_client.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(llm_client, "LLM_RETRY_BASE_DELAY", 1.0)
+    monkeypatch.setattr(llm_client, "LLM_RETRY_MAX_DELAY", 10.0)
+
+    def rate_limited(retry_after):
+        return SimpleNamespace(response=SimpleNamespace(headers={"retry-after": retry_after}))
+
+    assert llm_client._retry_delay(0, rate_limited("5")) == 5.0
+    assert llm_client._retry_delay(0, rate_limited("600")) == 10.0
+    assert llm_client._retry_delay(2, rate_limited("0")) == 4.0
+    assert llm_client._retry_delay(0, rate_limited("Wed, 21 Oct 2015 07:28:00 GMT")) == 1.0
+
+
+def test_failed_responses_are_not_cached(fake_llm, monkeypatch, tmp_path):
+    analyzer = pytest.importorskip("conductdoc.analyzer")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(llm_client, "LLM_MAX_RETRIES", 0)
+    fake_llm.fail_every = 1
+    ask = lambda: analyzer.get_llm_response("Summarize the module.", "def f(): pass", "local", "model")
+
+    failed = ask()
+    fake_llm.fail_every = 0
+    answered = ask()
+    cached = ask()
+
+    assert failed.startswith(ERROR_RESPONSE_PREFIX)
+    assert answered.startswith("<p>Fake answer")
+    assert cached == answered
+    assert fake_llm.counters["requests"] == 2
@@ -0,0 +1,50 @@
+# tests/test_main.py
+import argparse
+import subprocess
+import sys
+
+import pytest
+
+import main
+from benchmarks.check_import_time import DEFERRED_MODULES, REPO_ROOT
+
+
+def _modules_loaded_by(code):
+    result = subprocess.run(
+        [sys.executable, "-c", f"{code}\nimport sys; print('\\n'.join(sys.modules))"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    return set(result.stdout.split())
+
+
+def test_cli_startup_defers_the_heavy_dependencies():
+    loaded = _modules_loaded_by("import main")
+
+    assert "conductdoc.planner" in loaded
+    assert loaded.isdisjoint(DEFERRED_MODULES)
+
+
+def test_help_defers_the_heavy_dependencies():
+    loaded = _modules_loaded_by(
+        "import sys, main\nsys.argv = ['main.py', '--help']\ntry:\n    main.main()\nexcept SystemExit:\n    pass"
+    )
+
+    assert loaded.isdisjoint(DEFERRED_MODULES)
+
+
+def test_positive_int_rejects_counts_below_one():
+    assert main.positive_int("4") == 4
+    for value in ("0", "-2", "two"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            main.positive_int(value)
+
+
+def test_clear_caches_removes_directories_and_files(tmp_path):
+    cache_dir = tmp_path / ".faiss_index"
+    (cache_dir / "snapshot").mkdir(parents=True)
+    cache_file = tmp_path / "embeddings.sqlite"
+    cache_file.write_text("")
+
+    main.clear_caches([cache_dir, cache_file, tmp_path / "missing"])
+
+    assert list(tmp_path.iterdir()) == []
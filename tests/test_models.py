@@ -0,0 +1,55 @@
+# tests/test_models.py
+import pickle
+from pathlib import Path
+
+import pytest
+
+from conductdoc.models import CodeElement, register_source_file
+
+
+def _spanned_elements(tmp_path: Path):
+    """Two elements of one CRLF file, referring to their source by byte span."""
+    origin = tmp_path / "shapes.py"
+    origin.write_bytes('def área():\r\n    return "ü"\r\n\r\ndef perimeter():\r\n    return 4\r\n'.encode("utf-8"))
+    text = origin.read_bytes().replace(b"\r\n", b"\n")
+    # Paths are interned for the whole process, so each test gets its own.
+    filepath = Path(tmp_path.name) / "shapes.py"
+    register_source_file(filepath, origin)
+    first_end = text.index(b"\n\n")
+    second_start = text.index(b"def perimeter")
+    return (
+        CodeElement("área", "function", filepath, 1, 2, source_span=(0, first_end)),
+        CodeElement("perimeter", "function", filepath, 4, 5, source_span=(second_start, len(text) - 1 - second_start)),
+    )
+
+
+def test_elements_have_no_instance_dict():
+    element = CodeElement("f", "function", Path("pkg/m.py"), 1, 2, source_code="def f():\n    pass")
+
+    assert not hasattr(element, "__dict__")
+    with pytest.raises(AttributeError):
+        element.unexpected = 1
+
+
+def test_source_spans_are_read_lazily_from_the_shared_buffer(tmp_path):
+    area, perimeter = _spanned_elements(tmp_path)
+
+    assert area.source_code == 'def área():\n    return "ü"'
+    assert perimeter.source_code == "def perimeter():\n    return 4"
+    assert area.filepath is perimeter.filepath
+
+
+def test_elements_survive_pickling_with_their_path(tmp_path):
+    area, _ = _spanned_elements(tmp_path)
+    area.ai_documentation["summary"] = "<p>Computes an area.</p>"
+
+    restored = pickle.loads(pickle.dumps(area))
+
+    assert restored == area
+    assert restored.filepath == Path(tmp_path.name) / "shapes.py"
+    assert restored.source_code == area.source_code
+
+
+def test_elements_need_a_source():
+    with pytest.raises(ValueError):
+        CodeElement("f", "function", Path("pkg/m.py"), 1, 2)
@@ -0,0 +1,44 @@
+# tests/test_planner.py
+from pathlib import Path
+
+from conductdoc import planner, prompts
+from conductdoc.config import DIAGRAM_LLM_MODEL
+from conductdoc.crawler import crawl_source_code
+from conductdoc.models import DocsContext
+
+
+def _unchanged_crawl(tmp_path: Path):
+    """A package crawled twice, so that every file counts as unchanged."""
+    src = tmp_path / "pkg"
+    src.mkdir()
+    (src / "__init__.py").write_text("")
+    (src / "core.py").write_text('def run():\n    """Run."""\n    return 1\n')
+    crawl_source_code(src)
+    return src, crawl_source_code(src)
+
+
+def _plan(tmp_path, monkeypatch, uncached=frozenset()):
+    """Plans a run in which every (prompt, model) has a cached response, except those in `uncached`."""
+    src, crawl = _unchanged_crawl(tmp_path)
+    monkeypatch.setattr(planner, "has_cached_prompt", lambda prompt, model_name: (prompt, model_name) not in uncached)
+    return {phase.name: phase for phase in planner.plan_run(crawl, DocsContext(), "", src.parent, "local")}
+
+
+def test_fully_cached_runs_are_planned_as_free(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    phases = _plan(tmp_path, monkeypatch)
+
+    for phase in phases.values():
+        assert phase.calls > 0
+        assert phase.expected_cache_hits == phase.calls
+
+
+def test_the_diagram_is_not_planned_as_cached_without_its_prompt_marker(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    phases = _plan(tmp_path, monkeypatch, {(prompts.ARCHITECTURE_DIAGRAM_PROMPT, DIAGRAM_LLM_MODEL)})
+
+    assert phases["generate_recursive_summary"].cache_hit_rate == 1.0
+    assert phases["generate_ai_architecture_diagram"].expected_cache_hits == 0
+    assert phases["generate_ai_architecture_diagram"].wall_time_seconds(concurrency=1, latency=5.0) == 5.0
@@ -0,0 +1,68 @@
+# tests/test_prefetch.py
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("faiss")
+
+from conductdoc import retriever as retriever_module
+from conductdoc.config import PREFETCH_QUEUE_SIZE
+from conductdoc.models import CodeElement, DocSection
+from conductdoc.prefetch import EmbeddingPrefetcher
+
+SECTIONS = [
+    DocSection("guide.md", "<p>...</p>", ["Summaries run once their imports are done.", "Retries back off when rate limited."]),
+    DocSection("faq.md", "<p>...</p>", ["Snapshots are memory-mapped and shared between jobs."]),
+]
+
+ELEMENTS = [
+    CodeElement("run_task_graph", "function", Path("prefetch/scheduler.py"), 1, 2,
+                source_code="def run_task_graph():\n    return schedule(tasks)"),
+    CodeElement("retry_delay", "function", Path("prefetch/client.py"), 1, 2,
+                source_code="def retry_delay():\n    return base * 2 ** attempt"),
+]
+
+DOC_CHUNKS = [(section.source, text) for section in SECTIONS for text in section.chunks]
+
+
+def test_prefetched_chunks_are_embedding_cache_hits(stub_encoder):
+    prefetcher = EmbeddingPrefetcher()
+    prefetcher.submit_code(ELEMENTS)
+    for section in SECTIONS:
+        prefetcher.submit_docs(section)
+    retriever = prefetcher.finish()
+    prefetched = retriever.stats["embedding_cache_misses"]
+    retriever.build_initial_indexes(DOC_CHUNKS, ELEMENTS)
+    plain = retriever_module.Retriever()
+    plain.build_initial_indexes(DOC_CHUNKS, ELEMENTS)
+
+    assert prefetched == len(DOC_CHUNKS) + len(ELEMENTS)
+    assert retriever.stats["embedding_cache_misses"] == prefetched
+    assert retriever.stats["embedding_cache_hits"] == prefetched
+    for query in ("how are retries delayed", "how are snapshots shared"):
+        assert retriever.retrieve(query, k=3) == plain.retrieve(query, k=3)
+
+
+def test_submissions_beyond_the_queue_size_are_all_embedded(stub_encoder):
+    sections = [DocSection("notes.md", "", [f"Note {i} about the crawler."]) for i in range(PREFETCH_QUEUE_SIZE * 2)]
+    prefetcher = EmbeddingPrefetcher()
+    for section in sections:
+        prefetcher.submit_docs(section)
+    retriever = prefetcher.finish()
+    retriever.build_initial_indexes([("notes.md", section.chunks[0]) for section in sections], [])
+
+    assert retriever.stats["embedding_cache_misses"] == len(sections)
+    assert retriever.stats["embedding_cache_hits"] == len(sections)
+
+
+def test_encoder_errors_surface_from_finish_without_blocking_the_crawl(stub_encoder, monkeypatch):
+    def broken_encoder(*args, **kwargs):
+        raise OSError("model download failed")
+
+    monkeypatch.setattr(retriever_module, "load_encoder", broken_encoder)
+    prefetcher = EmbeddingPrefetcher()
+    for _ in range(PREFETCH_QUEUE_SIZE * 2):
+        prefetcher.submit_docs(SECTIONS[0])
+
+    with pytest.raises(OSError, match="model download failed"):
+        prefetcher.finish()
@@ -0,0 +1,39 @@
+# tests/test_query_cache.py
+from conductdoc.query_cache import QueryCache
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = QueryCache(capacity=2)
+    cache.put("a", ["1"])
+    cache.put("b", ["2"])
+    cache.get("a")
+    cache.put("c", ["3"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ["1"]
+    assert len(cache) == 2
+
+
+def test_entries_survive_a_save_and_load_in_recency_order(tmp_path):
+    cache = QueryCache(capacity=3)
+    for key in "abc":
+        cache.put(key, [key.upper()])
+    cache.get("a")
+    cache.save(tmp_path / "queries.json")
+
+    smaller = QueryCache(capacity=2)
+    smaller.load(tmp_path / "queries.json")
+
+    assert smaller.get("b") is None
+    assert smaller.get("c") == ["C"] and smaller.get("a") == ["A"]
+
+
+def test_missing_or_corrupt_files_load_as_empty(tmp_path):
+    cache = QueryCache(capacity=2)
+    cache.put("a", ["1"])
+    cache.load(tmp_path / "missing.json")
+    assert len(cache) == 0
+
+    (tmp_path / "corrupt.json").write_text("[[")
+    cache.load(tmp_path / "corrupt.json")
+    assert len(cache) == 0
@@ -0,0 +1,209 @@
+# tests/test_retriever.py
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("faiss")
+
+from conductdoc.config import FAISS_INDEX_DIR_NAME, FAISS_SNAPSHOT_MAX_AGE_DAYS
+from conductdoc.models import ChunkFilter, CodeElement
+from conductdoc.retriever import Retriever
+
+DOCS = [
+    ("guide.md", "The scheduler runs summaries concurrently once their imports are done."),
+    ("guide.md", "Retries back off exponentially when the service is rate limited."),
+    ("faq.md", "Index snapshots are memory-mapped so parallel jobs share their pages."),
+]
+
+
+def _element(path: str, name: str, body: str) -> CodeElement:
+    return CodeElement(name, "function", Path(path), 1, 2, source_code=f"def {name}():\n    {body}")
+
+
+ELEMENTS = [
+    _element("pkg/scheduler.py", "run_task_graph", "return schedule(tasks, concurrency)"),
+    _element("pkg/scheduler.py", "ready_tasks", "return [task for task in tasks if task.ready]"),
+    _element("pkg/client.py", "complete", "return retry(send_request, backoff)"),
+    _element("pkg/client.py", "retry_delay", "return min(cap, base * 2 ** attempt)"),
+    _element("pkg/sub/index.py", "load_snapshot", "return faiss.read_index(path, mmap)"),
+]
+
+QUERIES = ["how are summaries scheduled", "what happens when rate limited", "how is the index loaded"]
+
+
+def _corpus_retriever(**kwargs) -> Retriever:
+    retriever = Retriever(**kwargs)
+    retriever.build_initial_indexes(DOCS, ELEMENTS)
+    return retriever
+
+
+def _count_encodes(retriever: Retriever):
+    """Counts the encoder calls of `retriever` in the returned list, one entry of batch size per call."""
+    calls = []
+    encode = retriever.model.encode
+    retriever.model.encode = lambda texts, **kwargs: calls.append(len(texts)) or encode(texts, **kwargs)
+    return calls
+
+
+def _build(retriever_module, text: str):
+    retriever = retriever_module.Retriever()
+    retriever.build_initial_indexes([("README.md", text)], [])
+    return retriever
+
+
+def _snapshot_ids():
+    return {path.name.split(".", 1)[0] for path in FAISS_INDEX_DIR_NAME.iterdir()}
+
+
+def test_saving_a_snapshot_keeps_recently_used_ones(stub_encoder):
+    from conductdoc import retriever as retriever_module
+
+    first = _build(retriever_module, "The first repository parses invoices.")
+    second = _build(retriever_module, "The second repository renders charts.")
+
+    assert first.snapshot_id != second.snapshot_id
+    assert _snapshot_ids() == {first.snapshot_id, second.snapshot_id}
+
+
+def test_saving_a_snapshot_prunes_unused_ones(stub_encoder):
+    from conductdoc import retriever as retriever_module
+
+    stale = _build(retriever_module, "The first repository parses invoices.")
+    kept = _build(retriever_module, "The second repository renders charts.")
+    long_ago = time.time() - (FAISS_SNAPSHOT_MAX_AGE_DAYS + 1) * 24 * 3600
+    for path in FAISS_INDEX_DIR_NAME.iterdir():
+        os.utime(path, (long_ago, long_ago))
+    # Mapping a snapshot again marks it as used.
+    _build(retriever_module, "The second repository renders charts.")
+
+    newest = _build(retriever_module, "The third repository sends emails.")
+
+    assert _snapshot_ids() == {kept.snapshot_id, newest.snapshot_id}
+    assert stale.snapshot_id not in _snapshot_ids()
+
+
+def test_batched_retrieval_matches_single_retrievals_with_one_encoder_call(stub_encoder):
+    single = _corpus_retriever()
+    batched = _corpus_retriever()
+    calls = _count_encodes(batched)
+
+    results = batched.retrieve_many(QUERIES, k=3)
+
+    assert results == [single.retrieve(query, k=3) for query in QUERIES]
+    assert calls == [len(QUERIES)]
+    assert batched.retrieve_many([], k=3) == []
+
+
+def test_added_chunks_are_encoded_in_one_batch_before_the_next_search(stub_encoder):
+    retriever = _corpus_retriever()
+    calls = _count_encodes(retriever)
+
+    for name in ("scheduler", "client", "index"):
+        retriever.add_chunks([f"The {name} module summary."], path=Path(f"pkg/{name}.py"))
+    assert calls == []
+
+    results = retriever.retrieve("client module summary", k=1, scopes=[ChunkFilter(kinds=frozenset({"summary"}))])
+
+    assert calls[0] == 3
+    assert retriever.delta_index.ntotal == 3
+    assert results == ["The client module summary."]
+
+
+def test_pending_chunks_are_flushed_once_a_batch_is_full(stub_encoder, monkeypatch):
+    from conductdoc import retriever as retriever_module
+
+    monkeypatch.setattr(retriever_module, "ADD_BATCH_SIZE", 4)
+    retriever = _corpus_retriever()
+
+    retriever.add_chunks([f"Summary {i}." for i in range(3)])
+    assert retriever.delta_index is None
+    retriever.add_chunks(["Summary 3."])
+
+    assert retriever.delta_index.ntotal == 4
+    assert len(retriever.chunks) == len(DOCS) + len(ELEMENTS) + 4
+
+
+def _metadata_of(retriever: Retriever, chunks):
+    by_chunk = dict(zip(retriever.chunks, retriever.chunk_metadata))
+    return [by_chunk[chunk] for chunk in chunks]
+
+
+def test_scopes_restrict_results_by_kind_and_path(stub_encoder):
+    retriever = _corpus_retriever()
+    retriever.add_chunks(["The sub package loads snapshots."], kind="summary", path=Path("pkg/sub"))
+
+    code_only = retriever.retrieve("scheduler retries snapshots", k=10, scopes=[ChunkFilter(kinds=frozenset({"code"}))])
+    in_client = retriever.retrieve("scheduler retries snapshots", k=10, scopes=[ChunkFilter(paths=frozenset({Path("pkg/client.py")}))])
+    under_sub = retriever.retrieve("scheduler retries snapshots", k=10, scopes=[ChunkFilter(paths=frozenset({Path("pkg/sub")}))])
+
+    assert {kind for kind, _ in _metadata_of(retriever, code_only)} == {"code"}
+    assert len(code_only) == len(ELEMENTS)
+    assert set(_metadata_of(retriever, in_client)) == {("code", Path("pkg/client.py"))}
+    assert set(_metadata_of(retriever, under_sub)) == {("code", Path("pkg/sub/index.py")), ("summary", Path("pkg/sub"))}
+
+
+def test_scopes_are_filled_in_turn_without_repeats(stub_encoder):
+    retriever = _corpus_retriever()
+    own_file = ChunkFilter(paths=frozenset({Path("pkg/scheduler.py")}))
+
+    results = retriever.retrieve("how are summaries scheduled", k=4, scopes=[own_file, None])
+
+    assert [path for _, path in _metadata_of(retriever, results[:2])] == [Path("pkg/scheduler.py")] * 2
+    assert len(results) == len(set(results)) == 4
+    assert all(path != Path("pkg/scheduler.py") for _, path in _metadata_of(retriever, results[2:]))
+
+
+def test_reciprocal_rank_fusion_favours_ids_ranked_highly_by_either_ranking():
+    from conductdoc.retriever import _reciprocal_rank_fusion
+
+    assert _reciprocal_rank_fusion([1, 2, 3], [3, 4]) == [3, 1, 2, 4]
+    assert _reciprocal_rank_fusion([1], [2], tie_break=lambda chunk_id: -chunk_id) == [2, 1]
+
+
+def test_exact_identifier_queries_skip_the_encoder(stub_encoder):
+    retriever = _corpus_retriever()
+    calls = _count_encodes(retriever)
+
+    exact = retriever.retrieve("retry_delay", k=1)
+    hybrid = retriever.retrieve("how long to wait between attempts", k=1)
+
+    assert "def retry_delay():" in exact[0]
+    assert len(hybrid) == 1
+    assert calls == [1]
+    assert retriever.stats["lexical_only_searches"] == 1
+    assert retriever.stats["hybrid_searches"] == 1
+
+
+def test_repeated_queries_are_answered_from_the_query_cache_until_chunks_are_added(stub_encoder):
+    retriever = _corpus_retriever()
+    summaries = [ChunkFilter(kinds=frozenset({"summary"})), None]
+    first = retriever.retrieve("client retries", k=2, scopes=summaries)
+    calls = _count_encodes(retriever)
+
+    again = retriever.retrieve("client retries", k=2, scopes=summaries)
+    assert again == first
+    assert calls == []
+    assert retriever.stats["query_cache_hits"] == 1
+
+    retriever.add_chunks(["The client retries requests."], path=Path("pkg/client.py"))
+    after_add = retriever.retrieve("client retries", k=2, scopes=summaries)
+
+    assert after_add[0] == "The client retries requests."
+    assert retriever.stats["query_cache_misses"] == 2
+
+
+def test_the_query_cache_is_reused_by_later_runs_on_the_same_snapshot(stub_encoder):
+    earlier = _corpus_retriever()
+    earlier.add_chunks(["The client retries requests."], path=Path("pkg/client.py"))
+    results = earlier.retrieve_many(QUERIES, k=3)
+    earlier.close()
+
+    later = _corpus_retriever()
+    later.add_chunks(["The client retries requests."], path=Path("pkg/client.py"))
+    calls = _count_encodes(later)
+
+    assert later.retrieve_many(QUERIES, k=3) == results
+    assert later.stats["query_cache_hits"] == len(QUERIES)
+    assert calls == []  # The added chunk's embedding comes from the embedding cache.
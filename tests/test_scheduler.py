@@ -0,0 +1,81 @@
+# tests/test_scheduler.py
+import threading
+import time
+
+import pytest
+
+from conductdoc.scheduler import run_task_graph
+
+
+def _recording_run(prerequisites, concurrency, fail=None, priority=lambda task: task, events=None):
+    """Runs `prerequisites` with work that sleeps briefly, recording starts, finishes and the peak in flight."""
+    lock = threading.Lock()
+    events = [] if events is None else events
+    in_flight = [0, 0]  # Current and peak.
+
+    def work(task):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        if task == fail:
+            raise RuntimeError(f"{task} failed")
+        return task.upper()
+
+    def start(batch):
+        events.extend(("start", task) for task in batch)
+        return [lambda task=task: work(task) for task in batch]
+
+    def finish(task, result):
+        assert result == task.upper()
+        events.append(("finish", task))
+
+    run_task_graph(prerequisites, start, finish, concurrency=concurrency, priority=priority)
+    return events, in_flight[1]
+
+
+# Two leaf chains feeding into one root, plus independent tasks.
+GRAPH = {
+    "a1": set(), "a2": {"a1"}, "b1": set(), "b2": {"b1"},
+    "root": {"a2", "b2"}, "x": set(), "y": set(), "z": set(),
+}
+
+
+@pytest.mark.parametrize("concurrency", [1, 3, 8])
+def test_tasks_start_only_after_their_prerequisites_finish(concurrency):
+    events, _ = _recording_run(GRAPH, concurrency)
+
+    assert sorted(task for kind, task in events if kind == "finish") == sorted(GRAPH)
+    for task, required in GRAPH.items():
+        for prerequisite in required:
+            assert events.index(("finish", prerequisite)) < events.index(("start", task))
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_concurrency_is_bounded(concurrency):
+    _, peak = _recording_run({f"t{i}": set() for i in range(12)}, concurrency)
+
+    assert peak == concurrency
+
+
+def test_ready_tasks_start_in_priority_order():
+    events, _ = _recording_run({"c": set(), "a": set(), "b": set()}, 1, priority=lambda task: task)
+
+    assert [task for kind, task in events if kind == "start"] == ["a", "b", "c"]
+
+
+def test_errors_propagate_and_dependents_never_start():
+    events = []
+    with pytest.raises(RuntimeError, match="a1 failed"):
+        _recording_run({"a1": set(), "a2": {"a1"}}, 2, fail="a1", events=events)
+
+    assert events == [("start", "a1")]
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="unknown task"):
+        _recording_run({"a": {"missing"}}, 1)
+    with pytest.raises(ValueError, match="cycle"):
+        _recording_run({"a": {"b"}, "b": {"a"}, "c": set()}, 1)